@@ -114,8 +114,8 @@ def main():
 
     # Create pipeline
     storage = EncryptedStorage(crypto)
-    ml_organizer = MLOrganizer(embedder, session)
-    pipeline = IngestionPipeline(session, storage, embedder, vectordb, ml_organizer)
+    ml_organizer = MLOrganizer(embedder, db)
+    pipeline = IngestionPipeline(db, storage, embedder, vectordb, ml_organizer)
 
     # Ingest summaries
     summaries_to_ingest = [
@@ -411,3 +411,50 @@ class Anonymizer:
             "min_confidence": min(confidences) if confidences else 0,
             "max_confidence": max(confidences) if confidences else 0,
         }
+
+
+class StreamingDeanonymizer:
+    """
+    Incremental de-anonymization for streamed LLM output.
+
+    Tokens like "[PERSON_001]" can arrive split across chunks ("[PER", "SON_001]"),
+    so a trailing unclosed "[..." fragment is held back until it either closes
+    or grows longer than any known token.
+    """
+
+    def __init__(self, substitutions: Dict[str, Substitution], markup_style: str = "italic"):
+        self.markup_style = markup_style
+        self._subs = sorted(substitutions.items(), key=lambda x: len(x[0]), reverse=True)
+        self._max_token_len = max((len(token) for token, _ in self._subs), default=0)
+        self._pending = ""
+
+    def _replace(self, text: str) -> str:
+        for token, sub in self._subs:
+            if token not in text:
+                continue
+            if self.markup_style == "italic":
+                text = text.replace(token, f"*{sub.original}*")
+            elif self.markup_style == "bold":
+                text = text.replace(token, f"**{sub.original}**")
+            else:
+                text = text.replace(token, sub.original)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; returns the text that is safe to emit now"""
+        if not self._subs:
+            return chunk
+
+        text = self._pending + chunk
+        hold_from = text.rfind("[")
+        if hold_from != -1 and "]" not in text[hold_from:] and len(text) - hold_from < self._max_token_len:
+            self._pending = text[hold_from:]
+            text = text[:hold_from]
+        else:
+            self._pending = ""
+        return self._replace(text)
+
+    def flush(self) -> str:
+        """Emit whatever is still held back (end of stream)"""
+        text, self._pending = self._pending, ""
+        return self._replace(text)
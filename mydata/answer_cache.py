@@ -0,0 +1,179 @@
+"""Persistent, encrypted cache of LLM answers
+
+An answer is reused only when everything that shaped it is identical: provider,
+model, the normalized question, the exact context chunks (ids and text hashes,
+plus any pre-computed summary) and the prior conversation turns. New or deleted
+chunks change what retrieval returns, which changes the key - so entries never
+need explicit invalidation; old ones just age out.
+
+Answers are stored Fernet-encrypted like API keys, since they quote the corpus.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, func, update
+from sqlmodel import select
+from .config import Config
+from .logger import get_logger
+from .models import LlmAnswerCache
+
+logger = get_logger()
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Process-wide lookup counters (hits are also persisted per entry)
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> int:
+    with _stats_lock:
+        _stats[name] += 1
+        return _stats[name]
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    """'Who is on  Sentinel?' -> 'who is on sentinel'"""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def context_fingerprint(results: List[Dict], summary_context: Optional[str] = None) -> str:
+    """Hash of the chunks (id + text) and summary that went into the prompt"""
+    parts = []
+    for hit in results:
+        text = hit.get("payload", hit).get("text", "")
+        parts.append(f"{hit.get('id')}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}")
+    return _sha256(*sorted(parts), summary_context or "")
+
+
+def history_fingerprint(messages: List[Dict]) -> str:
+    """Hash of the prior turns (an answer depends on what was said before)"""
+    return _sha256(*(f"{m['role']}:{m['content']}" for m in messages))
+
+
+def answer_key(provider: str, model: str, question: str, context_fp: str, history_fp: str) -> str:
+    return _sha256(provider, model, normalize_question(question), context_fp, history_fp)
+
+
+def lookup(database, crypto, key: str) -> Optional[Dict[str, Any]]:
+    """Cached answer for a key, or None (expired or undecryptable entries are dropped)"""
+    with database.read_session() as session:
+        row = session.get(LlmAnswerCache, key)
+
+    if row is None:
+        _count("misses")
+        return None
+
+    expired = row.created_at < datetime.utcnow() - timedelta(days=Config.ANSWER_CACHE_TTL_DAYS)
+    answer = None
+    if not expired:
+        try:
+            answer = json.loads(crypto.decrypt_str(row.encrypted_answer))
+        except Exception as e:
+            # Different passphrase / corrupted row
+            logger.warning(f"[ANSWER CACHE] Dropping unreadable entry: {e}")
+
+    if answer is None:
+        with database.write_session() as session:
+            session.execute(delete(LlmAnswerCache).where(LlmAnswerCache.key == key))
+        _count("misses")
+        return None
+
+    with database.write_session() as session:
+        session.execute(
+            update(LlmAnswerCache)
+            .where(LlmAnswerCache.key == key)
+            .values(hit_count=LlmAnswerCache.hit_count + 1, last_hit_at=datetime.utcnow())
+        )
+    _count("hits")
+
+    answer["tokens_saved"] = row.tokens_used
+    answer["latency_saved_ms"] = row.latency_ms
+    return answer
+
+
+def store(
+    database,
+    crypto,
+    key: str,
+    provider: str,
+    model: str,
+    response: str,
+    response_html: Optional[str],
+    tokens_used: int,
+    latency_ms: int,
+) -> None:
+    """Save an answer (replaces any entry with the same key)"""
+    encrypted = crypto.encrypt_str(json.dumps({"response": response, "response_html": response_html}))
+    entry = LlmAnswerCache(
+        key=key,
+        provider=provider,
+        model=model,
+        encrypted_answer=encrypted,
+        tokens_used=tokens_used or 0,
+        latency_ms=latency_ms,
+    )
+    with database.write_session() as session:
+        session.merge(entry)
+    if _count("stores") % 100 == 1:
+        prune(database)
+
+
+def prune(database) -> int:
+    """Delete expired entries and the least recently used beyond ANSWER_CACHE_MAX_ENTRIES"""
+    cutoff = datetime.utcnow() - timedelta(days=Config.ANSWER_CACHE_TTL_DAYS)
+    with database.write_session() as session:
+        removed = session.execute(delete(LlmAnswerCache).where(LlmAnswerCache.created_at < cutoff)).rowcount
+
+        excess = (session.scalar(select(func.count()).select_from(LlmAnswerCache)) or 0) - Config.ANSWER_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = (
+                select(LlmAnswerCache.key)
+                .order_by(func.coalesce(LlmAnswerCache.last_hit_at, LlmAnswerCache.created_at))
+                .limit(excess)
+            )
+            removed += session.execute(delete(LlmAnswerCache).where(LlmAnswerCache.key.in_(oldest))).rowcount
+    return removed
+
+
+def clear(database) -> int:
+    with database.write_session() as session:
+        return session.execute(delete(LlmAnswerCache)).rowcount
+
+
+def stats(database) -> Dict[str, Any]:
+    """Entry count, lifetime hits and savings, and this process's hit rate"""
+    with database.read_session() as session:
+        entries, hits, tokens_saved, latency_saved = session.exec(
+            select(
+                func.count(LlmAnswerCache.key),
+                func.coalesce(func.sum(LlmAnswerCache.hit_count), 0),
+                func.coalesce(func.sum(LlmAnswerCache.hit_count * LlmAnswerCache.tokens_used), 0),
+                func.coalesce(func.sum(LlmAnswerCache.hit_count * LlmAnswerCache.latency_ms), 0),
+            )
+        ).one()
+
+    with _stats_lock:
+        process = dict(_stats)
+    lookups = process["hits"] + process["misses"]
+
+    return {
+        "enabled": Config.ANSWER_CACHE_ENABLED,
+        "entries": entries,
+        "lifetime_hits": hits,
+        "tokens_saved": tokens_saved,
+        "latency_saved_seconds": round(latency_saved / 1000, 1),
+        "process": {**process, "hit_rate": round(process["hits"] / lookups, 4) if lookups else None},
+    }
@@ -1,12 +1,17 @@
 """FastAPI server for MyData"""
 
+import asyncio
+import json
+import anyio
+from datetime import datetime
 from pathlib import Path
 from typing import Optional, List
 from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from . import answer_cache, chunk_store, counters, sparse_encoder
 from .database import Database
 from .crypto import CryptoManager
 from .storage import EncryptedStorage
@@ -14,7 +19,12 @@ from .embedder import Embedder
 from .vectordb import VectorDB
 from .ml_organizer import MLOrganizer
 from .ingestion import IngestionPipeline
-from .cache import get_cache, cached
+from .cache import get_cache
+from .config import Config
+from .executors import run_in_executor, shutdown_executors
+from .hybrid_search import FUSION_METHODS, SEARCH_MODES, tag_filter
+from .singleflight import AsyncSingleFlight, SingleFlight
+from sqlalchemy import func
 from sqlmodel import select
 from .models import Document, Tag, Cluster
 import threading
@@ -41,6 +51,10 @@ class SearchRequest(BaseModel):
     query: str
     limit: int = 10
     tag: Optional[str] = None
+    mode: Optional[str] = None  # "vector", "keyword" or "hybrid" (default Config.SEARCH_MODE)
+    vector_weight: Optional[float] = None  # Hybrid fusion weights (default Config.HYBRID_SEARCH_*_WEIGHT)
+    keyword_weight: Optional[float] = None
+    fusion: Optional[str] = None  # "rrf" or "score" (default Config.HYBRID_FUSION)
 
 
 class SearchResult(BaseModel):
@@ -94,9 +108,50 @@ _pipeline: Optional[IngestionPipeline] = None
 _hybrid_searcher = None
 _anonymizer = None
 _chatbot = None
+_llm_providers = None
+_chatbot_lock = threading.Lock()
 _startup_event: Optional[threading.Event] = None
 _email_watchers: List = []
 
+# Coalesce identical in-flight requests (dashboard widgets fire them together)
+_search_flight = AsyncSingleFlight("search")
+_stats_flight = SingleFlight("stats")
+_warroom_flight = AsyncSingleFlight("warroom")
+
+# HTTP requests being served; the daemon's ML scheduler backs off while any are
+_in_flight = 0
+
+
+class InFlightCounter:
+    """
+    Pure ASGI middleware counting requests until their response body is sent.
+
+    (@app.middleware("http") returns as soon as the headers are out, so a
+    streamed chat answer would stop counting while it is still generating.)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        global _in_flight
+        _in_flight += 1  # Only ever touched on the event loop thread
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+
+app.add_middleware(InFlightCounter)
+
+
+def requests_in_flight() -> int:
+    return _in_flight
+
+
 # Rebuild state for background task tracking
 _rebuild_state = {
     "status": "idle",  # idle, running, complete, error
@@ -134,6 +189,11 @@ async def startup():
     """Initialize services on startup (only if not already initialized by daemon)"""
     global _db, _crypto, _storage, _embedder, _vectordb, _pipeline
 
+    # Bound the threadpool that runs sync (blocking) endpoints
+    import anyio.to_thread
+    from .config import Config
+    anyio.to_thread.current_default_thread_limiter().total_tokens = Config.API_THREADPOOL_SIZE
+
     if _pipeline is not None:
         # Already initialized by daemon
         if _startup_event:
@@ -153,15 +213,15 @@ async def startup():
         print(f"[WARN] Crypto not unlocked: {e}")
 
     _db = Database()
+    _db.start_maintenance()
     _storage = EncryptedStorage(_crypto) if _crypto.is_unlocked else None
     _embedder = Embedder()
     _vectordb = VectorDB()
     _vectordb.initialize(dimension=_embedder.dimension)
 
     if _crypto.is_unlocked and _storage:
-        session = _db.session()
-        ml_organizer = MLOrganizer(_embedder, session)
-        _pipeline = IngestionPipeline(session, _storage, _embedder, _vectordb, ml_organizer)
+        ml_organizer = MLOrganizer(_embedder, _db, _vectordb)
+        _pipeline = IngestionPipeline(_db, _storage, _embedder, _vectordb, ml_organizer)
         print("[OK] Ingestion pipeline ready")
     else:
         print("[WARN] Ingestion pipeline not available (crypto locked)")
@@ -172,6 +232,14 @@ async def startup():
         _startup_event.set()  # Signal that API is ready
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Release executor threads and stop DB maintenance"""
+    shutdown_executors()
+    if _db:
+        _db.stop_maintenance()
+
+
 @app.get("/")
 async def root():
     """Health check"""
@@ -192,7 +260,7 @@ async def status_page():
 
 
 @app.post("/add")
-async def add_text(request: AddTextRequest):
+def add_text(request: AddTextRequest):
     """Add text document"""
     if not _pipeline:
         raise HTTPException(status_code=503, detail="Ingestion pipeline not available")
@@ -216,17 +284,21 @@ async def add_file(file: UploadFile = File(...), force: bool = False):
     temp_dir = Path(tempfile.gettempdir())
     temp_path = temp_dir / file.filename
     content = await file.read()
-    temp_path.write_bytes(content)
+    await run_in_executor("io", temp_path.write_bytes, content)
 
     try:
-        doc_id = _pipeline.ingest_file(temp_path)
+        doc_id = await run_in_executor("io", _pipeline.ingest_file, temp_path)
         if doc_id is None:
             raise HTTPException(status_code=500, detail="Failed to ingest file (may be duplicate)")
 
         # Get chunk count for the response
         from .models import Chunk
-        session = _db.session()
-        chunks = session.exec(select(Chunk).where(Chunk.doc_id == doc_id)).all()
+
+        def _load_chunks():
+            with _db.read_session() as session:
+                return session.exec(select(Chunk).where(Chunk.doc_id == doc_id)).all()
+
+        chunks = await run_in_executor("io", _load_chunks)
 
         return {
             "id": str(doc_id),
@@ -253,13 +325,16 @@ async def check_duplicate(request: CheckDuplicateRequest) -> CheckDuplicateRespo
 
     try:
         # Embed the sample
-        query_vector = _embedder.embed(sample)
+        query_vector = await run_in_executor("embed", _embedder.embed, sample)
 
         # Search for similar content
-        results = _vectordb.search(
+        results = await run_in_executor(
+            "io",
+            _vectordb.search,
             query_vector=query_vector,
             limit=3,
         )
+        results = await run_in_executor("io", chunk_store.hydrate_hits, _db, results, False)
 
         # Check for high-similarity matches
         matches = []
@@ -290,195 +365,278 @@ async def check_duplicate(request: CheckDuplicateRequest) -> CheckDuplicateRespo
         return CheckDuplicateResponse(is_duplicate=False, confidence=0, matches=[])
 
 
-@app.post("/search")
-async def search(request: SearchRequest) -> List[SearchResult]:
-    """Semantic search with caching"""
-    if not _embedder or not _vectordb:
-        raise HTTPException(status_code=503, detail="Search not available")
-
-    # Check cache first
-    cache = get_cache()
-    cache_key = f"search:{request.query}:{request.limit}:{request.tag}"
-    cached_result = cache.get(cache_key)
-
-    if cached_result is not None:
-        return cached_result
+def _search_generation(tag: Optional[str] = None) -> str:
+    """Cache generation for a search scope ("-" if the database isn't available)"""
+    if not _db:
+        return "-"
+    with _db.read_session() as session:
+        return counters.generation_token(session, tag=tag)
+
+
+async def _run_search(request: SearchRequest, mode: str, cache_key: str) -> List[SearchResult]:
+    """Retrieve, fuse and format - the work shared by coalesced /search calls"""
+    use_keyword = mode != "vector" and _hybrid_searcher is not None and _hybrid_searcher.enabled
+    use_vector = mode != "keyword"
+    candidates = request.limit * Config.HYBRID_CANDIDATE_MULTIPLIER if use_keyword and use_vector else request.limit
+
+    async def vector_hits() -> List[dict]:
+        if not use_vector:
+            return []
+        query_vector = await run_in_executor("embed", _embedder.embed, request.query)
+        filter_dict = await run_in_executor("io", tag_filter, _db, request.tag)
+        return await run_in_executor(
+            "io",
+            _vectordb.search,
+            query_vector=query_vector,
+            limit=candidates,
+            filter_dict=filter_dict,
+        )
 
-    # Embed query
-    query_vector = _embedder.embed(request.query)
+    async def keyword_hits() -> List[dict]:
+        if not use_keyword:
+            return []
+        return await run_in_executor(
+            "io", _hybrid_searcher.keyword_search, request.query, candidates, request.tag)
+
+    if use_keyword and use_vector and _hybrid_searcher.native:
+        # Dense + sparse in one batched Qdrant query
+        query_vector = await run_in_executor("embed", _embedder.embed, request.query)
+        vector_results, keyword_results = await run_in_executor(
+            "io", _hybrid_searcher.native_search, query_vector, request.query, candidates, request.tag)
+    else:
+        # Both retrievers run concurrently
+        vector_results, keyword_results = await asyncio.gather(vector_hits(), keyword_hits())
+
+    if use_keyword and use_vector:
+        results = _hybrid_searcher.combine(
+            vector_results,
+            keyword_results,
+            limit=request.limit,
+            vector_weight=request.vector_weight,
+            bm25_weight=request.keyword_weight,
+            fusion=request.fusion,
+        )
+    else:
+        results = (vector_results or keyword_results)[:request.limit]
 
-    # Search
-    filter_dict = {"tag": request.tag} if request.tag else None
-    results = _vectordb.search(
-        query_vector=query_vector,
-        limit=request.limit,
-        filter_dict=filter_dict,
-    )
+    # Full chunk text from SQLite (one batched query; payloads only hold ids)
+    results = await run_in_executor("io", chunk_store.hydrate_hits, _db, results)
 
     # Format results
     search_results = []
     for hit in results:
         search_results.append(
             SearchResult(
-                id=hit["id"],
-                score=hit["score"],
+                id=str(hit["id"]),
+                score=hit.get("hybrid_score", hit["score"]),
                 text=hit["payload"].get("text", ""),
                 source=hit["payload"].get("source", ""),
                 created_at="",  # TODO: add from payload
             )
         )
 
-    # Cache for 5 minutes
-    cache.set(cache_key, search_results)
+    # Cached before the flight finishes, so a request arriving just after sees it
+    get_cache().set(cache_key, search_results, ttl=Config.SEARCH_CACHE_TTL_SECONDS)
 
     return search_results
 
 
+@app.post("/search")
+async def search(request: SearchRequest) -> List[SearchResult]:
+    """Vector, keyword or hybrid (fused) search with caching"""
+    mode = request.mode or Config.SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    if request.fusion and request.fusion not in FUSION_METHODS:
+        raise HTTPException(status_code=400, detail=f"fusion must be one of {', '.join(FUSION_METHODS)}")
+    if mode != "keyword" and (not _embedder or not _vectordb):
+        raise HTTPException(status_code=503, detail="Search not available")
+    if mode == "keyword" and (_hybrid_searcher is None or not _hybrid_searcher.enabled):
+        raise HTTPException(status_code=503, detail="Keyword index not available")
+
+    # Check cache first - the key embeds the generation of the scope being searched,
+    # so any ingest into that scope makes old entries unreachable
+    cache = get_cache()
+    generation = await run_in_executor("io", _search_generation, request.tag)
+    cache_key = (
+        f"search:{generation}:{request.query}:{request.limit}:{request.tag}:{mode}:"
+        f"{request.vector_weight}:{request.keyword_weight}:{request.fusion}"
+    )
+    cached_result = cache.get(cache_key)
+
+    if cached_result is not None:
+        return cached_result
+
+    # Identical searches already in flight share one embed + scan
+    return await _search_flight.do(cache_key, lambda: _run_search(request, mode, cache_key))
+
+
 class EmailListRequest(BaseModel):
     days: int = 7
     limit: int = 50
-    sender: Optional[str] = None
+    sender: Optional[str] = None  # Full address = exact (indexed) match, otherwise substring
+    keyword: Optional[str] = None  # Matches subject or preview
+    since: Optional[datetime] = None  # Overrides days
+    until: Optional[datetime] = None
+    cursor: Optional[str] = None  # next_cursor from the previous page
+
+
+def _encode_email_cursor(sent_at: datetime, doc_id) -> str:
+    import base64
+    raw = f"{sent_at.isoformat()}|{doc_id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_email_cursor(cursor: str):
+    import base64
+    from uuid import UUID
+    try:
+        sent_at, doc_hex = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(sent_at), UUID(hex=doc_hex)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @app.post("/emails/list")
-async def list_emails(request: EmailListRequest):
-    """Get structured list of emails with metadata"""
+def list_emails(request: EmailListRequest):
+    """Get structured list of emails with metadata (keyset-paginated)"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    from datetime import datetime, timedelta
-    from sqlmodel import or_
+    from datetime import timedelta
+    from sqlmodel import and_, or_
+    from .models import EmailMetadata
 
-    session = _db.session()
-    cutoff = datetime.utcnow() - timedelta(days=request.days)
+    limit = max(1, min(request.limit, 500))
+    since = request.since or (datetime.utcnow() - timedelta(days=request.days))
 
-    # Query emails from the database
-    query = select(Document).where(
-        Document.source.like("email:%"),
-        Document.created_at >= cutoff
-    ).order_by(Document.created_at.desc()).limit(request.limit)
+    query = (
+        select(EmailMetadata, Document.source, Document.preview)
+        .join(Document, Document.id == EmailMetadata.doc_id)
+        .where(EmailMetadata.sent_at >= since)
+    )
+    if request.until:
+        query = query.where(EmailMetadata.sent_at < request.until)
 
-    docs = session.exec(query).all()
+    if request.sender:
+        sender = request.sender.strip().lower()
+        if "@" in sender and " " not in sender:
+            query = query.where(EmailMetadata.sender_email == sender)
+        else:
+            query = query.where(func.lower(EmailMetadata.sender).contains(sender))
 
-    emails = []
-    for doc in docs:
-        # Parse email metadata from source and raw_text
-        source_parts = doc.source.split(":", 1) if doc.source else ["email", ""]
-        email_info = source_parts[1] if len(source_parts) > 1 else ""
-
-        # Extract sender from raw_text if available
-        sender = ""
-        subject = ""
-        raw = doc.raw_text or ""
-
-        # Simple extraction from email content
-        lines = raw.split("\n")
-        for line in lines[:10]:  # Check first 10 lines for headers
-            if line.lower().startswith("from:"):
-                sender = line[5:].strip()
-            elif line.lower().startswith("subject:"):
-                subject = line[8:].strip()
-
-        # If no subject found, use first line as preview
-        if not subject and lines:
-            subject = lines[0][:100] + ("..." if len(lines[0]) > 100 else "")
+    if request.keyword:
+        keyword = request.keyword.strip()
+        query = query.where(or_(
+            EmailMetadata.subject.ilike(f"%{keyword}%"),
+            Document.preview.ilike(f"%{keyword}%"),
+        ))
+
+    if request.cursor:
+        cursor_at, cursor_id = _decode_email_cursor(request.cursor)
+        query = query.where(or_(
+            EmailMetadata.sent_at < cursor_at,
+            and_(EmailMetadata.sent_at == cursor_at, EmailMetadata.doc_id < cursor_id),
+        ))
+
+    # One extra row tells us whether there is another page
+    query = query.order_by(EmailMetadata.sent_at.desc(), EmailMetadata.doc_id.desc()).limit(limit + 1)
+
+    with _db.read_session() as session:
+        rows = session.exec(query).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
+    emails = []
+    for meta, source, preview in rows:
+        preview = preview or ""
         emails.append({
-            "id": doc.id,
-            "sender": sender or email_info,
-            "subject": subject,
-            "date": doc.created_at.isoformat() if doc.created_at else "",
-            "preview": raw[:200] + ("..." if len(raw) > 200 else ""),
-            "source": doc.source
+            "id": meta.doc_id,
+            "sender": meta.sender,
+            "recipients": meta.recipients.split(",") if meta.recipients else [],
+            "subject": meta.subject,
+            "date": meta.sent_at.isoformat() if meta.sent_at else "",
+            "thread_id": meta.thread_id,
+            "preview": preview[:200] + ("..." if len(preview) > 200 else ""),
+            "source": source,
         })
 
-    # Filter by sender if specified
-    if request.sender:
-        sender_lower = request.sender.lower()
-        emails = [e for e in emails if sender_lower in e["sender"].lower()]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1][0]
+        next_cursor = _encode_email_cursor(last.sent_at, last.doc_id)
 
     return {
         "count": len(emails),
         "emails": emails,
-        "period_days": request.days
+        "period_days": request.days,
+        "next_cursor": next_cursor,
     }
 
 
 @app.get("/documents/{doc_id}")
-async def get_document(doc_id: str):
+def get_document(doc_id: str):
     """Get document by ID"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    session = _db.session()
-    doc = session.get(Document, doc_id)
+    from uuid import UUID
+    from .content_store import load_text
+
+    try:
+        doc_uuid = UUID(doc_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    with _db.read_session() as session:
+        doc = session.get(Document, doc_uuid)
+        text = load_text(session, doc_uuid) if doc else None
 
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    text = text if text is not None else doc.preview
     return {
         "id": str(doc.id),
         "source": doc.source,
-        "text": doc.raw_text[:500] + "..." if len(doc.raw_text) > 500 else doc.raw_text,
+        "text": text[:500] + "..." if len(text) > 500 else text,
         "created_at": doc.created_at.isoformat(),
     }
 
 
-@app.get("/stats")
-async def get_stats() -> StatsResponse:
-    """Get database statistics (cached)"""
-    if not _db:
-        raise HTTPException(status_code=503, detail="Database not available")
-
-    # Check cache
-    cache = get_cache()
-    cached_stats = cache.get("stats")
-    if cached_stats:
-        return StatsResponse(**cached_stats)
-
-    session = _db.session()
-
-    documents = session.exec(select(Document)).all()
-    total_docs = len(documents)
-    total_tags = len(session.exec(select(Tag)).all())
-    total_clusters = len(session.exec(select(Cluster)).all())
+def _compute_stats() -> dict:
+    """Build the /stats payload from the materialized counters"""
+    with _db.read_session() as session:
+        stats_rows = counters.read_counters(session)
     total_chunks = _vectordb.count() if _vectordb else 0
 
-    # Count by source type and track most recent email
-    emails = 0
-    docs = 0
-    notes = 0
-    last_email_at = None
-
-    for doc in documents:
-        source = doc.source.lower() if doc.source else ""
-        if "email" in source or "@" in source or "outlook" in source or source.startswith("/o="):
-            emails += 1
-            # Track most recent email - use created_at as ingestion timestamp
-            if doc.created_at:
-                if last_email_at is None or doc.created_at > last_email_at:
-                    last_email_at = doc.created_at
-        elif source in ("api", "paste", "note", "text", "saved-chat", "saved-response") or source.startswith("note:"):
-            notes += 1
-        else:
-            docs += 1
+    # Most recent email - created_at is the ingestion timestamp
+    last_email_at = counters.get_last_at(stats_rows, counters.SOURCE_PREFIX + "emails")
 
-    stats = {
-        "total_documents": total_docs,
+    return {
+        "total_documents": counters.get_count(stats_rows, counters.DOCUMENTS),
         "total_chunks": total_chunks,
-        "total_tags": total_tags,
-        "total_clusters": total_clusters,
+        "total_tags": counters.get_count(stats_rows, counters.TAGS),
+        "total_clusters": counters.get_count(stats_rows, counters.CLUSTERS),
         "sources": {
-            "emails": emails,
-            "documents": docs,
-            "notes": notes,
+            "emails": counters.get_count(stats_rows, counters.SOURCE_PREFIX + "emails"),
+            "documents": counters.get_count(stats_rows, counters.SOURCE_PREFIX + "documents"),
+            "notes": counters.get_count(stats_rows, counters.SOURCE_PREFIX + "notes"),
         },
         "last_email_at": last_email_at.isoformat() if last_email_at else None,
     }
 
-    # Cache for 30 seconds only (emails can arrive frequently)
-    cache.set("stats", stats, ttl=30)
 
+@app.get("/stats")
+def get_stats() -> StatsResponse:
+    """Get database statistics (cached, stale-while-revalidate)"""
+    if not _db:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    # Fresh for STATS_CACHE_TTL_SECONDS; after that the old value is served
+    # while one background thread recomputes it
+    stats = get_cache().get_or_refresh("stats", lambda: _stats_flight.do("stats", _compute_stats))
     return StatsResponse(**stats)
 
 
@@ -495,30 +653,31 @@ async def get_summary_endpoint(summary_name: str):
 
 
 @app.get("/tags")
-async def get_tags() -> List[dict]:
+def get_tags() -> List[dict]:
     """Get all tags"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    session = _db.session()
-    tags = session.exec(select(Tag)).all()
-
-    # Count by tag
-    from collections import Counter
+    from sqlalchemy import func
 
-    tag_counts = Counter([t.tag for t in tags])
+    # Count by tag in SQL (served from the tag index)
+    tag_count = func.count(Tag.id)
+    with _db.read_session() as session:
+        tag_counts = session.exec(
+            select(Tag.tag, tag_count).group_by(Tag.tag).order_by(tag_count.desc())
+        ).all()
 
-    return [{"tag": tag, "count": count} for tag, count in tag_counts.most_common()]
+    return [{"tag": tag, "count": count} for tag, count in tag_counts]
 
 
 @app.get("/clusters")
-async def get_clusters() -> List[dict]:
+def get_clusters() -> List[dict]:
     """Get all clusters with their labels and document counts"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    session = _db.session()
-    clusters = session.exec(select(Cluster).order_by(Cluster.document_count.desc())).all()
+    with _db.read_session() as session:
+        clusters = session.exec(select(Cluster).order_by(Cluster.document_count.desc())).all()
 
     return [
         {
@@ -533,25 +692,25 @@ async def get_clusters() -> List[dict]:
 
 
 @app.get("/clusters/{cluster_id}/documents")
-async def get_cluster_documents(cluster_id: int, limit: int = 20) -> List[dict]:
+def get_cluster_documents(cluster_id: int, limit: int = 20) -> List[dict]:
     """Get documents in a specific cluster"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    session = _db.session()
-    docs = session.exec(
-        select(Document)
-        .where(Document.cluster_id == cluster_id)
-        .order_by(Document.updated_at.desc())
-        .limit(limit)
-    ).all()
+    with _db.read_session() as session:
+        docs = session.exec(
+            select(Document)
+            .where(Document.cluster_id == cluster_id)
+            .order_by(Document.updated_at.desc())
+            .limit(limit)
+        ).all()
 
     return [
         {
             "id": str(d.id),
             "source": d.source,
             "source_type": d.source_type,
-            "preview": d.raw_text[:200] if d.raw_text else "",
+            "preview": d.preview[:200] if d.preview else "",
             "created_at": d.created_at.isoformat() if d.created_at else None
         }
         for d in docs
@@ -561,34 +720,41 @@ async def get_cluster_documents(cluster_id: int, limit: int = 20) -> List[dict]:
 @app.post("/clusters/rebuild")
 async def rebuild_clusters(min_cluster_size: int = 10, min_samples: int = 5):
     """Manually trigger cluster rebuild"""
-    if not _db or not _embedder:
-        raise HTTPException(status_code=503, detail="Database or embedder not available")
+    if not _db or not _vectordb:
+        raise HTTPException(status_code=503, detail="Database or vector store not available")
 
     from .ml_organizer import MLOrganizer
     import traceback
 
     try:
-        session = _db.session()
-        organizer = MLOrganizer(_embedder, session)
-
-        # Force has_changes to trigger clustering
-        organizer._last_doc_count = -1
-
-        result = organizer.run_clustering(min_cluster_size=min_cluster_size, min_samples=min_samples)
-
-        return {
-            "status": result.get("status", "unknown"),
-            "clusters": result.get("clusters", 0),
-            "message": f"Created {result.get('clusters', 0)} clusters from {result.get('doc_count', 0)} documents"
-        }
+        # Stored document vectors are cached on disk, so a fresh organizer is cheap
+        organizer = MLOrganizer(_embedder, _db, _vectordb)
+
+        result = await run_in_executor(
+            "cpu",
+            organizer.run_clustering,
+            min_cluster_size=min_cluster_size,
+            min_samples=min_samples,
+            force=True,
+        )
     except Exception as e:
         print(f"[API] Cluster rebuild failed: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Clustering failed: {str(e)}")
 
+    if result.get("status") == "busy":
+        raise HTTPException(status_code=409, detail="A cluster fit is already running")
+    if result.get("status") == "error":
+        raise HTTPException(status_code=500, detail=f"Clustering failed: {result.get('reason')}")
+    return {
+        "status": result.get("status", "unknown"),
+        "clusters": result.get("clusters", 0),
+        "message": f"Created {result.get('clusters', 0)} clusters from {result.get('doc_count', 0)} documents"
+    }
+
 
 @app.get("/dashboard/stats")
-async def get_dashboard_stats():
+def get_dashboard_stats():
     """Get comprehensive dashboard statistics"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -596,70 +762,60 @@ async def get_dashboard_stats():
     from sqlalchemy import func
     from datetime import datetime, timedelta
 
-    session = _db.session()
+    yesterday = datetime.now() - timedelta(days=1)
+    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # Total documents
-    total_docs = len(session.exec(select(Document)).all())
+    # Totals come from the materialized counters; the rest are indexed range
+    # queries that only touch the columns they need (never raw_text)
+    with _db.read_session() as session:
+        stats_rows = counters.read_counters(session)
 
-    # Documents by type
-    docs_by_type = session.exec(
-        select(Document.source_type, func.count(Document.id))
-        .group_by(Document.source_type)
-    ).all()
+        # Recent documents (last 24 hours)
+        docs_last_24h = session.scalar(
+            select(func.count(Document.id)).where(Document.updated_at >= yesterday)
+        )
+        recent_docs = session.exec(
+            select(Document.source, Document.source_type, Document.updated_at)
+            .where(Document.updated_at >= yesterday)
+            .order_by(Document.updated_at.desc())
+            .limit(10)
+        ).all()
 
-    # Recent documents (last 24 hours)
-    yesterday = datetime.now() - timedelta(days=1)
-    recent_docs = session.exec(
-        select(Document)
-        .where(Document.updated_at >= yesterday)
-        .order_by(Document.updated_at.desc())
-    ).all()
-
-    # Latest document timestamp
-    latest_doc = session.exec(
-        select(Document)
-        .order_by(Document.updated_at.desc())
-    ).first()
-
-    # Earliest document timestamp
-    earliest_doc = session.exec(
-        select(Document)
-        .order_by(Document.created_at.asc())
-    ).first()
+        # Latest / earliest document timestamps
+        latest_ingestion = session.scalar(select(func.max(Document.updated_at)))
+        earliest_ingestion = session.scalar(select(func.min(Document.created_at)))
+
+        # Documents ingested today
+        docs_today = session.scalar(
+            select(func.count(Document.id)).where(Document.created_at >= today_start)
+        )
 
     # Total chunks in vector DB
     total_chunks = _vectordb.count() if _vectordb else 0
 
-    # Total tags
-    total_tags = len(session.exec(select(Tag)).all())
-
-    # Total clusters
-    total_clusters = len(session.exec(select(Cluster)).all())
-
-    # Documents ingested today
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    docs_today = len(session.exec(
-        select(Document)
-        .where(Document.created_at >= today_start)
-    ).all())
+    docs_by_type = sorted(
+        counters.with_prefix(stats_rows, counters.TYPE_PREFIX).items(),
+        key=lambda item: item[1],
+        reverse=True,
+    )
 
     return {
-        "total_documents": total_docs,
+        "total_documents": counters.get_count(stats_rows, counters.DOCUMENTS),
         "total_chunks": total_chunks,
-        "total_tags": total_tags,
-        "total_clusters": total_clusters,
-        "docs_today": docs_today,
-        "docs_last_24h": len(recent_docs),
-        "latest_ingestion": latest_doc.updated_at.isoformat() if latest_doc else None,
-        "earliest_ingestion": earliest_doc.created_at.isoformat() if earliest_doc else None,
+        "total_tags": counters.get_count(stats_rows, counters.TAGS),
+        "total_clusters": counters.get_count(stats_rows, counters.CLUSTERS),
+        "docs_today": docs_today or 0,
+        "docs_last_24h": docs_last_24h or 0,
+        "latest_ingestion": latest_ingestion.isoformat() if latest_ingestion else None,
+        "earliest_ingestion": earliest_ingestion.isoformat() if earliest_ingestion else None,
         "docs_by_type": [{"type": t, "count": c} for t, c in docs_by_type],
         "recent_documents": [
             {
-                "source": doc.source[:100],
-                "type": doc.source_type,
-                "updated_at": doc.updated_at.isoformat()
+                "source": source[:100],
+                "type": source_type,
+                "updated_at": updated_at.isoformat()
             }
-            for doc in recent_docs[:10]
+            for source, source_type, updated_at in recent_docs
         ],
         "daemon_status": "running",
         "crypto_unlocked": _crypto.is_unlocked if _crypto else False,
@@ -674,28 +830,27 @@ class AddEmailRequest(BaseModel):
 
 
 @app.post("/email/add")
-async def add_email(request: AddEmailRequest):
+def add_email(request: AddEmailRequest):
     """Add email account for watching"""
     if not _db or not _crypto:
         raise HTTPException(status_code=503, detail="Service not available")
 
     from .models import EmailCredential
 
-    session = _db.session()
+    with _db.write_session() as session:
+        # Encrypt password
+        encrypted_password = _crypto.encrypt_str(request.password)
 
-    # Encrypt password
-    encrypted_password = _crypto.encrypt_str(request.password)
-
-    # Save credential
-    cred = EmailCredential(
-        email_address=request.email_address,
-        encrypted_password=encrypted_password,
-        imap_server=request.imap_server,
-        imap_port=request.imap_port,
-    )
+        # Save credential
+        cred = EmailCredential(
+            email_address=request.email_address,
+            encrypted_password=encrypted_password,
+            imap_server=request.imap_server,
+            imap_port=request.imap_port,
+        )
 
-    session.add(cred)
-    session.commit()
+        session.add(cred)
+        session.commit()
 
     return {
         "success": True,
@@ -703,16 +858,40 @@ async def add_email(request: AddEmailRequest):
     }
 
 
+def _get_chatbot():
+    """The shared ChatBot (created on first use; provider clients live in _llm_providers)"""
+    global _chatbot, _llm_providers
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                from .chatbot import ChatBot
+                from .llm_providers import ProviderRegistry
+
+                _llm_providers = ProviderRegistry(_db, _crypto)
+                _chatbot = ChatBot(
+                    database=_db,
+                    crypto=_crypto,
+                    embedder=_embedder,
+                    vectordb=_vectordb,
+                    hybrid_searcher=_hybrid_searcher,
+                    anonymizer=_anonymizer,
+                    providers=_llm_providers,
+                )
+    return _chatbot
+
+
 # Chat request/response models
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    search_mode: Optional[str] = None  # Retrieval: "vector", "keyword" or "hybrid"
 
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     sources: List[dict] = []
+    cached: bool = False
 
 
 @app.post("/chat")
@@ -720,30 +899,25 @@ async def chat(request: ChatRequest):
     """Chat with your data using RAG"""
     if not _db or not _crypto or not _embedder or not _vectordb:
         raise HTTPException(status_code=503, detail="Service not available")
-
-    from .chatbot import ChatBot
-
-    session = _db.session()
+    if request.search_mode and request.search_mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"search_mode must be one of {', '.join(SEARCH_MODES)}")
 
     try:
-        chatbot = ChatBot(
-            session=session,
-            crypto=_crypto,
-            embedder=_embedder,
-            vectordb=_vectordb,
-            hybrid_searcher=_hybrid_searcher,
-            anonymizer=_anonymizer,
-        )
+        chatbot = _get_chatbot()
 
-        result = chatbot.chat(
+        result = await run_in_executor(
+            "llm",
+            chatbot.chat,
             message=request.message,
             conversation_id=request.conversation_id,
+            search_mode=request.search_mode,
         )
 
         return ChatResponse(
             response=result["response"],
             conversation_id=str(result["conversation_id"]),
             sources=result.get("sources", []),
+            cached=result.get("cached", False),
         )
 
     except ValueError as e:
@@ -752,6 +926,58 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chat with your data, streamed as Server-Sent Events.
+
+    Events: conversation, sources, token (repeated), done - or error.
+    """
+    if not _db or not _crypto or not _embedder or not _vectordb:
+        raise HTTPException(status_code=503, detail="Service not available")
+    if request.search_mode and request.search_mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"search_mode must be one of {', '.join(SEARCH_MODES)}")
+
+    events = _get_chatbot().chat_stream(
+        message=request.message, conversation_id=request.conversation_id, search_mode=request.search_mode)
+    finished = object()
+
+    async def event_stream():
+        # The generator blocks on retrieval and the provider's HTTP stream, so each
+        # step runs on the llm pool; the event loop only forwards the chunks
+        step = None
+        try:
+            while True:
+                step = asyncio.ensure_future(run_in_executor("llm", next, events, finished))
+                event = await asyncio.shield(step)
+                if event is finished:
+                    break
+                yield _sse(event["event"], event["data"])
+        except ValueError as e:
+            yield _sse("error", {"status": 400, "detail": str(e)})
+        except Exception as e:
+            yield _sse("error", {"status": 500, "detail": f"Chat failed: {str(e)}"})
+        finally:
+            # Client went away mid-answer: this task is being cancelled, so shield the
+            # cleanup - let the running step finish, then close the generator, which
+            # closes the provider's HTTP stream
+            with anyio.CancelScope(shield=True):
+                if step is not None and not step.done():
+                    await asyncio.wait([step])
+                await run_in_executor("llm", events.close)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class ChatDebugRequest(BaseModel):
     message: str
 
@@ -765,7 +991,6 @@ async def chat_debug(request: ChatDebugRequest):
     from .chatbot import ChatBot
     from . import summaries
 
-    session = _db.session()
     query = request.message
 
     debug_info = {
@@ -775,7 +1000,7 @@ async def chat_debug(request: ChatDebugRequest):
         "summary_keywords_checked": {},
         "vector_results_count": 0,
         "vector_results_preview": [],
-        "hybrid_search_enabled": _hybrid_searcher is not None,
+        "hybrid_search_enabled": _hybrid_searcher is not None and _hybrid_searcher.enabled,
     }
 
     # Check which summary keywords would match
@@ -798,8 +1023,9 @@ async def chat_debug(request: ChatDebugRequest):
             debug_info["summary_matched"] = category
 
     # Get vector search results
-    query_vector = _embedder.embed(query)
-    vector_results = _vectordb.search(query_vector=query_vector, limit=10)
+    query_vector = await run_in_executor("embed", _embedder.embed, query)
+    vector_results = await run_in_executor("io", _vectordb.search, query_vector=query_vector, limit=10)
+    vector_results = await run_in_executor("io", chunk_store.hydrate_hits, _db, vector_results)
     debug_info["vector_results_count"] = len(vector_results)
 
     for hit in vector_results[:5]:
@@ -846,33 +1072,9 @@ class WarRoomResponse(BaseModel):
     stats: dict = {}
 
 
-@app.post("/warroom")
-async def get_warroom_data(request: WarRoomRequest) -> WarRoomResponse:
-    """Get War Room intelligence view for a topic"""
+def _analyze_warroom_text(all_text: str, sources: List[dict]) -> dict:
+    """Regex-based intelligence extraction for the War Room view (CPU-bound)"""
     import re
-    from datetime import datetime
-
-    if not _db or not _embedder or not _vectordb:
-        raise HTTPException(status_code=503, detail="Service not available")
-
-    # Search for related documents
-    query_vector = _embedder.embed(request.query)
-    results = _vectordb.search(query_vector=query_vector, limit=50)
-
-    # Aggregate all text for analysis
-    all_text = request.context or ""
-    sources = []
-
-    for hit in results:
-        payload = hit.get("payload", {})
-        text = payload.get("text", "")
-        source = payload.get("source", "")
-        all_text += f"\n{text}"
-        sources.append({
-            "source": source,
-            "text": text[:200],
-            "score": hit.get("score", 0)
-        })
 
     # Extract timeline events
     timeline = []
@@ -986,19 +1188,59 @@ async def get_warroom_data(request: WarRoomRequest) -> WarRoomResponse:
         "actions": len(actions)
     }
 
+    return {
+        "timeline": timeline,
+        "people": people,
+        "topics": topics,
+        "actions": actions,
+        "issues": issues,
+        "documents": documents,
+        "stats": stats,
+    }
+
+
+async def _run_warroom(request: WarRoomRequest) -> WarRoomResponse:
+    """Search + analysis for /warroom (shared by coalesced calls)"""
+    from datetime import datetime
+
+    # Search for related documents
+    query_vector = await run_in_executor("embed", _embedder.embed, request.query)
+    results = await run_in_executor("io", _vectordb.search, query_vector=query_vector, limit=50)
+    results = await run_in_executor("io", chunk_store.hydrate_hits, _db, results)
+
+    # Aggregate all text for analysis
+    all_text = request.context or ""
+    sources = []
+
+    for hit in results:
+        payload = hit.get("payload", {})
+        text = payload.get("text", "")
+        source = payload.get("source", "")
+        all_text += f"\n{text}"
+        sources.append({
+            "source": source,
+            "text": text[:200],
+            "score": hit.get("score", 0)
+        })
+
+    analysis = await run_in_executor("cpu", _analyze_warroom_text, all_text, sources)
+
     return WarRoomResponse(
         status="Active" if len(results) > 0 else "No Data",
         lastUpdate=datetime.now().strftime("%Y-%m-%d"),
-        timeline=timeline,
-        people=people,
-        topics=topics,
-        actions=actions,
-        issues=issues,
-        documents=documents,
-        stats=stats
+        **analysis
     )
 
 
+@app.post("/warroom")
+async def get_warroom_data(request: WarRoomRequest) -> WarRoomResponse:
+    """Get War Room intelligence view for a topic"""
+    if not _db or not _embedder or not _vectordb:
+        raise HTTPException(status_code=503, detail="Service not available")
+
+    return await _warroom_flight.do((request.query, request.context), lambda: _run_warroom(request))
+
+
 # API Key management
 class ApiKeyRequest(BaseModel):
     service: str
@@ -1013,7 +1255,7 @@ class DatabaseInfoResponse(BaseModel):
 
 
 @app.get("/database/info")
-async def get_database_info() -> DatabaseInfoResponse:
+def get_database_info() -> DatabaseInfoResponse:
     """Get current database information and list available databases"""
     from .config import Config
 
@@ -1047,24 +1289,23 @@ class ApiStatusResponse(BaseModel):
 
 
 @app.get("/api-keys/status")
-async def get_api_keys_status() -> ApiStatusResponse:
+def get_api_keys_status() -> ApiStatusResponse:
     """Check which API keys are configured"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
     from .models import ApiKey
 
-    session = _db.session()
+    with _db.read_session() as session:
+        # Check for OpenAI key
+        openai_key = session.exec(
+            select(ApiKey).where(ApiKey.service == "openai", ApiKey.enabled == True)
+        ).first()
 
-    # Check for OpenAI key
-    openai_key = session.exec(
-        select(ApiKey).where(ApiKey.service == "openai", ApiKey.enabled == True)
-    ).first()
-
-    # Check for Anthropic key
-    anthropic_key = session.exec(
-        select(ApiKey).where(ApiKey.service == "anthropic", ApiKey.enabled == True)
-    ).first()
+        # Check for Anthropic key
+        anthropic_key = session.exec(
+            select(ApiKey).where(ApiKey.service == "anthropic", ApiKey.enabled == True)
+        ).first()
 
     return ApiStatusResponse(
         openai=openai_key is not None,
@@ -1073,41 +1314,44 @@ async def get_api_keys_status() -> ApiStatusResponse:
 
 
 @app.post("/api-key")
-async def add_api_key(request: ApiKeyRequest):
+def add_api_key(request: ApiKeyRequest):
     """Add or update an API key"""
     if not _db or not _crypto:
         raise HTTPException(status_code=503, detail="Service not available")
 
     from .models import ApiKey
 
-    session = _db.session()
+    with _db.write_session() as session:
+        # Check if key already exists
+        existing = session.exec(
+            select(ApiKey).where(ApiKey.service == request.service)
+        ).first()
 
-    # Check if key already exists
-    existing = session.exec(
-        select(ApiKey).where(ApiKey.service == request.service)
-    ).first()
+        encrypted_key = _crypto.encrypt_str(request.api_key)
 
-    encrypted_key = _crypto.encrypt_str(request.api_key)
+        if existing:
+            existing.encrypted_key = encrypted_key
+            existing.enabled = True
+            session.add(existing)
+        else:
+            api_key = ApiKey(
+                service=request.service,
+                encrypted_key=encrypted_key,
+                enabled=True,
+            )
+            session.add(api_key)
 
-    if existing:
-        existing.encrypted_key = encrypted_key
-        existing.enabled = True
-        session.add(existing)
-    else:
-        api_key = ApiKey(
-            service=request.service,
-            encrypted_key=encrypted_key,
-            enabled=True,
-        )
-        session.add(api_key)
+        session.commit()
 
-    session.commit()
+    # Next chat turn decrypts the new key and opens a fresh client
+    if _llm_providers:
+        _llm_providers.invalidate(request.service)
 
     return {"success": True, "message": f"API key for {request.service} saved"}
 
 
 @app.get("/admin/info")
-async def get_admin_info():
+def get_admin_info():
     """Get comprehensive system information for administrators"""
     import platform
     import sys
@@ -1138,6 +1382,7 @@ async def get_admin_info():
             "chunk_overlap": Config.CHUNK_OVERLAP,
             "cache_ttl_seconds": Config.CACHE_TTL_SECONDS,
             "cache_max_size": Config.CACHE_MAX_SIZE,
+            "cache_max_mb": Config.CACHE_MAX_MB,
             "semantic_threshold": Config.SEMANTIC_SIMILARITY_THRESHOLD,
             "hybrid_vector_weight": Config.HYBRID_SEARCH_VECTOR_WEIGHT,
             "hybrid_bm25_weight": Config.HYBRID_SEARCH_BM25_WEIGHT,
@@ -1160,10 +1405,11 @@ async def get_admin_info():
     # Database info
     if _db:
         try:
-            session = _db.session()
-            doc_count = len(session.exec(select(Document)).all())
-            tag_count = len(session.exec(select(Tag)).all())
-            cluster_count = len(session.exec(select(Cluster)).all())
+            with _db.read_session() as session:
+                stats_rows = counters.read_counters(session)
+            doc_count = counters.get_count(stats_rows, counters.DOCUMENTS)
+            tag_count = counters.get_count(stats_rows, counters.TAGS)
+            cluster_count = counters.get_count(stats_rows, counters.CLUSTERS)
 
             # Get database file size
             db_path = Config.DATABASE_PATH
@@ -1194,6 +1440,7 @@ async def get_admin_info():
             info["vectordb"] = {
                 "vectors": vector_count,
                 "dimension": _embedder.dimension if _embedder else 0,
+                "sparse_vectors": _vectordb.has_sparse,
                 "folder_size_mb": round(qdrant_size / (1024 * 1024), 2),
             }
         except Exception as e:
@@ -1228,8 +1475,9 @@ def _run_rebuild_background():
         _rebuild_state["error_messages"] = []
         _rebuild_state["message"] = "Starting rebuild..."
 
-        session = _db.session()
-        chunks = session.exec(select(Chunk)).all()
+        with _db.read_session() as session:
+            chunks = session.exec(select(Chunk)).all()
+            doc_sources = dict(session.exec(select(Document.id, Document.source)).all())
         total_chunks = len(chunks)
         _rebuild_state["total_chunks"] = total_chunks
 
@@ -1238,6 +1486,11 @@ def _run_rebuild_background():
             _rebuild_state["message"] = "No chunks to index"
             return
 
+        # Legacy single-vector collection: recreate it with dense + sparse vectors
+        if not _vectordb.has_sparse:
+            _rebuild_state["message"] = "Recreating collection with sparse vectors..."
+            _vectordb.recreate()
+
         for i, chunk in enumerate(chunks):
             try:
                 text = chunk.text if hasattr(chunk, 'text') else chunk.content
@@ -1247,8 +1500,7 @@ def _run_rebuild_background():
                     continue
 
                 # Get document source for metadata
-                doc = session.get(Document, chunk.doc_id)
-                source = doc.source if doc else "unknown"
+                source = doc_sources.get(chunk.doc_id, "unknown")
 
                 # Embed the text
                 embedding = _embedder.embed(text)
@@ -1258,12 +1510,12 @@ def _run_rebuild_background():
                     doc_id=str(chunk.id),
                     vector=embedding,
                     payload={
-                        "text": text[:2000],
                         "source": source,
                         "doc_id": str(chunk.doc_id),
                         "start_offset": chunk.start_offset,
                         "end_offset": chunk.end_offset,
-                    }
+                    },
+                    sparse=sparse_encoder.encode_document(text),
                 )
                 _rebuild_state["indexed"] += 1
 
@@ -1280,6 +1532,10 @@ def _run_rebuild_background():
                 _rebuild_state["rate_per_second"] = round(_rebuild_state["indexed"] / elapsed, 2)
             _rebuild_state["message"] = f"Processing chunk {i + 1}/{total_chunks}..."
 
+        # Every vector was rewritten - retire all cached search results
+        with _db.write_session() as session:
+            counters.bump_generations(session, [counters.REBUILD_GENERATION])
+
         # Complete
         _rebuild_state["status"] = "complete"
         _rebuild_state["progress"] = 100
@@ -1290,8 +1546,72 @@ def _run_rebuild_background():
         _rebuild_state["message"] = f"Rebuild failed: {str(e)}"
 
 
+@app.post("/admin/rebuild-stats")
+def rebuild_stats():
+    """Recompute the materialized stats counters from the base tables"""
+    if not _db:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    with _db.write_session() as session:
+        values = counters.rebuild_counters(session)
+
+    get_cache().invalidate("stats")
+    return {"status": "ok", "counters": values}
+
+
+@app.get("/admin/cache")
+def get_cache_stats():
+    """Response cache and single-flight counters"""
+    stats = get_cache().stats()
+    stats["chunk_text"] = chunk_store.get_chunk_cache().stats()
+    stats["single_flight"] = {
+        "search": _search_flight.stats(),
+        "stats": _stats_flight.stats(),
+        "warroom": _warroom_flight.stats(),
+    }
+    return stats
+
+
+@app.get("/admin/llm-providers")
+def get_llm_provider_status():
+    """Configured LLM providers and their circuit breaker state"""
+    if not _db or not _crypto:
+        raise HTTPException(status_code=503, detail="Service not available")
+    _get_chatbot()
+    return _llm_providers.status()
+
+
+@app.get("/admin/answer-cache")
+def get_answer_cache_stats():
+    """LLM answer cache size, hit counts and tokens/time saved"""
+    if not _db:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return answer_cache.stats(_db)
+
+
+@app.post("/admin/answer-cache/clear")
+def clear_answer_cache():
+    """Delete every cached LLM answer"""
+    if not _db:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return {"status": "ok", "removed": answer_cache.clear(_db)}
+
+
+@app.post("/admin/cache/clear")
+def clear_cache(namespace: Optional[str] = None, reset_stats: bool = False):
+    """Drop cached responses (one namespace, or everything)"""
+    cache = get_cache()
+    if namespace:
+        cache.invalidate_namespace(namespace)
+    else:
+        cache.clear()
+    if reset_stats:
+        cache.reset_stats()
+    return {"status": "ok", "namespace": namespace, "entries": cache.size()}
+
+
 @app.post("/admin/rebuild-vectors")
-async def rebuild_vectors():
+def rebuild_vectors():
     """
     Start rebuilding the vector database in the background.
     Returns immediately and tracks progress via /admin/rebuild-vectors/status
@@ -1341,7 +1661,7 @@ async def rebuild_vectors():
 
 
 @app.get("/admin/rebuild-vectors/status")
-async def rebuild_vectors_status():
+def rebuild_vectors_status():
     """Get current rebuild status including live progress during rebuild"""
     global _rebuild_state
 
@@ -1386,9 +1706,8 @@ async def rebuild_vectors_status():
         }
 
     # Idle state - return basic sync info
-    from .models import Chunk
-    session = _db.session()
-    total_chunks = len(session.exec(select(Chunk)).all())
+    with _db.read_session() as session:
+        total_chunks = counters.get_count(counters.read_counters(session), counters.CHUNKS)
 
     return {
         "status": "idle",
@@ -1418,26 +1737,25 @@ class SavedSearchResponse(BaseModel):
 
 
 @app.get("/saved-searches")
-async def get_saved_searches(folder: Optional[str] = None) -> List[SavedSearchResponse]:
+def get_saved_searches(folder: Optional[str] = None) -> List[SavedSearchResponse]:
     """Get all saved searches, optionally filtered by folder"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
     from .models import SavedSearch
 
-    session = _db.session()
-
-    if folder:
-        searches = session.exec(
-            select(SavedSearch)
-            .where(SavedSearch.folder == folder)
-            .order_by(SavedSearch.created_at.desc())
-        ).all()
-    else:
-        searches = session.exec(
-            select(SavedSearch)
-            .order_by(SavedSearch.created_at.desc())
-        ).all()
+    with _db.read_session() as session:
+        if folder:
+            searches = session.exec(
+                select(SavedSearch)
+                .where(SavedSearch.folder == folder)
+                .order_by(SavedSearch.created_at.desc())
+            ).all()
+        else:
+            searches = session.exec(
+                select(SavedSearch)
+                .order_by(SavedSearch.created_at.desc())
+            ).all()
 
     return [
         SavedSearchResponse(
@@ -1454,7 +1772,7 @@ async def get_saved_searches(folder: Optional[str] = None) -> List[SavedSearchRe
 
 
 @app.get("/saved-searches/folders")
-async def get_saved_search_folders() -> List[dict]:
+def get_saved_search_folders() -> List[dict]:
     """Get list of folders with saved search counts"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -1462,19 +1780,18 @@ async def get_saved_search_folders() -> List[dict]:
     from .models import SavedSearch
     from sqlalchemy import func
 
-    session = _db.session()
-
-    # Count searches by folder
-    folder_counts = session.exec(
-        select(SavedSearch.folder, func.count(SavedSearch.id))
-        .group_by(SavedSearch.folder)
-    ).all()
+    with _db.read_session() as session:
+        # Count searches by folder
+        folder_counts = session.exec(
+            select(SavedSearch.folder, func.count(SavedSearch.id))
+            .group_by(SavedSearch.folder)
+        ).all()
 
     return [{"folder": f, "count": c} for f, c in folder_counts]
 
 
 @app.post("/saved-searches")
-async def create_saved_search(request: SavedSearchRequest) -> SavedSearchResponse:
+def create_saved_search(request: SavedSearchRequest) -> SavedSearchResponse:
     """Save a search query and response"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -1482,20 +1799,19 @@ async def create_saved_search(request: SavedSearchRequest) -> SavedSearchRespons
     from .models import SavedSearch
     from datetime import datetime
 
-    session = _db.session()
-
-    saved = SavedSearch(
-        folder=request.folder,
-        query=request.query,
-        response=request.response,
-        sources=request.sources,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
-    )
+    with _db.write_session() as session:
+        saved = SavedSearch(
+            folder=request.folder,
+            query=request.query,
+            response=request.response,
+            sources=request.sources,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
 
-    session.add(saved)
-    session.commit()
-    session.refresh(saved)
+        session.add(saved)
+        session.commit()
+        session.refresh(saved)
 
     return SavedSearchResponse(
         id=saved.id,
@@ -1509,21 +1825,20 @@ async def create_saved_search(request: SavedSearchRequest) -> SavedSearchRespons
 
 
 @app.delete("/saved-searches/{search_id}")
-async def delete_saved_search(search_id: int):
+def delete_saved_search(search_id: int):
     """Delete a saved search"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
     from .models import SavedSearch
 
-    session = _db.session()
-
-    saved = session.get(SavedSearch, search_id)
-    if not saved:
-        raise HTTPException(status_code=404, detail="Saved search not found")
+    with _db.write_session() as session:
+        saved = session.get(SavedSearch, search_id)
+        if not saved:
+            raise HTTPException(status_code=404, detail="Saved search not found")
 
-    session.delete(saved)
-    session.commit()
+        session.delete(saved)
+        session.commit()
 
     return {"success": True, "message": "Saved search deleted"}
 
@@ -1559,7 +1874,7 @@ async def refresh_summaries():
 
 
 @app.post("/email/sync")
-async def sync_emails():
+def sync_emails():
     """
     Trigger immediate email sync from Outlook.
     Returns sync status and last email timestamp.
@@ -1614,18 +1929,17 @@ class ResourceAllocationResponse(BaseModel):
 
 
 @app.get("/resource-allocation/{week}")
-async def get_resource_allocation(week: str) -> Optional[ResourceAllocationResponse]:
+def get_resource_allocation(week: str) -> Optional[ResourceAllocationResponse]:
     """Get resource allocation for a specific week"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
     from .models import ResourceAllocation
 
-    session = _db.session()
-
-    allocation = session.exec(
-        select(ResourceAllocation).where(ResourceAllocation.week == week)
-    ).first()
+    with _db.read_session() as session:
+        allocation = session.exec(
+            select(ResourceAllocation).where(ResourceAllocation.week == week)
+        ).first()
 
     if not allocation:
         return None
@@ -1642,7 +1956,7 @@ async def get_resource_allocation(week: str) -> Optional[ResourceAllocationRespo
 
 
 @app.post("/resource-allocation")
-async def save_resource_allocation(request: ResourceAllocationRequest) -> ResourceAllocationResponse:
+def save_resource_allocation(request: ResourceAllocationRequest) -> ResourceAllocationResponse:
     """Save or update resource allocation for a week"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -1650,34 +1964,33 @@ async def save_resource_allocation(request: ResourceAllocationRequest) -> Resour
     from .models import ResourceAllocation
     from datetime import datetime
 
-    session = _db.session()
-
-    # Check if allocation exists for this week
-    existing = session.exec(
-        select(ResourceAllocation).where(ResourceAllocation.week == request.week)
-    ).first()
-
-    if existing:
-        existing.allocations = request.allocations
-        existing.project_notes = request.project_notes
-        existing.project_status = request.project_status
-        existing.updated_at = datetime.utcnow()
-        session.add(existing)
-        session.commit()
-        session.refresh(existing)
-        allocation = existing
-    else:
-        allocation = ResourceAllocation(
-            week=request.week,
-            allocations=request.allocations,
-            project_notes=request.project_notes,
-            project_status=request.project_status,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        session.add(allocation)
-        session.commit()
-        session.refresh(allocation)
+    with _db.write_session() as session:
+        # Check if allocation exists for this week
+        existing = session.exec(
+            select(ResourceAllocation).where(ResourceAllocation.week == request.week)
+        ).first()
+
+        if existing:
+            existing.allocations = request.allocations
+            existing.project_notes = request.project_notes
+            existing.project_status = request.project_status
+            existing.updated_at = datetime.utcnow()
+            session.add(existing)
+            session.commit()
+            session.refresh(existing)
+            allocation = existing
+        else:
+            allocation = ResourceAllocation(
+                week=request.week,
+                allocations=request.allocations,
+                project_notes=request.project_notes,
+                project_status=request.project_status,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            session.add(allocation)
+            session.commit()
+            session.refresh(allocation)
 
     return ResourceAllocationResponse(
         id=allocation.id,
@@ -1691,20 +2004,19 @@ async def save_resource_allocation(request: ResourceAllocationRequest) -> Resour
 
 
 @app.get("/resource-allocation")
-async def list_resource_allocations(limit: int = 52) -> List[ResourceAllocationResponse]:
+def list_resource_allocations(limit: int = 52) -> List[ResourceAllocationResponse]:
     """List all resource allocations (most recent first)"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
 
     from .models import ResourceAllocation
 
-    session = _db.session()
-
-    allocations = session.exec(
-        select(ResourceAllocation)
-        .order_by(ResourceAllocation.week.desc())
-        .limit(limit)
-    ).all()
+    with _db.read_session() as session:
+        allocations = session.exec(
+            select(ResourceAllocation)
+            .order_by(ResourceAllocation.week.desc())
+            .limit(limit)
+        ).all()
 
     return [
         ResourceAllocationResponse(
@@ -1738,7 +2050,7 @@ class StakeholderDataResponse(BaseModel):
 
 
 @app.get("/stakeholders")
-async def get_stakeholders() -> Optional[StakeholderDataResponse]:
+def get_stakeholders() -> Optional[StakeholderDataResponse]:
     """Get stakeholder CRM data"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -1746,11 +2058,10 @@ async def get_stakeholders() -> Optional[StakeholderDataResponse]:
     from .models import StakeholderData
     import json
 
-    session = _db.session()
-
-    data = session.exec(
-        select(StakeholderData).where(StakeholderData.data_key == "default")
-    ).first()
+    with _db.read_session() as session:
+        data = session.exec(
+            select(StakeholderData).where(StakeholderData.data_key == "default")
+        ).first()
 
     if not data:
         return None
@@ -1765,7 +2076,7 @@ async def get_stakeholders() -> Optional[StakeholderDataResponse]:
 
 
 @app.post("/stakeholders")
-async def save_stakeholders(request: StakeholderDataRequest) -> StakeholderDataResponse:
+def save_stakeholders(request: StakeholderDataRequest) -> StakeholderDataResponse:
     """Save stakeholder CRM data"""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -1774,32 +2085,31 @@ async def save_stakeholders(request: StakeholderDataRequest) -> StakeholderDataR
     from datetime import datetime
     import json
 
-    session = _db.session()
-
-    # Check if data exists
-    existing = session.exec(
-        select(StakeholderData).where(StakeholderData.data_key == "default")
-    ).first()
-
-    if existing:
-        existing.stakeholders = json.dumps(request.stakeholders)
-        existing.meetings = json.dumps(request.meetings)
-        existing.updated_at = datetime.utcnow()
-        session.add(existing)
-        session.commit()
-        session.refresh(existing)
-        data = existing
-    else:
-        data = StakeholderData(
-            data_key="default",
-            stakeholders=json.dumps(request.stakeholders),
-            meetings=json.dumps(request.meetings),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        session.add(data)
-        session.commit()
-        session.refresh(data)
+    with _db.write_session() as session:
+        # Check if data exists
+        existing = session.exec(
+            select(StakeholderData).where(StakeholderData.data_key == "default")
+        ).first()
+
+        if existing:
+            existing.stakeholders = json.dumps(request.stakeholders)
+            existing.meetings = json.dumps(request.meetings)
+            existing.updated_at = datetime.utcnow()
+            session.add(existing)
+            session.commit()
+            session.refresh(existing)
+            data = existing
+        else:
+            data = StakeholderData(
+                data_key="default",
+                stakeholders=json.dumps(request.stakeholders),
+                meetings=json.dumps(request.meetings),
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            session.add(data)
+            session.commit()
+            session.refresh(data)
 
     return StakeholderDataResponse(
         id=data.id,
@@ -1811,7 +2121,7 @@ async def save_stakeholders(request: StakeholderDataRequest) -> StakeholderDataR
 
 
 @app.post("/email/reset-state")
-async def reset_email_state():
+def reset_email_state():
     """Reset Outlook watcher state to force re-processing of recent emails"""
     if not _email_watchers:
         raise HTTPException(status_code=503, detail="No email watchers configured")
@@ -1855,25 +2165,20 @@ async def reset_email_state():
 
 
 @app.get("/email/status")
-async def email_status():
+def email_status():
     """Get email sync status - last sync time, watcher status, etc."""
     if not _db:
         raise HTTPException(status_code=503, detail="Database not initialized")
 
-    session = _db.session()
-
-    # Get last email timestamp
+    # Get last email timestamp from the materialized counters
     last_email_at = None
     email_count = 0
 
     try:
-        documents = session.exec(select(Document)).all()
-        for doc in documents:
-            source = (doc.source or "").lower()
-            if "email" in source or "@" in source or "outlook" in source:
-                email_count += 1
-                if last_email_at is None or doc.created_at > last_email_at:
-                    last_email_at = doc.created_at
+        with _db.read_session() as session:
+            stats_rows = counters.read_counters(session)
+        email_count = counters.get_count(stats_rows, counters.SOURCE_PREFIX + "emails")
+        last_email_at = counters.get_last_at(stats_rows, counters.SOURCE_PREFIX + "emails")
     except Exception:
         pass
 
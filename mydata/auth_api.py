@@ -4,7 +4,6 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response, Cookie
 from fastapi.responses import HTMLResponse, RedirectResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from sqlmodel import Session
 from .database import Database
 from .auth_service import AuthService
 from .auth_models import User
@@ -40,18 +39,20 @@ class ResendVerificationRequest(BaseModel):
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 # Dependencies
-def get_db_session():
-    db = Database()
-    session = db.session()
-    try:
-        yield session
-    finally:
-        session.close()
+_database: Optional[Database] = None
 
 
-def get_auth_service(session: Session = Depends(get_db_session)) -> AuthService:
+def get_database() -> Database:
+    """One Database (and connection pools) for all auth requests"""
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
+
+
+def get_auth_service(database: Database = Depends(get_database)) -> AuthService:
     email_service = EmailService()
-    return AuthService(session, email_service)
+    return AuthService(database, email_service)
 
 
 def get_current_user(
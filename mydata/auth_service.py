@@ -5,7 +5,7 @@ import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlmodel import select
 from .auth_models import User, UserSession, LoginAttempt
 from .email_service import EmailService
 
@@ -22,8 +22,10 @@ ACCESS_TOKEN_EXPIRE_HOURS = 24
 class AuthService:
     """Handle user authentication and management"""
 
-    def __init__(self, session: Session, email_service: Optional[EmailService] = None):
-        self.session = session
+    def __init__(self, database, email_service: Optional[EmailService] = None):
+        # Each operation takes its own short read_session() / write_session();
+        # password hashing and email sending happen outside the write lock
+        self.database = database
         self.email_service = email_service or EmailService()
 
     def hash_password(self, password: str) -> str:
@@ -77,14 +79,6 @@ class AuthService:
         if not self.is_valid_email_domain(email):
             return False, "Only @vysusgroup.com email addresses are allowed", None
 
-        # Check if user already exists
-        existing_user = self.session.exec(
-            select(User).where(User.email == email)
-        ).first()
-
-        if existing_user:
-            return False, "Email already registered", None
-
         # Create user
         verification_token = secrets.token_urlsafe(32)
         user = User(
@@ -98,9 +92,18 @@ class AuthService:
             verification_token_expires=datetime.utcnow() + timedelta(hours=24)
         )
 
-        self.session.add(user)
-        self.session.commit()
-        self.session.refresh(user)
+        with self.database.write_session() as session:
+            # Check if user already exists
+            existing_user = session.exec(
+                select(User).where(User.email == email)
+            ).first()
+
+            if existing_user:
+                return False, "Email already registered", None
+
+            session.add(user)
+            session.flush()
+            session.refresh(user)
 
         # Send verification email
         self.email_service.send_verification_email(
@@ -119,25 +122,25 @@ class AuthService:
 
     def verify_email(self, token: str) -> Tuple[bool, str]:
         """Verify user email with token"""
-        user = self.session.exec(
-            select(User).where(User.verification_token == token)
-        ).first()
+        with self.database.write_session() as session:
+            user = session.exec(
+                select(User).where(User.verification_token == token)
+            ).first()
 
-        if not user:
-            return False, "Invalid verification token"
+            if not user:
+                return False, "Invalid verification token"
 
-        if user.email_verified:
-            return True, "Email already verified. You can log in."
+            if user.email_verified:
+                return True, "Email already verified. You can log in."
 
-        if user.verification_token_expires and datetime.utcnow() > user.verification_token_expires:
-            return False, "Verification token expired. Please request a new one."
+            if user.verification_token_expires and datetime.utcnow() > user.verification_token_expires:
+                return False, "Verification token expired. Please request a new one."
 
-        # Verify email
-        user.email_verified = True
-        user.verification_token = None
-        user.verification_token_expires = None
-        self.session.add(user)
-        self.session.commit()
+            # Verify email
+            user.email_verified = True
+            user.verification_token = None
+            user.verification_token_expires = None
+            session.add(user)
 
         # Send welcome email
         self.email_service.send_welcome_email(
@@ -160,9 +163,10 @@ class AuthService:
         Returns: (success, message, token, user)
         """
         # Find user
-        user = self.session.exec(
-            select(User).where(User.email == email.lower())
-        ).first()
+        with self.database.read_session() as session:
+            user = session.exec(
+                select(User).where(User.email == email.lower())
+            ).first()
 
         # Log attempt
         attempt = LoginAttempt(
@@ -171,55 +175,53 @@ class AuthService:
             ip_address=ip_address
         )
 
+        failure = None
         if not user or not self.verify_password(password, user.hashed_password):
-            self.session.add(attempt)
-            self.session.commit()
-            return False, "Invalid email or password", None, None
+            failure = "Invalid email or password"
+        elif not user.is_active:
+            failure = "Account is not active. Please contact administrator."
+        elif not user.email_verified:
+            failure = "Please verify your email before logging in. Check your inbox."
 
-        if not user.is_active:
-            self.session.add(attempt)
-            self.session.commit()
-            return False, "Account is not active. Please contact administrator.", None, None
-
-        if not user.email_verified:
-            self.session.add(attempt)
-            self.session.commit()
-            return False, "Please verify your email before logging in. Check your inbox.", None, None
+        if failure:
+            with self.database.write_session() as session:
+                session.add(attempt)
+            return False, failure, None, None
 
         # Successful login
         attempt.success = True
-        self.session.add(attempt)
 
         # Update last login
         user.last_login = datetime.utcnow()
-        self.session.add(user)
 
         # Create session token
         token = self.create_access_token(user.id, user.email)
 
         # Store session
-        session = UserSession(
+        user_session = UserSession(
             user_id=user.id,
             token=token,
             expires_at=datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS),
             ip_address=ip_address,
             user_agent=user_agent
         )
-        self.session.add(session)
-        self.session.commit()
+        with self.database.write_session() as session:
+            session.add(attempt)
+            session.merge(user)
+            session.add(user_session)
 
         return True, "Login successful", token, user
 
     def logout_user(self, token: str) -> bool:
         """Log out user by invalidating token"""
-        session = self.session.exec(
-            select(UserSession).where(UserSession.token == token)
-        ).first()
+        with self.database.write_session() as session:
+            user_session = session.exec(
+                select(UserSession).where(UserSession.token == token)
+            ).first()
 
-        if session:
-            self.session.delete(session)
-            self.session.commit()
-            return True
+            if user_session:
+                session.delete(user_session)
+                return True
 
         return False
 
@@ -231,20 +233,21 @@ class AuthService:
             return None
 
         # Check if session exists
-        session = self.session.exec(
-            select(UserSession).where(UserSession.token == token)
-        ).first()
+        with self.database.read_session() as session:
+            user_session = session.exec(
+                select(UserSession).where(UserSession.token == token)
+            ).first()
+            user = session.get(User, int(payload["sub"])) if user_session else None
 
-        if not session:
+        if not user_session:
             return None
 
-        if datetime.utcnow() > session.expires_at:
-            self.session.delete(session)
-            self.session.commit()
+        if datetime.utcnow() > user_session.expires_at:
+            with self.database.write_session() as session:
+                session.delete(session.merge(user_session))
             return None
 
         # Get user
-        user = self.session.get(User, int(payload["sub"]))
         if not user or not user.is_active or not user.email_verified:
             return None
 
@@ -252,20 +255,20 @@ class AuthService:
 
     def request_password_reset(self, email: str) -> Tuple[bool, str]:
         """Request password reset"""
-        user = self.session.exec(
-            select(User).where(User.email == email.lower())
-        ).first()
+        with self.database.write_session() as session:
+            user = session.exec(
+                select(User).where(User.email == email.lower())
+            ).first()
 
-        if not user:
-            # Don't reveal if email exists
-            return True, "If that email is registered, you will receive a password reset link."
+            if not user:
+                # Don't reveal if email exists
+                return True, "If that email is registered, you will receive a password reset link."
 
-        # Generate reset token
-        reset_token = secrets.token_urlsafe(32)
-        user.reset_token = reset_token
-        user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
-        self.session.add(user)
-        self.session.commit()
+            # Generate reset token
+            reset_token = secrets.token_urlsafe(32)
+            user.reset_token = reset_token
+            user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+            session.add(user)
 
         # Send reset email
         self.email_service.send_password_reset_email(
@@ -278,51 +281,51 @@ class AuthService:
 
     def reset_password(self, token: str, new_password: str) -> Tuple[bool, str]:
         """Reset password with token"""
-        user = self.session.exec(
-            select(User).where(User.reset_token == token)
-        ).first()
-
-        if not user:
-            return False, "Invalid reset token"
-
-        if user.reset_token_expires and datetime.utcnow() > user.reset_token_expires:
-            return False, "Reset token expired. Please request a new one."
-
-        # Reset password
-        user.hashed_password = self.hash_password(new_password)
-        user.reset_token = None
-        user.reset_token_expires = None
-        self.session.add(user)
-
-        # Invalidate all sessions
-        sessions = self.session.exec(
-            select(UserSession).where(UserSession.user_id == user.id)
-        ).all()
-        for session in sessions:
-            self.session.delete(session)
-
-        self.session.commit()
+        hashed_password = self.hash_password(new_password)
+        with self.database.write_session() as session:
+            user = session.exec(
+                select(User).where(User.reset_token == token)
+            ).first()
+
+            if not user:
+                return False, "Invalid reset token"
+
+            if user.reset_token_expires and datetime.utcnow() > user.reset_token_expires:
+                return False, "Reset token expired. Please request a new one."
+
+            # Reset password
+            user.hashed_password = hashed_password
+            user.reset_token = None
+            user.reset_token_expires = None
+            session.add(user)
+
+            # Invalidate all sessions
+            user_sessions = session.exec(
+                select(UserSession).where(UserSession.user_id == user.id)
+            ).all()
+            for user_session in user_sessions:
+                session.delete(user_session)
 
         return True, "Password reset successfully. You can now log in with your new password."
 
     def resend_verification_email(self, email: str) -> Tuple[bool, str]:
         """Resend verification email"""
-        user = self.session.exec(
-            select(User).where(User.email == email.lower())
-        ).first()
-
-        if not user:
-            return False, "Email not found"
-
-        if user.email_verified:
-            return False, "Email already verified"
-
-        # Generate new token
-        verification_token = secrets.token_urlsafe(32)
-        user.verification_token = verification_token
-        user.verification_token_expires = datetime.utcnow() + timedelta(hours=24)
-        self.session.add(user)
-        self.session.commit()
+        with self.database.write_session() as session:
+            user = session.exec(
+                select(User).where(User.email == email.lower())
+            ).first()
+
+            if not user:
+                return False, "Email not found"
+
+            if user.email_verified:
+                return False, "Email already verified"
+
+            # Generate new token
+            verification_token = secrets.token_urlsafe(32)
+            user.verification_token = verification_token
+            user.verification_token_expires = datetime.utcnow() + timedelta(hours=24)
+            session.add(user)
 
         # Send email
         self.email_service.send_verification_email(
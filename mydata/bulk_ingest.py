@@ -411,10 +411,9 @@ Unknown files: {len(unknown):,}
         vectordb = VectorDB(path=qdrant_path)
         vectordb.initialize(dimension=embedder.dimension)
 
-        session = db.session()
-        ml_organizer = MLOrganizer(embedder, session)
+        ml_organizer = MLOrganizer(embedder, db, vectordb)
 
-        return IngestionPipeline(session, storage, embedder, vectordb, ml_organizer)
+        return IngestionPipeline(db, storage, embedder, vectordb, ml_organizer)
 
 
 def main():
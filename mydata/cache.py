@@ -1,67 +1,351 @@
-"""Simple in-memory cache for API responses with LRU eviction"""
+"""In-memory cache for API responses: thread-safe, byte-bounded, instrumented
 
+Keys are namespaced by the text before the first ':' ("search:...", "stats").
+Each namespace has its own TTL, optional byte quota and optional
+stale-while-revalidate window. Entries live in lock-striped LRU shards so the
+uvicorn threadpool and background threads never contend on a single lock.
+"""
+
+import sys
+import threading
 import time
-from typing import Optional, Any, Dict, OrderedDict
-from functools import wraps
 from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import Config
+
+
+@dataclass
+class CachePolicy:
+    """Per-namespace settings"""
+    ttl: Optional[int] = None        # Seconds; None = cache default
+    max_bytes: Optional[int] = None  # Quota for the namespace; None = only the global budget
+    stale_ttl: int = 0               # Serve expired entries this much longer while refreshing
+
+
+@dataclass
+class _Entry:
+    value: Any
+    timestamp: float
+    ttl: float
+    size: int
+
+
+def estimate_size(value: Any, max_objects: int = 20000) -> int:
+    """
+    Approximate deep size of a value in bytes.
+
+    Walks containers, pydantic models and plain objects. Stops after max_objects
+    objects so a pathological value can't stall a request.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    visited = 0
+
+    while stack and visited < max_objects:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        visited += 1
+        total += sys.getsizeof(obj, 64)
+
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+        elif hasattr(obj, "__slots__"):
+            stack.extend(getattr(obj, s) for s in obj.__slots__ if hasattr(obj, s))
+
+    return total
+
+
+class _Shard:
+    """One stripe: namespace -> LRU OrderedDict, guarded by its own lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.namespaces: Dict[str, "OrderedDict[str, _Entry]"] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def total_bytes(self) -> int:
+        return sum(self.bytes.values())
+
+    def total_entries(self) -> int:
+        return sum(len(entries) for entries in self.namespaces.values())
 
 
 class SimpleCache:
-    """TTL-based cache with LRU eviction and max size"""
+    """TTL cache with per-namespace quotas, global byte/entry budgets and LRU eviction"""
 
-    def __init__(self, ttl_seconds: int = 300, max_size: int = 1000):
-        self.cache: OrderedDict[str, Dict] = OrderedDict()
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_size: int = 1000,
+        max_bytes: Optional[int] = None,
+        stripes: int = 16,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+    ):
         self.ttl = ttl_seconds
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.policies: Dict[str, CachePolicy] = dict(policies or {})
+        self._shards = [_Shard() for _ in range(max(1, stripes))]
+
+        # Counters are updated under the shard lock of the key they describe,
+        # then summed on read - no global lock on the hot path
+        self._stats: List[Dict[str, Dict[str, int]]] = [{} for _ in self._shards]
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+
+    # ----- internals -----
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _shard_index(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def _policy(self, namespace: str) -> CachePolicy:
+        return self.policies.get(namespace) or CachePolicy()
+
+    def _count(self, index: int, namespace: str, name: str, n: int = 1) -> None:
+        ns_stats = self._stats[index].setdefault(namespace, {})
+        ns_stats[name] = ns_stats.get(name, 0) + n
+
+    def _remove(self, shard: _Shard, namespace: str, key: str) -> None:
+        entry = shard.namespaces[namespace].pop(key)
+        shard.bytes[namespace] -= entry.size
+
+    def _evict_oldest(self, index: int, shard: _Shard, namespace: Optional[str] = None) -> bool:
+        """Evict the LRU entry of a namespace (or of the whole shard)"""
+        if namespace is None:
+            candidates = [(entries[next(iter(entries))].timestamp, ns)
+                          for ns, entries in shard.namespaces.items() if entries]
+            if not candidates:
+                return False
+            namespace = min(candidates)[1]
+
+        entries = shard.namespaces.get(namespace)
+        if not entries:
+            return False
+        key = next(iter(entries))
+        self._remove(shard, namespace, key)
+        self._count(index, namespace, "evictions")
+        return True
+
+    def _lookup(self, key: str, allow_stale: bool) -> Tuple[Optional[Any], str]:
+        """Returns (value, state) where state is 'fresh', 'stale' or 'miss'"""
+        namespace = self._namespace(key)
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        stale_ttl = self._policy(namespace).stale_ttl
+
+        with shard.lock:
+            entries = shard.namespaces.get(namespace)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                self._count(index, namespace, "misses")
+                return None, "miss"
+
+            age = time.time() - entry.timestamp
+            if age < entry.ttl:
+                entries.move_to_end(key)
+                self._count(index, namespace, "hits")
+                return entry.value, "fresh"
+
+            if allow_stale and age < entry.ttl + stale_ttl:
+                self._count(index, namespace, "stale_hits")
+                return entry.value, "stale"
+
+            self._remove(shard, namespace, key)
+            self._count(index, namespace, "expirations")
+            self._count(index, namespace, "misses")
+            return None, "miss"
+
+    # ----- public API -----
 
     def get(self, key: str) -> Optional[Any]:
         """Get cached value if not expired (LRU: move to end)"""
-        if key in self.cache:
-            entry = self.cache[key]
-            # Use per-item TTL if set, otherwise default TTL
-            item_ttl = entry.get('ttl', self.ttl)
-            if time.time() - entry['timestamp'] < item_ttl:
-                # Move to end (most recently used)
-                self.cache.move_to_end(key)
-                return entry['value']
-            else:
-                # Expired, remove it
-                del self.cache[key]
-        return None
-
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set cache value with LRU eviction and optional per-item TTL"""
-        # Remove if exists (to update position)
-        if key in self.cache:
-            del self.cache[key]
-
-        # Add new entry
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time(),
-            'ttl': ttl if ttl is not None else self.ttl
-        }
+        value, _ = self._lookup(key, allow_stale=False)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, size: Optional[int] = None) -> None:
+        """Set cache value with per-item TTL, evicting LRU entries to stay within budgets"""
+        namespace = self._namespace(key)
+        policy = self._policy(namespace)
+        entry_ttl = ttl if ttl is not None else (policy.ttl if policy.ttl is not None else self.ttl)
+        entry_size = size if size is not None else estimate_size(value)
+
+        stripes = len(self._shards)
+        shard_max_bytes = self.max_bytes // stripes if self.max_bytes else None
+        shard_ns_quota = policy.max_bytes // stripes if policy.max_bytes else None
+        shard_max_entries = max(1, self.max_size // stripes)
+
+        # A single value larger than its whole share would evict everything else
+        if (shard_ns_quota and entry_size > shard_ns_quota) or (shard_max_bytes and entry_size > shard_max_bytes):
+            index = self._shard_index(key)
+            with self._shards[index].lock:
+                self._count(index, namespace, "rejected")
+            self.invalidate(key)
+            return
+
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        with shard.lock:
+            entries = shard.namespaces.setdefault(namespace, OrderedDict())
+            shard.bytes.setdefault(namespace, 0)
+            if key in entries:
+                self._remove(shard, namespace, key)
+
+            entries[key] = _Entry(value=value, timestamp=time.time(), ttl=entry_ttl, size=entry_size)
+            shard.bytes[namespace] += entry_size
+            self._count(index, namespace, "sets")
+
+            # Namespace quota first, then the shard's share of the global budgets
+            while shard_ns_quota and shard.bytes[namespace] > shard_ns_quota:
+                if not self._evict_oldest(index, shard, namespace):
+                    break
+            while shard_max_bytes and shard.total_bytes() > shard_max_bytes:
+                if not self._evict_oldest(index, shard):
+                    break
+            while shard.total_entries() > shard_max_entries:
+                if not self._evict_oldest(index, shard):
+                    break
 
-        # Evict oldest if over max size (FIFO/LRU)
-        while len(self.cache) > self.max_size:
-            self.cache.popitem(last=False)  # Remove oldest (first item)
+    def get_or_refresh(self, key: str, loader: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """
+        Stale-while-revalidate read.
+
+        Fresh hit: return it. Expired but inside the namespace's stale_ttl: return
+        the stale value and reload in a background thread (once per key).
+        Miss: load synchronously and cache.
+        """
+        value, state = self._lookup(key, allow_stale=True)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._refresh_in_background(key, loader, ttl)
+            return value
+
+        value = loader()
+        self.set(key, value, ttl=ttl)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl: Optional[int]) -> None:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.set(key, loader(), ttl=ttl)
+            except Exception as e:
+                print(f"[CACHE] Background refresh of {key!r} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="mydata-cache-refresh", daemon=True).start()
 
     def clear(self) -> None:
         """Clear all cache"""
-        self.cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.namespaces.clear()
+                shard.bytes.clear()
 
     def invalidate(self, key: str) -> None:
         """Invalidate specific key"""
-        if key in self.cache:
-            del self.cache[key]
+        namespace = self._namespace(key)
+        shard = self._shards[self._shard_index(key)]
+        with shard.lock:
+            entries = shard.namespaces.get(namespace)
+            if entries and key in entries:
+                self._remove(shard, namespace, key)
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        """Drop every entry in a namespace"""
+        for shard in self._shards:
+            with shard.lock:
+                shard.namespaces.pop(namespace, None)
+                shard.bytes.pop(namespace, None)
 
     def size(self) -> int:
-        """Get current cache size"""
-        return len(self.cache)
+        """Get current cache size (entries)"""
+        return sum(shard.total_entries() for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and memory use, overall and per namespace"""
+        namespaces: Dict[str, Dict[str, Any]] = {}
+
+        for index, shard in enumerate(self._shards):
+            with shard.lock:
+                for namespace, counts in self._stats[index].items():
+                    ns = namespaces.setdefault(namespace, {"entries": 0, "bytes": 0})
+                    for name, n in counts.items():
+                        ns[name] = ns.get(name, 0) + n
+                for namespace, entries in shard.namespaces.items():
+                    ns = namespaces.setdefault(namespace, {"entries": 0, "bytes": 0})
+                    ns["entries"] += len(entries)
+                    ns["bytes"] += shard.bytes.get(namespace, 0)
+
+        counter_names = ("hits", "stale_hits", "misses", "sets", "evictions", "expirations", "rejected")
+        totals = {name: 0 for name in counter_names + ("entries", "bytes")}
+        for namespace, ns in namespaces.items():
+            for name in counter_names:
+                ns.setdefault(name, 0)
+            lookups = ns["hits"] + ns["stale_hits"] + ns["misses"]
+            ns["hit_rate"] = round((ns["hits"] + ns["stale_hits"]) / lookups, 4) if lookups else None
+            policy = self._policy(namespace)
+            ns["policy"] = {"ttl": policy.ttl or self.ttl, "max_bytes": policy.max_bytes, "stale_ttl": policy.stale_ttl}
+            for name in totals:
+                totals[name] += ns[name]
+
+        lookups = totals["hits"] + totals["stale_hits"] + totals["misses"]
+        totals["hit_rate"] = round((totals["hits"] + totals["stale_hits"]) / lookups, 4) if lookups else None
+
+        return {
+            "config": {
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_size,
+                "max_bytes": self.max_bytes,
+                "stripes": len(self._shards),
+            },
+            "totals": totals,
+            "namespaces": namespaces,
+        }
+
+    def reset_stats(self) -> None:
+        """Zero the hit/miss/eviction counters (entries are kept)"""
+        for index, shard in enumerate(self._shards):
+            with shard.lock:
+                self._stats[index] = {}
 
 
 # Global cache instance
-_cache = SimpleCache(ttl_seconds=300)  # 5 minute TTL
+_cache = SimpleCache(
+    ttl_seconds=Config.CACHE_TTL_SECONDS,
+    max_size=Config.CACHE_MAX_SIZE,
+    max_bytes=Config.CACHE_MAX_MB * 1024 * 1024,
+    stripes=Config.CACHE_STRIPES,
+    policies={
+        "search": CachePolicy(
+            ttl=Config.SEARCH_CACHE_TTL_SECONDS,
+            max_bytes=Config.SEARCH_CACHE_MAX_MB * 1024 * 1024,
+        ),
+        "stats": CachePolicy(ttl=Config.STATS_CACHE_TTL_SECONDS, stale_ttl=Config.STATS_CACHE_STALE_SECONDS),
+    },
+)
 
 
 def cached(key_prefix: str = ""):
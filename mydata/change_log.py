@@ -0,0 +1,125 @@
+"""Change log of corpus writes for the ML scheduler
+
+Ingestion, deletion, tagging and cluster assignment append a row in the same
+transaction as the write, so the log says exactly what changed (including
+edits that leave every count the same). Consumers keep their own high-water
+mark over seq; rows every consumer has passed are pruned.
+
+A write's transaction wakes an in-process waiter (the daemon's scheduler) as
+soon as it commits; writes from other processes (CLI ingest) are found by
+polling latest_seq(). A process without a scheduler prunes on write instead,
+so the log stays bounded when no daemon is consuming it.
+"""
+
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import delete, event, func
+from sqlmodel import Session, select
+from .config import Config
+from .models import ChangeLog, CorpusStat
+
+DOCUMENT_ADDED = "document_added"
+DOCUMENT_DELETED = "document_deleted"
+TAGS_CHANGED = "tags_changed"
+CLUSTER_CHANGED = "cluster_changed"
+
+PRUNE_EVERY = 100  # Writes between prunes in a process without a scheduler
+
+# Committed-write counter; wait() compares it to what the waiter last saw, under
+# one lock, so a commit landing while the scheduler wakes up is never lost
+_changed = threading.Condition()
+_version = 0
+_seen = 0
+_consumer = threading.Event()
+_unconsumed_writes = 0
+
+
+def _wake(session) -> None:
+    global _version
+    with _changed:
+        _version += 1
+        _changed.notify_all()
+
+
+def _logged(session: Session) -> None:
+    """Wake the waiter once this transaction commits (it would read nothing before)"""
+    if not session.info.get("change_log_wake"):
+        session.info["change_log_wake"] = True
+        event.listen(session, "after_commit", _wake)
+
+    global _unconsumed_writes
+    if not _consumer.is_set():
+        _unconsumed_writes += 1
+        if _unconsumed_writes % PRUNE_EVERY == 0:
+            prune(session, prunable_seq(session))
+
+
+def record(
+    session: Session, kind: str, doc_id: Optional[UUID] = None, cluster_id: Optional[int] = None
+) -> None:
+    """Append a change (call inside the write's own transaction)"""
+    session.add(ChangeLog(kind=kind, doc_id=doc_id, cluster_id=cluster_id))
+    _logged(session)
+
+
+def record_many(session: Session, kind: str, doc_ids: Iterable[UUID]) -> None:
+    """Append one change per document as a single executemany insert"""
+    now = datetime.utcnow()
+    rows = [{"kind": kind, "doc_id": doc_id, "created_at": now} for doc_id in doc_ids]
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+        _logged(session)
+
+
+def wait(timeout: float) -> bool:
+    """Block until a change commits in this process since the last wait(), or timeout; True if one did"""
+    global _seen
+    with _changed:
+        fired = _changed.wait_for(lambda: _version != _seen, timeout)
+        _seen = _version
+    return fired
+
+
+def set_consumer(running: bool) -> None:
+    """Mark this process's scheduler as running (it prunes as it consumes) or stopped"""
+    if running:
+        _consumer.set()
+    else:
+        _consumer.clear()
+
+
+def consumer_running() -> bool:
+    return _consumer.is_set()
+
+
+def latest_seq(session: Session) -> int:
+    return session.scalar(select(func.max(ChangeLog.seq))) or 0
+
+
+def read_since(session: Session, after: int, upto: int, kinds: Iterable[str]) -> List[ChangeLog]:
+    """Changes of the given kinds with after < seq <= upto, oldest first"""
+    return session.exec(
+        select(ChangeLog)
+        .where(ChangeLog.seq > after, ChangeLog.seq <= upto, ChangeLog.kind.in_(list(kinds)))
+        .order_by(ChangeLog.seq)
+    ).all()
+
+
+def prune(session: Session, upto: int) -> None:
+    """Drop changes every consumer has processed"""
+    session.execute(delete(ChangeLog).where(ChangeLog.seq <= upto))
+
+
+def prunable_seq(session: Session) -> int:
+    """
+    Highest seq that can go without the scheduler running: what every stored
+    task watermark has passed, and anything beyond the newest CHANGE_LOG_MAX_ROWS.
+    """
+    from .counters import WATERMARK_PREFIX  # counters imports this module
+
+    consumed = session.scalar(
+        select(func.min(CorpusStat.value)).where(CorpusStat.name.startswith(WATERMARK_PREFIX))
+    ) or 0
+    return max(consumed, latest_seq(session) - Config.CHANGE_LOG_MAX_ROWS)
@@ -2,15 +2,20 @@
 
 import json
 import re
-from typing import List, Optional, Dict, Any, Tuple
-from sqlmodel import Session, select
-from .models import ChatConversation, ChatMessage, ApiKey, Document
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlmodel import select
+from .models import ChatConversation, ChatMessage, Document
+from .config import Config
+from .database import Database
 from .crypto import CryptoManager
 from .embedder import Embedder
 from .vectordb import VectorDB
 from .hybrid_search import HybridSearcher
-from .anonymizer import Anonymizer
-from . import summaries
+from .anonymizer import Anonymizer, StreamingDeanonymizer
+from .executors import get_executor
+from .llm_providers import ProviderRegistry
+from . import answer_cache, chunk_store, context_packer, conversation_memory, summaries
 
 
 class ChatBot:
@@ -18,70 +23,31 @@ class ChatBot:
 
     def __init__(
         self,
-        session: Session,
+        database: Database,
         crypto: CryptoManager,
         embedder: Embedder,
         vectordb: VectorDB,
         hybrid_searcher: Optional[HybridSearcher] = None,
         anonymizer: Optional[Anonymizer] = None,
+        providers: Optional[ProviderRegistry] = None,
     ):
-        self.session = session
+        self.database = database
         self.crypto = crypto
         self.embedder = embedder
         self.vectordb = vectordb
         self.hybrid_searcher = hybrid_searcher
         self.anonymizer = anonymizer
-        self._openai_client = None
-        self._anthropic_client = None
-        self._llm_provider = None  # Will be set to 'anthropic' or 'openai'
+        # Shared with the API so keys, connection pools and breakers outlive a request
+        self.providers = providers or ProviderRegistry(database, crypto)
+        self.memory = conversation_memory.ConversationSummarizer(database, self.providers, anonymizer)
 
     def _get_anthropic_client(self):
-        """Get Anthropic client with API key from encrypted storage"""
-        if self._anthropic_client is not None:
-            return self._anthropic_client
-
-        # Load API key from database
-        stmt = select(ApiKey).where(ApiKey.service == "anthropic", ApiKey.enabled == True)
-        api_key_record = self.session.exec(stmt).first()
-
-        if not api_key_record:
-            return None  # Anthropic not configured, will fall back to OpenAI
-
-        # Decrypt API key
-        api_key = self.crypto.decrypt_str(api_key_record.encrypted_key)
-
-        # Initialize Anthropic client
-        try:
-            import anthropic
-            self._anthropic_client = anthropic.Anthropic(api_key=api_key)
-        except ImportError:
-            return None  # anthropic package not installed
-
-        return self._anthropic_client
+        """Get Anthropic client (cached by the provider registry)"""
+        return self.providers.get_client("anthropic")
 
     def _get_openai_client(self):
-        """Get OpenAI client with API key from encrypted storage"""
-        if self._openai_client is not None:
-            return self._openai_client
-
-        # Load API key from database
-        stmt = select(ApiKey).where(ApiKey.service == "openai", ApiKey.enabled == True)
-        api_key_record = self.session.exec(stmt).first()
-
-        if not api_key_record:
-            return None  # OpenAI not configured
-
-        # Decrypt API key
-        api_key = self.crypto.decrypt_str(api_key_record.encrypted_key)
-
-        # Initialize OpenAI client
-        try:
-            from openai import OpenAI
-            self._openai_client = OpenAI(api_key=api_key)
-        except ImportError:
-            return None  # openai package not installed
-
-        return self._openai_client
+        """Get OpenAI client (cached by the provider registry)"""
+        return self.providers.get_client("openai")
 
     def get_active_llm_provider(self) -> str:
         """Return which LLM provider is active (for UI display)"""
@@ -93,45 +59,63 @@ class ChatBot:
             return "OpenAI"
         return "None"
 
-    def _retrieve_context(self, query: str, limit: int = 5) -> Tuple[List[Dict], str]:
+    def _embed(self, text: str):
+        """
+        Query embedding on the embed pool.
+
+        chat() itself runs on the API's llm pool; embedding there would let a
+        burst of chats bypass the embed pool's bound (and vice versa).
+        """
+        return get_executor("embed").submit(self.embedder.embed, text).result()
+
+    def _retrieve_context(
+        self,
+        query: str,
+        limit: int = 5,
+        token_budget: Optional[int] = None,
+        model: str = "gpt-4o",
+        mode: Optional[str] = None,
+    ) -> Tuple[List[Dict], str, Dict[str, int]]:
         """
         Retrieve relevant documents for RAG context.
 
+        Args:
+            query: Search query
+            limit: Candidate chunks to consider
+            token_budget: Context size in tokens (Config.CHAT_CONTEXT_TOKEN_BUDGET)
+            model: Model whose tokenizer counts the budget
+            mode: "vector", "keyword" or "hybrid" retrieval (Config.SEARCH_MODE)
+
         Returns:
-            Tuple of (results_list, formatted_context_string)
+            Tuple of (results_list, formatted_context_string, packing_stats)
         """
-        # Embed query
-        query_vector = self.embedder.embed(query)
+        mode = mode or Config.SEARCH_MODE
 
-        # Vector search (get more results for hybrid re-ranking)
-        vector_results = self.vectordb.search(
-            query_vector=query_vector,
-            limit=limit * 3,
-        )
-
-        # Apply hybrid search if available
+        # Keyword (BM25) and vector retrievers, rank-fused
         if self.hybrid_searcher:
-            results = self.hybrid_searcher.search(
-                query=query,
-                vector_results=vector_results,
-                limit=limit
-            )
+            results = self.hybrid_searcher.search(query, self._embed, limit=limit, mode=mode)
         else:
-            results = vector_results[:limit]
+            results = self.vectordb.search(query_vector=self._embed(query), limit=limit)
 
-        # Format context for LLM
-        context_parts = []
-        for i, hit in enumerate(results, 1):
-            text = hit.get("payload", hit).get("text", "")
-            source = hit.get("payload", hit).get("source", "unknown")
-            score = hit.get("hybrid_score", hit.get("score", 0))
+        # Payloads only carry ids - fetch the full chunk text in one query
+        results = chunk_store.hydrate_hits(self.database, results)
 
-            context_parts.append(
-                f"[Document {i}] (source: {source}, relevance: {score:.3f})\n{text}\n"
-            )
+        # Chunk ordinals within each document, for merging neighbours
+        positions = {
+            str(hit.get("id")): hit["payload"]["chunk_index"]
+            for hit in results
+            if hit["payload"].get("chunk_index") is not None
+        }
 
-        context_str = "\n".join(context_parts)
-        return results, context_str
+        # Dedupe, merge neighbouring chunks and fill the token budget best-first
+        results, context_str, stats = context_packer.pack_context(
+            results,
+            token_budget=token_budget if token_budget is not None else Config.CHAT_CONTEXT_TOKEN_BUDGET,
+            model=model,
+            positions=positions,
+            dedupe_threshold=Config.CHAT_CONTEXT_DEDUPE_THRESHOLD,
+        )
+        return results, context_str, stats
 
     def _check_for_summary(self, query: str) -> Optional[str]:
         """
@@ -316,59 +300,70 @@ class ChatBot:
             return "\n".join(parts)
         return None
 
-    def chat(
-        self,
-        message: str,
-        conversation_id: Optional[int] = None,
-        model: str = "claude-sonnet-4-20250514",
-        temperature: float = 0.7,
-        max_context_chunks: int = 50,
-    ) -> Dict[str, Any]:
-        """
-        Send a chat message and get a response using RAG.
-
-        Args:
-            message: User message
-            conversation_id: Optional conversation ID to continue
-            model: Model to use (claude-sonnet-4-20250514 for Anthropic, gpt-4o for OpenAI)
-            temperature: Temperature for generation
-            max_context_chunks: Maximum number of document chunks to retrieve
+    DEFAULT_MODEL = "claude-sonnet-4-20250514"
+    MAX_TOKENS = 4096
 
-        Returns:
-            Dictionary with response, conversation_id, and metadata
-        """
-        # Try Anthropic first, then OpenAI
+    def _require_clients(self):
+        """Both provider clients (either may be None); raises if neither is configured"""
         anthropic_client = self._get_anthropic_client()
         openai_client = self._get_openai_client()
 
         if not anthropic_client and not openai_client:
             raise RuntimeError("No LLM API configured. Please add an Anthropic or OpenAI API key.")
+        return anthropic_client, openai_client
+
+    def _start_turn(self, message: str, conversation_id: Optional[int], model: str) -> Tuple[ChatConversation, ChatMessage]:
+        """Get or create the conversation and save the user message"""
+        with self.database.write_session() as session:
+            if conversation_id:
+                conversation = session.get(ChatConversation, conversation_id)
+                if not conversation:
+                    raise ValueError(f"Conversation {conversation_id} not found")
+            else:
+                conversation = ChatConversation()
+                session.add(conversation)
+                session.commit()
+                session.refresh(conversation)
+
+            user_msg = ChatMessage(
+                conversation_id=conversation.id,
+                role="user",
+                content=message,
+                token_count=context_packer.count_tokens(message, model),
+            )
+            session.add(user_msg)
+            session.commit()
+            session.refresh(user_msg)
 
-        # Get or create conversation
-        if conversation_id:
-            conversation = self.session.get(ChatConversation, conversation_id)
-            if not conversation:
-                raise ValueError(f"Conversation {conversation_id} not found")
-        else:
-            conversation = ChatConversation()
-            self.session.add(conversation)
-            self.session.commit()
-            self.session.refresh(conversation)
+        return conversation, user_msg
 
-        # Save user message
-        user_msg = ChatMessage(
-            conversation_id=conversation.id,
-            role="user",
-            content=message,
-        )
-        self.session.add(user_msg)
-        self.session.commit()
+    def _build_prompt(
+        self,
+        message: str,
+        conversation: ChatConversation,
+        user_msg: ChatMessage,
+        max_context_chunks: int,
+        model: str,
+        search_mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Retrieve context, anonymize it and assemble the LLM request.
 
+        Returns:
+            Dictionary with results, system_message, messages and substitutions
+        """
         # Check for pre-computed summaries first
         summary_context = self._check_for_summary(message)
 
-        # Retrieve relevant context from vector DB
-        results, context_str = self._retrieve_context(message, limit=max_context_chunks)
+        # Retrieve relevant context from vector DB, within what the summary leaves of the budget
+        budget = Config.CHAT_CONTEXT_TOKEN_BUDGET - context_packer.count_tokens(summary_context or "", model)
+        results, context_str, context_stats = self._retrieve_context(
+            message,
+            limit=max_context_chunks,
+            token_budget=max(budget, 0),
+            model=model,
+            mode=search_mode,
+        )
 
         # Combine summary with vector results if available
         if summary_context:
@@ -411,85 +406,58 @@ FORMATTING RULES:
 - After tables, provide summary statistics (totals, averages, counts by category)
 """
 
-        # Add conversation history (last 10 messages for context window management)
-        stmt = (
-            select(ChatMessage)
-            .where(ChatMessage.conversation_id == conversation.id)
-            .order_by(ChatMessage.created_at.desc())
-            .limit(10)
-        )
-        history = list(reversed(self.session.exec(stmt).all()))
-
-        for msg in history:
-            if msg.role in ["user", "assistant"]:
-                # Use anonymized version for current user message
-                content = anonymized_message if (msg.id == user_msg.id and msg.role == "user") else msg.content
-                messages.append({"role": msg.role, "content": content})
-
-        # Call LLM API (try Anthropic first, then OpenAI)
-        try:
-            if anthropic_client:
-                # Use Anthropic Claude API
-                # Claude uses separate system parameter, not in messages
-                claude_model = model if model.startswith("claude") else "claude-sonnet-4-20250514"
-
-                response = anthropic_client.messages.create(
-                    model=claude_model,
-                    max_tokens=4096,
-                    system=system_message,
-                    messages=messages,
-                )
-
-                assistant_message = response.content[0].text
-                tokens_used = response.usage.input_tokens + response.usage.output_tokens
-                self._llm_provider = "anthropic"
-
-            elif openai_client:
-                # Fall back to OpenAI
-                openai_model = model if model.startswith("gpt") else "gpt-4o"
-                all_messages = [{"role": "system", "content": system_message}] + messages
-
-                response = openai_client.chat.completions.create(
-                    model=openai_model,
-                    messages=all_messages,
-                    temperature=temperature,
-                )
-
-                assistant_message = response.choices[0].message.content
-                tokens_used = response.usage.total_tokens
-                self._llm_provider = "openai"
+        # Last CHAT_HISTORY_TURNS raw turns within the history budget, plus the rolling
+        # summary of everything older (conversation_memory)
+        history, conversation_summary = conversation_memory.build_history(
+            self.database, conversation.id, user_msg.id, anonymized_message, model)
+        messages.extend(history)
+
+        if conversation_summary:
+            if self.anonymizer:
+                conversation_summary, summary_subs = self.anonymizer.anonymize_for_llm(conversation_summary)
+                substitutions = {**summary_subs, **substitutions}
+            system_message += f"""
+CONVERSATION SO FAR (summary of earlier turns):
+{conversation_summary}
+"""
 
-            else:
-                raise RuntimeError("No LLM client available")
+        return {
+            "results": results,
+            "system_message": system_message,
+            "messages": messages,
+            "substitutions": substitutions,
+            "context_stats": context_stats,
+            "model": model,
+            "context_fingerprint": answer_cache.context_fingerprint(results, summary_context),
+            "history_fingerprint": answer_cache.history_fingerprint(
+                messages[:-1] + [{"role": "summary", "content": conversation_summary or ""}]),
+        }
 
-        except Exception as e:
-            # If Anthropic fails, try OpenAI as fallback
-            if anthropic_client and openai_client and "anthropic" in str(type(e).__module__).lower():
-                try:
-                    openai_model = "gpt-4o"
-                    all_messages = [{"role": "system", "content": system_message}] + messages
-
-                    response = openai_client.chat.completions.create(
-                        model=openai_model,
-                        messages=all_messages,
-                        temperature=temperature,
-                    )
-
-                    assistant_message = response.choices[0].message.content
-                    tokens_used = response.usage.total_tokens
-                    self._llm_provider = "openai"
-                except Exception as e2:
-                    raise RuntimeError(f"Both Anthropic and OpenAI failed. Anthropic: {e}, OpenAI: {e2}")
-            else:
-                provider = "Anthropic" if anthropic_client else "OpenAI"
-                raise RuntimeError(f"{provider} API error: {e}")
+    def _finish_turn(
+        self,
+        message: str,
+        conversation: ChatConversation,
+        results: List[Dict],
+        assistant_message: str,
+        substitutions: Dict,
+        model: str,
+        rendered: Optional[Tuple[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        De-anonymize the full response, save it and build the result dictionary.
 
+        rendered: (response, response_html) of a cached answer, already de-anonymized
+        """
         # De-anonymize the response if anonymizer is enabled
         response_plain = assistant_message
         response_html = assistant_message
         anonymization_stats = {}
 
-        if self.anonymizer and substitutions:
+        if rendered is not None:
+            response_plain, response_html = rendered
+            if self.anonymizer and substitutions:
+                anonymization_stats = self.anonymizer.get_stats(substitutions)
+        elif self.anonymizer and substitutions:
             response_plain, response_html = self.anonymizer.deanonymize_with_markup(
                 assistant_message,
                 substitutions,
@@ -499,30 +467,36 @@ FORMATTING RULES:
 
         # Save assistant response (store de-anonymized version)
         sources_used = json.dumps([hit.get("id") for hit in results])
+        content = response_plain if self.anonymizer else assistant_message
         assistant_msg = ChatMessage(
             conversation_id=conversation.id,
             role="assistant",
-            content=response_plain if self.anonymizer else assistant_message,
+            content=content,
             sources_used=sources_used,
             retrieved_chunks=len(results),
+            token_count=context_packer.count_tokens(content, model),
         )
-        self.session.add(assistant_msg)
+        from datetime import datetime
 
-        # Update conversation title if first message
-        if not conversation.title:
-            # Use first 50 chars of user message as title
-            conversation.title = message[:50] + ("..." if len(message) > 50 else "")
+        with self.database.write_session() as session:
+            session.add(assistant_msg)
 
-        from datetime import datetime
-        conversation.updated_at = datetime.utcnow()
-        self.session.commit()
+            # Update conversation title if first message
+            if not conversation.title:
+                # Use first 50 chars of user message as title
+                conversation.title = message[:50] + ("..." if len(message) > 50 else "")
+
+            conversation.updated_at = datetime.utcnow()
+            session.add(conversation)
+
+        # Fold turns that just left the raw window into the rolling summary (background)
+        self.memory.schedule(conversation.id)
 
         result = {
             "conversation_id": conversation.id,
             "response": response_plain if self.anonymizer else assistant_message,
             "response_html": response_html if self.anonymizer else None,
             "sources": results,
-            "tokens_used": tokens_used,
             "chunks_retrieved": len(results),
         }
 
@@ -543,6 +517,282 @@ FORMATTING RULES:
 
         return result
 
+    def _resolve_model(self, model: str, anthropic_client) -> Tuple[str, str]:
+        """(provider, model) the primary provider will be called with"""
+        if anthropic_client:
+            return "anthropic", model if model.startswith("claude") else self.DEFAULT_MODEL
+        return "openai", model if model.startswith("gpt") else "gpt-4o"
+
+    def _provider_plan(self, model: str, anthropic_client, openai_client) -> List[Tuple[str, Any, str]]:
+        """(provider, client, model) in failover order; OpenAI as a fallback always uses gpt-4o"""
+        plan = []
+        if anthropic_client:
+            plan.append(("anthropic", anthropic_client, self._resolve_model(model, anthropic_client)[1]))
+        if openai_client:
+            plan.append(("openai", openai_client, "gpt-4o" if anthropic_client else self._resolve_model(model, None)[1]))
+        return plan
+
+    def _answer_key(self, message: str, prompt: Dict[str, Any], model: str, anthropic_client) -> str:
+        """
+        Cache key for this question + context under the requested model.
+
+        Lookup and store both use it, so an answer produced by a failover
+        provider is still found by the next identical request.
+        """
+        provider, resolved_model = self._resolve_model(model, anthropic_client)
+        return answer_cache.answer_key(
+            provider, resolved_model, message, prompt["context_fingerprint"], prompt["history_fingerprint"])
+
+    def _cached_answer(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer (None when disabled)"""
+        if not Config.ANSWER_CACHE_ENABLED:
+            return None
+        return answer_cache.lookup(self.database, self.crypto, key)
+
+    def _store_answer(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        provider: str,
+        model: str,
+        latency_ms: int,
+    ) -> None:
+        """Cache a fresh answer, recording the provider and model that actually produced it"""
+        if not Config.ANSWER_CACHE_ENABLED or not result.get("response"):
+            return
+        try:
+            answer_cache.store(
+                self.database, self.crypto, key, provider, model,
+                result["response"], result.get("response_html"), result.get("tokens_used") or 0, latency_ms,
+            )
+        except Exception as e:
+            # The answer was delivered; a failed cache write must not fail the request
+            print(f"[CHAT] Could not cache answer: {e}")
+
+    def _cached_result(self, message, conversation, prompt, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """Result dictionary for an answer served from the cache"""
+        result = self._finish_turn(
+            message, conversation, prompt["results"], cached["response"], prompt["substitutions"],
+            prompt["model"], rendered=(cached["response"], cached.get("response_html")),
+        )
+        result["tokens_used"] = 0
+        result["context"] = prompt["context_stats"]
+        result["cached"] = True
+        result["tokens_saved"] = cached.get("tokens_saved", 0)
+        return result
+
+    def _complete(self, provider: str, client, model: str, system_message: str, messages: List[Dict], temperature: float) -> Tuple[str, int]:
+        """One non-streaming completion: (text, tokens_used)"""
+        if provider == "anthropic":
+            # Claude uses separate system parameter, not in messages
+            response = client.messages.create(
+                model=model,
+                max_tokens=self.MAX_TOKENS,
+                system=system_message,
+                messages=messages,
+            )
+            return response.content[0].text, response.usage.input_tokens + response.usage.output_tokens
+
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": system_message}] + messages,
+            temperature=temperature,
+        )
+        return response.choices[0].message.content, response.usage.total_tokens
+
+    def chat(
+        self,
+        message: str,
+        conversation_id: Optional[int] = None,
+        model: str = DEFAULT_MODEL,
+        temperature: float = 0.7,
+        max_context_chunks: int = Config.CHAT_CONTEXT_CANDIDATES,
+        search_mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send a chat message and get a response using RAG.
+
+        Args:
+            message: User message
+            conversation_id: Optional conversation ID to continue
+            model: Model to use (claude-sonnet-4-20250514 for Anthropic, gpt-4o for OpenAI)
+            temperature: Temperature for generation
+            max_context_chunks: Candidate chunks to retrieve before packing to the token budget
+            search_mode: Retrieval mode - "vector", "keyword" or "hybrid" (Config.SEARCH_MODE)
+
+        Returns:
+            Dictionary with response, conversation_id, and metadata
+        """
+        # Try Anthropic first, then OpenAI
+        anthropic_client, openai_client = self._require_clients()
+
+        conversation, user_msg = self._start_turn(message, conversation_id, model)
+        prompt = self._build_prompt(message, conversation, user_msg, max_context_chunks, model, search_mode)
+
+        # Same question over the same context and history: reuse the answer
+        cache_key = self._answer_key(message, prompt, model, anthropic_client)
+        cached = self._cached_answer(cache_key)
+        if cached:
+            return self._cached_result(message, conversation, prompt, cached)
+
+        started = time.monotonic()
+        errors = []
+
+        # Call LLM API in failover order, skipping providers whose circuit is open
+        for provider, client, provider_model in self._provider_plan(model, anthropic_client, openai_client):
+            breaker = self.providers.breakers[provider]
+            if not breaker.allow():
+                errors.append(f"{provider}: circuit open")
+                continue
+            try:
+                assistant_message, tokens_used = self._complete(
+                    provider, client, provider_model, prompt["system_message"], prompt["messages"], temperature)
+            except Exception as e:
+                breaker.record_failure(e)
+                errors.append(f"{provider}: {e}")
+                continue
+            breaker.record_success()
+            break
+        else:
+            raise RuntimeError(f"LLM API error: {'; '.join(errors)}")
+
+        latency_ms = int((time.monotonic() - started) * 1000)
+        result = self._finish_turn(
+            message, conversation, prompt["results"], assistant_message, prompt["substitutions"], model)
+        result["tokens_used"] = tokens_used
+        result["provider"] = provider
+        result["context"] = prompt["context_stats"]
+        result["cached"] = False
+        self._store_answer(cache_key, result, provider, provider_model, latency_ms)
+        return result
+
+    def _stream_anthropic(self, client, model: str, system_message: str, messages: List[Dict], usage: Dict) -> Iterator[str]:
+        """Yield text deltas from Anthropic; fills usage when the stream ends"""
+        with client.messages.stream(
+            model=model,
+            max_tokens=self.MAX_TOKENS,
+            system=system_message,
+            messages=messages,
+        ) as stream:
+            for text in stream.text_stream:
+                yield text
+            final = stream.get_final_message()
+        usage["tokens_used"] = final.usage.input_tokens + final.usage.output_tokens
+
+    def _stream_openai(self, client, model: str, system_message: str, messages: List[Dict], temperature: float, usage: Dict) -> Iterator[str]:
+        """Yield text deltas from OpenAI; fills usage when the stream ends"""
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": system_message}] + messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    usage["tokens_used"] = chunk.usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()  # Release the connection when the reader stops early
+
+    def chat_stream(
+        self,
+        message: str,
+        conversation_id: Optional[int] = None,
+        model: str = DEFAULT_MODEL,
+        temperature: float = 0.7,
+        max_context_chunks: int = Config.CHAT_CONTEXT_CANDIDATES,
+        search_mode: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat().
+
+        Yields events as {"event": name, "data": dict}, in order:
+            conversation - conversation_id, as soon as the user message is saved
+            sources      - retrieved sources and anonymization stats, before the LLM call
+            token        - de-anonymized text deltas as the provider produces them
+            done         - the same payload chat() returns, after the message is saved
+        Errors raise; nothing is saved for the assistant if the stream is abandoned.
+        """
+        anthropic_client, openai_client = self._require_clients()
+
+        conversation, user_msg = self._start_turn(message, conversation_id, model)
+        yield {"event": "conversation", "data": {"conversation_id": conversation.id}}
+
+        prompt = self._build_prompt(message, conversation, user_msg, max_context_chunks, model, search_mode)
+        substitutions = prompt["substitutions"]
+        sources_event = {
+            "sources": prompt["results"],
+            "chunks_retrieved": len(prompt["results"]),
+            "context": prompt["context_stats"],
+        }
+        if self.anonymizer and substitutions:
+            sources_event["anonymization"] = self.anonymizer.get_stats(substitutions)
+        yield {"event": "sources", "data": sources_event}
+
+        cache_key = self._answer_key(message, prompt, model, anthropic_client)
+        cached = self._cached_answer(cache_key)
+        if cached:
+            result = self._cached_result(message, conversation, prompt, cached)
+            yield {"event": "token", "data": {"text": result["response"]}}
+            yield {"event": "done", "data": result}
+            return
+
+        started = time.monotonic()
+        deanonymizer = StreamingDeanonymizer(substitutions if self.anonymizer else {})
+        parts: List[str] = []
+        usage: Dict[str, int] = {}
+        errors = []
+
+        for provider, client, provider_model in self._provider_plan(model, anthropic_client, openai_client):
+            breaker = self.providers.breakers[provider]
+            if not breaker.allow():
+                errors.append(f"{provider}: circuit open")
+                continue
+
+            if provider == "anthropic":
+                stream = self._stream_anthropic(
+                    client, provider_model, prompt["system_message"], prompt["messages"], usage)
+            else:
+                stream = self._stream_openai(
+                    client, provider_model, prompt["system_message"], prompt["messages"], temperature, usage)
+
+            try:
+                for text in stream:
+                    parts.append(text)
+                    visible = deanonymizer.feed(text)
+                    if visible:
+                        yield {"event": "token", "data": {"text": visible}}
+            except Exception as e:
+                breaker.record_failure(e)
+                # Falling back is only safe before anything reached the client
+                if parts:
+                    raise RuntimeError(f"LLM stream failed: {e}")
+                errors.append(f"{provider}: {e}")
+                continue
+            finally:
+                # Closed with us (client gone): close the provider stream now, not at GC
+                stream.close()
+            breaker.record_success()
+            break
+        else:
+            raise RuntimeError(f"LLM API error: {'; '.join(errors)}")
+
+        tail = deanonymizer.flush()
+        if tail:
+            yield {"event": "token", "data": {"text": tail}}
+
+        latency_ms = int((time.monotonic() - started) * 1000)
+        result = self._finish_turn(message, conversation, prompt["results"], "".join(parts), substitutions, model)
+        result["tokens_used"] = usage.get("tokens_used")
+        result["provider"] = provider
+        result["context"] = prompt["context_stats"]
+        result["cached"] = False
+        self._store_answer(cache_key, result, provider, provider_model, latency_ms)
+        yield {"event": "done", "data": result}
+
     def get_conversation_history(self, conversation_id: int) -> List[Dict[str, Any]]:
         """Get all messages in a conversation"""
         stmt = (
@@ -550,7 +800,8 @@ FORMATTING RULES:
             .where(ChatMessage.conversation_id == conversation_id)
             .order_by(ChatMessage.created_at)
         )
-        messages = self.session.exec(stmt).all()
+        with self.database.read_session() as session:
+            messages = session.exec(stmt).all()
 
         return [
             {
@@ -571,7 +822,8 @@ FORMATTING RULES:
             .order_by(ChatConversation.updated_at.desc())
             .limit(limit)
         )
-        conversations = self.session.exec(stmt).all()
+        with self.database.read_session() as session:
+            conversations = session.exec(stmt).all()
 
         return [
             {
@@ -585,17 +837,17 @@ FORMATTING RULES:
 
     def delete_conversation(self, conversation_id: int) -> bool:
         """Delete a conversation and all its messages"""
-        conversation = self.session.get(ChatConversation, conversation_id)
-        if not conversation:
-            return False
-
-        # Delete all messages first
-        stmt = select(ChatMessage).where(ChatMessage.conversation_id == conversation_id)
-        messages = self.session.exec(stmt).all()
-        for msg in messages:
-            self.session.delete(msg)
-
-        # Delete conversation
-        self.session.delete(conversation)
-        self.session.commit()
+        with self.database.write_session() as session:
+            conversation = session.get(ChatConversation, conversation_id)
+            if not conversation:
+                return False
+
+            # Delete all messages first
+            stmt = select(ChatMessage).where(ChatMessage.conversation_id == conversation_id)
+            messages = session.exec(stmt).all()
+            for msg in messages:
+                session.delete(msg)
+
+            # Delete conversation
+            session.delete(conversation)
         return True
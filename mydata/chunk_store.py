@@ -0,0 +1,96 @@
+"""Full chunk text for search hits
+
+Qdrant payloads only carry ids and filter fields; the text of each hit is read
+from the chunks table in batched IN (...) queries, with an LRU in front so hot
+chunks (the same answers keep coming back for related questions) skip SQLite.
+Chunks are immutable once written, so cached entries never go stale - a
+deleted chunk simply stops being returned by the vector search.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from sqlmodel import select
+from .cache import SimpleCache
+from .config import Config
+from .models import Chunk
+
+# (text, doc_id, start_offset, chunk_index) by chunk id
+ChunkRecord = Tuple[str, str, int, Optional[int]]
+
+_chunk_cache = SimpleCache(
+    ttl_seconds=Config.CHUNK_CACHE_TTL_SECONDS,
+    max_size=Config.CHUNK_CACHE_MAX_SIZE,
+    max_bytes=Config.CHUNK_CACHE_MAX_MB * 1024 * 1024,
+    stripes=Config.CACHE_STRIPES,
+)
+
+
+def get_chunk_cache() -> SimpleCache:
+    """Chunk text LRU (for /admin/cache)"""
+    return _chunk_cache
+
+
+def _parse_ids(chunk_ids: Iterable) -> List[UUID]:
+    ids = []
+    for chunk_id in chunk_ids:
+        try:
+            ids.append(chunk_id if isinstance(chunk_id, UUID) else UUID(str(chunk_id)))
+        except ValueError:
+            continue
+    return ids
+
+
+def load_chunks(database, chunk_ids: Iterable, batch_size: int = 500) -> Dict[str, ChunkRecord]:
+    """Text, doc id, offset and ordinal for many chunks: cache first, then batched IN queries"""
+    records: Dict[str, ChunkRecord] = {}
+    missing: List[UUID] = []
+
+    for chunk_id in dict.fromkeys(_parse_ids(chunk_ids)):
+        cached = _chunk_cache.get(f"chunk:{chunk_id}")
+        if cached is not None:
+            records[str(chunk_id)] = cached
+        else:
+            missing.append(chunk_id)
+
+    if missing:
+        with database.read_session() as session:
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                rows = session.exec(
+                    select(Chunk.id, Chunk.text, Chunk.doc_id, Chunk.start_offset, Chunk.chunk_index)
+                    .where(Chunk.id.in_(batch))
+                ).all()
+                for chunk_id, text, doc_id, start_offset, chunk_index in rows:
+                    record = (text, str(doc_id), start_offset, chunk_index)
+                    records[str(chunk_id)] = record
+                    _chunk_cache.set(f"chunk:{chunk_id}", record)
+
+    return records
+
+
+def hydrate_hits(database, hits: List[Dict], drop_missing: bool = True) -> List[Dict]:
+    """
+    Replace payload text with the full chunk text (one query for the whole list).
+
+    Hits whose chunk row no longer exists are dropped unless drop_missing=False,
+    in which case they keep whatever text their payload had.
+    """
+    if not hits:
+        return hits
+
+    records = load_chunks(database, [hit.get("id") for hit in hits])
+    hydrated = []
+    for hit in hits:
+        record: Optional[ChunkRecord] = records.get(str(hit.get("id")))
+        payload = dict(hit.get("payload") or {})
+        if record is None:
+            if drop_missing:
+                continue
+        else:
+            text, doc_id, start_offset, chunk_index = record
+            payload["text"] = text
+            payload.setdefault("doc_id", doc_id)
+            payload["start_offset"] = start_offset
+            payload["chunk_index"] = chunk_index
+        hydrated.append({**hit, "payload": payload})
+    return hydrated
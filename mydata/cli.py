@@ -90,10 +90,9 @@ def get_pipeline() -> IngestionPipeline:
     vectordb = VectorDB(path=qdrant_path)
     vectordb.initialize(dimension=embedder.dimension)
 
-    session = db.session()
-    ml_organizer = MLOrganizer(embedder, session)
+    ml_organizer = MLOrganizer(embedder, db, vectordb)
 
-    return IngestionPipeline(session, storage, embedder, vectordb, ml_organizer)
+    return IngestionPipeline(db, storage, embedder, vectordb, ml_organizer)
 
 
 @app.command()
@@ -233,11 +232,11 @@ def ls(
 
     sqlite_path, _ = get_database_paths()
     db = Database(db_path=sqlite_path)
-    session = db.session()
 
     # Query documents
     stmt = select(Document).limit(limit)
-    docs = session.exec(stmt).all()
+    with db.read_session() as session:
+        docs = session.exec(stmt).all()
 
     if not docs:
         console.print("[yellow]No documents found[/yellow]")
@@ -253,7 +252,7 @@ def ls(
     for doc in docs:
         doc_id = str(doc.id)[:8]
         source = doc.source[:28] + "..." if len(doc.source) > 30 else doc.source
-        preview = doc.raw_text[:47] + "..." if len(doc.raw_text) > 50 else doc.raw_text
+        preview = doc.preview[:47] + "..." if len(doc.preview) > 50 else doc.preview
         created = doc.created_at.strftime("%Y-%m-%d %H:%M")
 
         table.add_row(doc_id, source, preview, created)
@@ -299,9 +298,8 @@ def tags():
 
     sqlite_path, _ = get_database_paths()
     db = Database(db_path=sqlite_path)
-    session = db.session()
-
-    all_tags = session.exec(select(Tag)).all()
+    with db.read_session() as session:
+        all_tags = session.exec(select(Tag)).all()
 
     if not all_tags:
         console.print("[yellow]No tags found[/yellow]")
@@ -330,9 +328,8 @@ def clusters():
 
     sqlite_path, _ = get_database_paths()
     db = Database(db_path=sqlite_path)
-    session = db.session()
-
-    all_clusters = session.exec(select(Cluster)).all()
+    with db.read_session() as session:
+        all_clusters = session.exec(select(Cluster)).all()
 
     if not all_clusters:
         console.print("[yellow]No clusters found. Run 'mydata daemon' to generate clusters.[/yellow]")
@@ -392,7 +389,6 @@ def email_add(
 
     sqlite_path, _ = get_database_paths()
     db = Database(db_path=sqlite_path)
-    session = db.session()
 
     # Get password if not provided
     if password is None:
@@ -413,8 +409,8 @@ def email_add(
         imap_port=imap_port,
     )
 
-    session.add(cred)
-    session.commit()
+    with db.write_session() as session:
+        session.add(cred)
 
     console.print(f"[green]✓[/green] Email account added: {email_address}")
     console.print("[dim]Run 'mydata daemon' to start watching inbox[/dim]")
@@ -596,10 +592,10 @@ def quick():
             crypto.unlock()
             sqlite_path, _ = get_database_paths()
             db = Database(db_path=sqlite_path)
-            session = db.session()
 
             stmt = select(Document).limit(15)
-            docs = session.exec(stmt).all()
+            with db.read_session() as session:
+                docs = session.exec(stmt).all()
 
             if not docs:
                 console.print("[yellow]No documents found[/yellow]")
@@ -614,7 +610,7 @@ def quick():
             for doc in docs:
                 doc_id = str(doc.id)[:8]
                 source = doc.source[:28] + "..." if len(doc.source) > 30 else doc.source
-                preview = doc.raw_text[:47] + "..." if len(doc.raw_text) > 50 else doc.raw_text
+                preview = doc.preview[:47] + "..." if len(doc.preview) > 50 else doc.preview
                 created = doc.created_at.strftime("%Y-%m-%d %H:%M")
                 doc_table.add_row(doc_id, source, preview, created)
 
@@ -737,6 +733,45 @@ def list_databases():
         raise typer.Exit(1)
 
 
+@app.command("db-bench")
+def db_bench(
+    docs: str = typer.Option("1000,10000,50000", help="Comma-separated corpus sizes"),
+    commits: int = typer.Option(500, help="Timed single-document commits per run"),
+    reads: int = typer.Option(2000, help="Timed point reads per run"),
+):
+    """Benchmark default SQLite pragmas against the tuned profile (scratch DBs)"""
+    from .db_bench import run_benchmark
+
+    sizes = [int(d) for d in docs.split(",") if d.strip()]
+    # Scratch DBs live next to the real one so they hit the same disk
+    workdir, _ = get_database_paths()
+
+    with console.status("[cyan]Running benchmark...[/cyan]"):
+        results = run_benchmark(sizes, commits=commits, reads=reads, workdir=workdir.parent)
+
+    table = Table(title="SQLite Pragma Profile Benchmark")
+    table.add_column("Docs", justify="right")
+    table.add_column("Profile", style="cyan")
+    table.add_column("Size MB", justify="right")
+    table.add_column("Ingest docs/s", justify="right")
+    table.add_column("Commit p50/p95 ms", justify="right")
+    table.add_column("Read p50/p95 ms", justify="right")
+    table.add_column("Scan ms", justify="right")
+
+    for r in results:
+        table.add_row(
+            str(r["docs"]),
+            r["profile"],
+            str(r["size_mb"]),
+            str(r["ingest_docs_per_sec"]),
+            f"{r['commit_p50_ms']} / {r['commit_p95_ms']}",
+            f"{r['read_p50_ms']} / {r['read_p95_ms']}",
+            str(r["scan_ms"]),
+        )
+
+    console.print(table)
+
+
 @app.command()
 def ingest(
     path: str = typer.Argument(..., help="Directory or file path to ingest"),
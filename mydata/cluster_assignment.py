@@ -0,0 +1,218 @@
+"""Incremental cluster maintenance between full UMAP + HDBSCAN fits
+
+A full fit stores each cluster's centroid and radius in embedding space (the
+normalized mean-pooled document vectors from doc_vectors), so a new document
+is placed at ingest with one matrix-vector product: it joins the nearest
+cluster if it lies within that cluster's radius, otherwise it stays noise.
+
+Counters record what happened since the fit (documents added, joined, left
+as noise, and how far from their centroids they landed). A full refit runs
+only once drift_status() says the clustering no longer fits the corpus, and
+match_clusters() carries cluster ids across it by member overlap, so ids -
+and links to them - stay stable.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlmodel import select
+from . import counters
+from .config import Config
+from .models import Cluster, CorpusStat
+
+
+def pack_vector(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def unpack_vector(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def group_members(labels: np.ndarray) -> Dict[int, np.ndarray]:
+    """Row indices per label (noise excluded), from one stable argsort"""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    unique, starts = np.unique(labels[order], return_index=True)
+    return {
+        int(label): rows
+        for label, rows in zip(unique, np.split(order, starts[1:]))
+        if label != -1
+    }
+
+
+def cluster_geometry(
+    vectors: np.ndarray, members: Dict[int, np.ndarray]
+) -> Tuple[Dict[int, Tuple[np.ndarray, float]], float]:
+    """
+    Centroid and radius per label (members from group_members), plus the mean member distance.
+
+    vectors are unit rows, so cosine distance is 1 - dot. The radius is the
+    90th percentile member distance, which ignores a few stragglers.
+    """
+    geometry: Dict[int, Tuple[np.ndarray, float]] = {}
+    distance_sum, member_count = 0.0, 0
+    for label, indices in members.items():
+        rows = vectors[indices]
+        centroid = normalize(rows.mean(axis=0))
+        distances = 1.0 - rows @ centroid
+        geometry[label] = (centroid, float(np.percentile(distances, 90)))
+        distance_sum += float(distances.sum())
+        member_count += len(rows)
+    return geometry, distance_sum / member_count if member_count else 0.0
+
+
+class CentroidIndex:
+    """Stored centroids as one matrix, for nearest-cluster lookups"""
+
+    def __init__(self, cluster_ids: List[int], centroids: np.ndarray, radii: np.ndarray):
+        self.cluster_ids = cluster_ids
+        self.centroids = centroids
+        self.radii = radii
+
+    @classmethod
+    def load(cls, session) -> Optional["CentroidIndex"]:
+        rows = session.exec(
+            select(Cluster.id, Cluster.centroid, Cluster.radius).where(Cluster.centroid.is_not(None))
+        ).all()
+        if not rows:
+            return None
+        return cls(
+            [cluster_id for cluster_id, _, _ in rows],
+            np.stack([unpack_vector(centroid) for _, centroid, _ in rows]),
+            np.array([radius or 0.0 for _, _, radius in rows], dtype=np.float32),
+        )
+
+    def assign(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """(cluster id or None for noise, distance to the nearest centroid)"""
+        distances = 1.0 - self.centroids @ vector
+        nearest = int(np.argmin(distances))
+        distance = float(distances[nearest])
+        if distance <= self.radii[nearest] * Config.CLUSTER_ASSIGN_RADIUS_FACTOR:
+            return self.cluster_ids[nearest], distance
+        return None, distance
+
+
+def match_clusters(
+    new_members: Dict[int, Set], old_members: Dict[int, Set], min_jaccard: float
+) -> Dict[int, int]:
+    """
+    New label -> old cluster id, pairing the most-overlapping clusters first.
+
+    Greedy on Jaccard similarity of member sets: each old id is used at most
+    once, and pairs below min_jaccard stay unmatched (they get fresh ids).
+    """
+    pairs = []
+    for label, members in new_members.items():
+        for cluster_id, old in old_members.items():
+            overlap = len(members & old)
+            if overlap:
+                pairs.append((overlap / len(members | old), label, cluster_id))
+
+    matched: Dict[int, int] = {}
+    used: Set[int] = set()
+    for jaccard, label, cluster_id in sorted(pairs, reverse=True):
+        if jaccard < min_jaccard:
+            break
+        if label not in matched and cluster_id not in used:
+            matched[label] = cluster_id
+            used.add(cluster_id)
+    return matched
+
+
+def record_assignment(session, cluster_id: Optional[int], distance: float) -> None:
+    """Count an ingest-time assignment toward the drift metrics"""
+    if cluster_id is None:
+        counters.bump(session, counters.CLUSTER_FIT_NOISE)
+    else:
+        counters.bump(session, counters.CLUSTER_FIT_ASSIGNED)
+        counters.bump(session, counters.CLUSTER_FIT_DISTANCE, int(distance * 10_000))
+
+
+def record_fit(session, document_count: int, mean_distance: float, fitted_at) -> None:
+    """Reset the drift baseline after a full fit"""
+    counters.set_counter(session, counters.CLUSTER_FIT_DOCUMENTS, document_count, fitted_at)
+    counters.set_counter(session, counters.CLUSTER_FIT_MEAN_DISTANCE, int(mean_distance * 10_000))
+    for name in (counters.CLUSTER_FIT_ASSIGNED, counters.CLUSTER_FIT_NOISE, counters.CLUSTER_FIT_DISTANCE):
+        counters.set_counter(session, name, 0)
+
+
+def allocate_ids(session, count: int, existing: Iterable[int]) -> List[int]:
+    """Fresh cluster ids above every id ever handed out"""
+    row = session.get(CorpusStat, counters.CLUSTER_NEXT_ID)
+    start = max([row.value if row else 1] + [cluster_id + 1 for cluster_id in existing])
+    counters.set_counter(session, counters.CLUSTER_NEXT_ID, start + count)
+    return list(range(start, start + count))
+
+
+def reducer_refit_reason(stats: Dict[str, CorpusStat], documents: int, drift: Dict) -> Optional[str]:
+    """
+    Why the persisted reducer should be refit, or None to reuse it (transform only).
+
+    Refit when it was never fitted, is older than CLUSTER_REDUCER_MAX_AGE_DAYS,
+    the corpus grew by CLUSTER_REDUCER_REFIT_GROWTH since, or new documents
+    keep landing outside every cluster (new topics the projection never saw).
+    """
+    fitted_at = counters.get_last_at(stats, counters.CLUSTER_REDUCER_DOCUMENTS)
+    if fitted_at is None:
+        return "never fitted"
+    age_days = (datetime.utcnow() - fitted_at).total_seconds() / 86400
+    if age_days >= Config.CLUSTER_REDUCER_MAX_AGE_DAYS:
+        return f"age {age_days:.1f}d"
+    fitted_documents = counters.get_count(stats, counters.CLUSTER_REDUCER_DOCUMENTS)
+    growth = max(documents - fitted_documents, 0) / max(fitted_documents, 1)
+    if growth >= Config.CLUSTER_REDUCER_REFIT_GROWTH:
+        return f"growth {growth:.2f}"
+    noise = [reason for reason in drift.get("reasons", []) if reason.startswith("noise_ratio")]
+    return noise[0] if noise else None
+
+
+def drift_status(stats: Dict[str, CorpusStat]) -> Dict:
+    """
+    Drift since the last full fit, and whether it warrants a refit.
+
+    new_fraction:   documents added since the fit / documents at the fit
+    noise_ratio:    share of new documents that matched no cluster
+    distance_ratio: mean distance of joined documents / mean member distance at fit
+    The last two only count once CLUSTER_DRIFT_MIN_SAMPLES new documents were seen.
+    """
+    fit_documents = counters.get_count(stats, counters.CLUSTER_FIT_DOCUMENTS)
+    if counters.get_last_at(stats, counters.CLUSTER_FIT_DOCUMENTS) is None:
+        return {"refit": True, "reasons": ["never fitted"]}
+
+    documents = counters.get_count(stats, counters.DOCUMENTS)
+    assigned = counters.get_count(stats, counters.CLUSTER_FIT_ASSIGNED)
+    noise = counters.get_count(stats, counters.CLUSTER_FIT_NOISE)
+    seen = assigned + noise
+    fit_distance = counters.get_count(stats, counters.CLUSTER_FIT_MEAN_DISTANCE)
+
+    new_fraction = max(documents - fit_documents, 0) / max(fit_documents, 1)
+    noise_ratio = noise / seen if seen else 0.0
+    distance_ratio = (
+        counters.get_count(stats, counters.CLUSTER_FIT_DISTANCE) / assigned / fit_distance
+        if assigned and fit_distance else 0.0
+    )
+
+    reasons = []
+    if new_fraction >= Config.CLUSTER_DRIFT_NEW_FRACTION:
+        reasons.append(f"new_fraction {new_fraction:.2f}")
+    if seen >= Config.CLUSTER_DRIFT_MIN_SAMPLES:
+        if noise_ratio >= Config.CLUSTER_DRIFT_NOISE_RATIO:
+            reasons.append(f"noise_ratio {noise_ratio:.2f}")
+        if distance_ratio >= Config.CLUSTER_DRIFT_DISTANCE_RATIO:
+            reasons.append(f"distance_ratio {distance_ratio:.2f}")
+
+    return {
+        "refit": bool(reasons),
+        "reasons": reasons,
+        "fitted_at": counters.get_last_at(stats, counters.CLUSTER_FIT_DOCUMENTS),
+        "documents_at_fit": fit_documents,
+        "new_fraction": round(new_fraction, 4),
+        "noise_ratio": round(noise_ratio, 4),
+        "distance_ratio": round(distance_ratio, 4),
+    }
@@ -0,0 +1,210 @@
+"""UMAP + HDBSCAN in a separate, resource-limited process
+
+numba-compiled UMAP and HDBSCAN hold the GIL and hundreds of MB for tens of
+seconds; run inside the daemon they stall every API request. The fit runs in
+a spawned child instead:
+
+- the parent writes the document vectors to a .npy snapshot, which the child
+  memory-maps read-only (no pickling of a large matrix)
+- the child lowers its priority (nice), pins itself to CLUSTER_WORKER_CPUS
+  cores and caps its address space at CLUSTER_WORKER_MEMORY_MB
+- only the label array comes back; the parent writes the results to SQLite
+  in one transaction, so the worker never touches the database
+
+The reducer (optional randomized PCA, then UMAP) is fitted once and pickled
+beside the database. Later fits reuse the stored coordinates of documents it
+was fitted on and transform() only the new ones; the parent asks for a refit
+on schedule or drift (cluster_assignment.reducer_refit_reason).
+
+Limits use POSIX APIs where present and are skipped elsewhere (Windows).
+"""
+
+import multiprocessing
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .config import Config
+from .logger import get_logger
+
+logger = get_logger()
+
+
+def _limit_resources(nice: int, cpus: int, memory_mb: int) -> None:
+    """Pool initializer: runs in the child before any clustering import"""
+    if cpus > 0:
+        # numba / OpenMP / BLAS size their thread pools from these at import time
+        for var in ("NUMBA_NUM_THREADS", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(cpus)
+        if hasattr(os, "sched_setaffinity"):
+            available = sorted(os.sched_getaffinity(0))
+            # The highest-numbered cores, leaving the first ones to the API
+            os.sched_setaffinity(0, available[-cpus:])
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    if memory_mb > 0:
+        try:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"[ML] Could not cap clustering worker memory: {e}")
+
+
+def reducer_path(database) -> Path:
+    """<db>.reducer.pkl beside the database file (and the document vector cache)"""
+    return Path(database.db_path).with_suffix(".reducer.pkl")
+
+
+def _fit_reducer(vectors: np.ndarray, ids: List[str], pca_components: int) -> Dict:
+    """Randomized PCA (optional) then UMAP, falling back to PCA alone if numba fails"""
+    from sklearn.decomposition import PCA
+    import umap
+
+    n = len(vectors)
+    pca, data = None, vectors
+    if pca_components and vectors.shape[1] > pca_components and n > pca_components:
+        pca = PCA(n_components=pca_components, svd_solver="randomized", random_state=42)
+        data = pca.fit_transform(vectors)
+
+    try:
+        reducer = umap.UMAP(
+            n_components=min(10, n - 1),
+            n_neighbors=min(15, n - 1),
+            min_dist=0.1,
+            metric='cosine',
+            random_state=42
+        )
+        embedding = reducer.fit_transform(data)
+    except Exception as umap_err:
+        print(f"[ML] UMAP failed ({umap_err}), using PCA fallback...")
+        reducer = PCA(n_components=min(10, n - 1, data.shape[1]), random_state=42)
+        embedding = reducer.fit_transform(data)
+
+    return {
+        "dimension": vectors.shape[1],
+        "pca": pca,
+        "reducer": reducer,
+        "index": {doc_id: i for i, doc_id in enumerate(ids)},
+        "embedding": np.asarray(embedding, dtype=np.float32),  # Coordinates of the fitted documents
+    }
+
+
+def _transform(model: Dict, vectors: np.ndarray, ids: List[str]) -> np.ndarray:
+    """Fitted documents reuse their coordinates; only new ones go through transform()"""
+    rows = np.fromiter((model["index"].get(doc_id, -1) for doc_id in ids), dtype=np.int64, count=len(ids))
+    reduced = np.empty((len(ids), model["embedding"].shape[1]), dtype=np.float32)
+    known = rows >= 0
+    reduced[known] = model["embedding"][rows[known]]
+    if not known.all():
+        data = np.asarray(vectors[~known])
+        if model["pca"] is not None:
+            data = model["pca"].transform(data)
+        reduced[~known] = model["reducer"].transform(data)
+    return reduced
+
+
+def _load_model(path: Optional[str], dimension: int) -> Optional[Dict]:
+    if not path or not Path(path).exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+    except Exception as e:
+        print(f"[ML] Ignoring unreadable reducer {path}: {e}")
+        return None
+    return model if model.get("dimension") == dimension else None
+
+
+def _save_model(path: str, model: Dict) -> None:
+    # Write-then-rename so a crash never leaves a truncated model
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def fit_labels(
+    vectors: np.ndarray,
+    ids: List[str],
+    min_cluster_size: int,
+    min_samples: int,
+    model_path: Optional[str] = None,
+    refit: bool = True,
+    pca_components: int = 0,
+) -> Tuple[np.ndarray, bool]:
+    """
+    HDBSCAN labels (-1 = noise) over the reduced vectors, and whether the reducer was refit.
+
+    The reducer persisted at model_path is reused unless refit is set or it
+    is missing or was fitted on another embedding dimension.
+    """
+    import hdbscan
+
+    model = None if refit else _load_model(model_path, vectors.shape[1])
+    if model is None:
+        model = _fit_reducer(vectors, ids, pca_components)
+        reduced = model["embedding"]
+        if model_path:
+            _save_model(model_path, model)
+        refit = True
+    else:
+        reduced = _transform(model, vectors, ids)
+
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size,
+        min_samples=min_samples,
+        metric='euclidean',
+        cluster_selection_method='eom'
+    )
+    return clusterer.fit_predict(reduced).astype(np.int32), refit
+
+
+def _fit_snapshot(path: str, *args) -> Tuple[np.ndarray, bool]:
+    """Child entry point: memory-map the snapshot, return labels only"""
+    vectors = np.load(path, mmap_mode="r")
+    return fit_labels(vectors, *args)
+
+
+def fit_labels_in_worker(
+    vectors: np.ndarray,
+    ids: List[str],
+    min_cluster_size: int,
+    min_samples: int,
+    model_path: Optional[str] = None,
+    refit: bool = True,
+    pca_components: int = 0,
+    timeout: Optional[float] = None,
+) -> Tuple[np.ndarray, bool]:
+    """
+    fit_labels() in a fresh spawned process (numba's memory goes away with it).
+
+    Raises if the worker fails, is killed by its memory cap or exceeds the
+    timeout; the worker is always terminated before returning.
+    """
+    timeout = timeout or Config.CLUSTER_WORKER_TIMEOUT_SECONDS
+    fd, path = tempfile.mkstemp(prefix="cluster-snapshot-", suffix=".npy", dir=str(Config.MYDATA_HOME))
+    os.close(fd)
+    pool = None
+    try:
+        np.save(path, np.ascontiguousarray(vectors, dtype=np.float32))
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(
+            processes=1,
+            initializer=_limit_resources,
+            initargs=(Config.CLUSTER_WORKER_NICE, Config.CLUSTER_WORKER_CPUS, Config.CLUSTER_WORKER_MEMORY_MB),
+        )
+        result = pool.apply_async(
+            _fit_snapshot, (path, ids, min_cluster_size, min_samples, model_path, refit, pca_components))
+        labels = result.get(timeout=timeout)
+        pool.close()  # Clean exit; terminate() below is for failures and timeouts
+        return labels
+    except multiprocessing.TimeoutError:
+        raise TimeoutError(f"Clustering worker exceeded {timeout}s")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        Path(path).unlink(missing_ok=True)
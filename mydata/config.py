@@ -14,6 +14,15 @@ class Config:
     # Database
     DATABASE_PATH: Path = MYDATA_HOME / "mydata.db"
     DATABASE_TIMEOUT: int = int(os.getenv("DATABASE_TIMEOUT", "30"))
+    DATABASE_READ_POOL_SIZE: int = int(os.getenv("DATABASE_READ_POOL_SIZE", "4"))
+    DATABASE_SYNCHRONOUS: str = os.getenv("DATABASE_SYNCHRONOUS", "NORMAL")  # OFF/NORMAL/FULL
+    DATABASE_MMAP_SIZE_MB: int = int(os.getenv("DATABASE_MMAP_SIZE_MB", "256"))
+    DATABASE_CACHE_SIZE_MB: int = int(os.getenv("DATABASE_CACHE_SIZE_MB", "64"))  # Per connection
+    DATABASE_TEMP_STORE: str = os.getenv("DATABASE_TEMP_STORE", "MEMORY")  # DEFAULT/FILE/MEMORY
+    DATABASE_CHECKPOINT_INTERVAL: int = int(os.getenv("DATABASE_CHECKPOINT_INTERVAL", "300"))  # 5 minutes
+    DATABASE_OPTIMIZE_INTERVAL: int = int(os.getenv("DATABASE_OPTIMIZE_INTERVAL", "3600"))  # 1 hour
+    CONTENT_COMPRESSION_LEVEL: int = int(os.getenv("CONTENT_COMPRESSION_LEVEL", "3"))  # zstd level
+    DOCUMENT_PREVIEW_CHARS: int = int(os.getenv("DOCUMENT_PREVIEW_CHARS", "300"))
 
     # Vector Store
     QDRANT_PATH: Path = MYDATA_HOME / "qdrant"
@@ -23,11 +32,16 @@ class Config:
     # API Server
     API_HOST: str = os.getenv("API_HOST", "127.0.0.1")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    API_THREADPOOL_SIZE: int = int(os.getenv("API_THREADPOOL_SIZE", "40"))  # Sync endpoints
+    API_IO_WORKERS: int = int(os.getenv("API_IO_WORKERS", "8"))
+    API_EMBED_WORKERS: int = int(os.getenv("API_EMBED_WORKERS", "2"))
+    API_CPU_WORKERS: int = int(os.getenv("API_CPU_WORKERS", "2"))
+    API_LLM_WORKERS: int = int(os.getenv("API_LLM_WORKERS", "4"))
 
     # ML / Embedding
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en-v1.5")
     MODELS_CACHE_DIR: Path = MYDATA_HOME / "models"
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "512"))
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "512"))  # Chunk length in characters
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "50"))
     EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
 
@@ -35,11 +49,53 @@ class Config:
     SEMANTIC_SIMILARITY_THRESHOLD: float = float(os.getenv("SEMANTIC_SIMILARITY_THRESHOLD", "0.95"))
     HYBRID_SEARCH_VECTOR_WEIGHT: float = float(os.getenv("HYBRID_SEARCH_VECTOR_WEIGHT", "0.7"))
     HYBRID_SEARCH_BM25_WEIGHT: float = float(os.getenv("HYBRID_SEARCH_BM25_WEIGHT", "0.3"))
+    SEARCH_MODE: str = os.getenv("SEARCH_MODE", "hybrid")  # "vector", "keyword" or "hybrid"
+    HYBRID_FUSION: str = os.getenv("HYBRID_FUSION", "rrf")  # "rrf" (rank-based) or "score" (max-normalized)
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_CANDIDATE_MULTIPLIER: int = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "2"))  # Per-retriever over-fetch
+    # Sparse (BM25) vectors stored beside the dense ones in Qdrant
+    SPARSE_BM25_K1: float = float(os.getenv("SPARSE_BM25_K1", "1.2"))
+    SPARSE_BM25_B: float = float(os.getenv("SPARSE_BM25_B", "0.75"))
+    SPARSE_AVG_DOC_TOKENS: int = int(os.getenv("SPARSE_AVG_DOC_TOKENS", "90"))  # ~512-char chunks
     DEFAULT_SEARCH_LIMIT: int = int(os.getenv("DEFAULT_SEARCH_LIMIT", "10"))
 
+    # Chat context packing (tokens counted with the target model's tokenizer)
+    CHAT_CONTEXT_CANDIDATES: int = int(os.getenv("CHAT_CONTEXT_CANDIDATES", "30"))
+    CHAT_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "6000"))
+    CHAT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+    # Raw turns kept verbatim; older ones are folded into a rolling summary by a cheap model
+    CHAT_HISTORY_TURNS: int = int(os.getenv("CHAT_HISTORY_TURNS", "3"))
+    CHAT_SUMMARY_MAX_TOKENS: int = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+    CHAT_SUMMARY_MODEL_ANTHROPIC: str = os.getenv("CHAT_SUMMARY_MODEL_ANTHROPIC", "claude-3-5-haiku-latest")
+    CHAT_SUMMARY_MODEL_OPENAI: str = os.getenv("CHAT_SUMMARY_MODEL_OPENAI", "gpt-4o-mini")
+    CHAT_CONTEXT_DEDUPE_THRESHOLD: float = float(os.getenv("CHAT_CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+
+    # LLM answer cache (encrypted in SQLite; keyed by the exact context, so never stale)
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_TTL_DAYS: int = int(os.getenv("ANSWER_CACHE_TTL_DAYS", "30"))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+    # LLM providers (clients are long-lived; a provider is skipped while its circuit is open)
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "60"))
+
     # Cache
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
     CACHE_MAX_SIZE: int = int(os.getenv("CACHE_MAX_SIZE", "1000"))
+    CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", "128"))  # Estimated bytes across all namespaces
+    CACHE_STRIPES: int = int(os.getenv("CACHE_STRIPES", "16"))  # Independently locked shards
+    # Search keys embed the corpus generation, so they can live long without going stale
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+    SEARCH_CACHE_MAX_MB: int = int(os.getenv("SEARCH_CACHE_MAX_MB", "64"))
+    # Stats are served stale for up to STATS_CACHE_STALE_SECONDS while a background refresh runs
+    STATS_CACHE_TTL_SECONDS: int = int(os.getenv("STATS_CACHE_TTL_SECONDS", "30"))
+    STATS_CACHE_STALE_SECONDS: int = int(os.getenv("STATS_CACHE_STALE_SECONDS", "300"))
+    # Full chunk text for search hits (chunks are immutable, so the TTL only bounds idle memory)
+    CHUNK_CACHE_MAX_SIZE: int = int(os.getenv("CHUNK_CACHE_MAX_SIZE", "20000"))
+    CHUNK_CACHE_MAX_MB: int = int(os.getenv("CHUNK_CACHE_MAX_MB", "64"))
+    CHUNK_CACHE_TTL_SECONDS: int = int(os.getenv("CHUNK_CACHE_TTL_SECONDS", "86400"))
 
     # File Watcher
     @staticmethod
@@ -102,6 +158,33 @@ class Config:
     ML_POLL_INTERVAL: int = int(os.getenv("ML_POLL_INTERVAL", "300"))  # 5 minutes
     ML_MIN_CLUSTER_SIZE: int = int(os.getenv("ML_MIN_CLUSTER_SIZE", "5"))
     ML_MIN_SAMPLES: int = int(os.getenv("ML_MIN_SAMPLES", "3"))
+    # New documents join the nearest cluster if within its radius (p90 member distance) x this factor
+    CLUSTER_ASSIGN_RADIUS_FACTOR: float = float(os.getenv("CLUSTER_ASSIGN_RADIUS_FACTOR", "1.0"))
+    # Full refit only when drift since the last fit crosses one of these
+    CLUSTER_DRIFT_NEW_FRACTION: float = float(os.getenv("CLUSTER_DRIFT_NEW_FRACTION", "0.25"))
+    CLUSTER_DRIFT_NOISE_RATIO: float = float(os.getenv("CLUSTER_DRIFT_NOISE_RATIO", "0.5"))
+    CLUSTER_DRIFT_DISTANCE_RATIO: float = float(os.getenv("CLUSTER_DRIFT_DISTANCE_RATIO", "1.5"))
+    CLUSTER_DRIFT_MIN_SAMPLES: int = int(os.getenv("CLUSTER_DRIFT_MIN_SAMPLES", "20"))
+    # A refit cluster keeps an old id when their member sets overlap at least this much (Jaccard)
+    CLUSTER_MATCH_MIN_JACCARD: float = float(os.getenv("CLUSTER_MATCH_MIN_JACCARD", "0.3"))
+    # UMAP/HDBSCAN run in a separate process so they can't stall the API
+    CLUSTER_WORKER_ENABLED: bool = os.getenv("CLUSTER_WORKER_ENABLED", "true").lower() == "true"
+    CLUSTER_WORKER_NICE: int = int(os.getenv("CLUSTER_WORKER_NICE", "10"))
+    CLUSTER_WORKER_CPUS: int = int(os.getenv("CLUSTER_WORKER_CPUS", "2"))  # 0 = no affinity / thread limit
+    CLUSTER_WORKER_MEMORY_MB: int = int(os.getenv("CLUSTER_WORKER_MEMORY_MB", "4096"))  # 0 = no cap
+    CLUSTER_WORKER_TIMEOUT_SECONDS: int = int(os.getenv("CLUSTER_WORKER_TIMEOUT_SECONDS", "1800"))
+    # Persisted PCA + UMAP reducer: refit on schedule or once the corpus outgrows it
+    CLUSTER_PCA_COMPONENTS: int = int(os.getenv("CLUSTER_PCA_COMPONENTS", "50"))  # Randomized PCA before UMAP; 0 = off
+    CLUSTER_REDUCER_MAX_AGE_DAYS: float = float(os.getenv("CLUSTER_REDUCER_MAX_AGE_DAYS", "7"))
+    CLUSTER_REDUCER_REFIT_GROWTH: float = float(os.getenv("CLUSTER_REDUCER_REFIT_GROWTH", "0.5"))
+
+    # ML scheduler: wake on change-log writes, run once they've been quiet this long
+    ML_DEBOUNCE_SECONDS: float = float(os.getenv("ML_DEBOUNCE_SECONDS", "15"))
+    ML_MAX_DELAY_SECONDS: float = float(os.getenv("ML_MAX_DELAY_SECONDS", "120"))  # ...but never later than this
+    ML_BUSY_BACKOFF_SECONDS: float = float(os.getenv("ML_BUSY_BACKOFF_SECONDS", "1"))  # Doubles while the API is busy
+    ML_BUSY_MAX_DEFER_SECONDS: float = float(os.getenv("ML_BUSY_MAX_DEFER_SECONDS", "300"))
+    # Without a running scheduler, change-log rows beyond this many are pruned on write
+    CHANGE_LOG_MAX_ROWS: int = int(os.getenv("CHANGE_LOG_MAX_ROWS", "100000"))
 
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -133,7 +216,7 @@ class Config:
         print(f"API Server: {cls.API_HOST}:{cls.API_PORT}")
         print(f"Embedding Model: {cls.EMBEDDING_MODEL}")
         print(f"Chunk Size: {cls.CHUNK_SIZE}")
-        print(f"Cache TTL: {cls.CACHE_TTL_SECONDS}s (max {cls.CACHE_MAX_SIZE} items)")
+        print(f"Cache TTL: {cls.CACHE_TTL_SECONDS}s (max {cls.CACHE_MAX_SIZE} items, {cls.CACHE_MAX_MB} MB)")
         print(f"Watch Directories: {', '.join(str(d) for d in cls.WATCH_DIRECTORIES)}")
         print(f"ML Poll Interval: {cls.ML_POLL_INTERVAL}s")
         print("=" * 50 + "\n")
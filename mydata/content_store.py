@@ -0,0 +1,94 @@
+"""Compressed document text, stored apart from the documents table
+
+Listings and stats only ever touch Document (with its short `preview`);
+the full text is decompressed on demand via load_text()/load_texts().
+"""
+
+import threading
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+from sqlmodel import Session, select
+from .config import Config
+from .models import DocumentContent
+
+# zstd is much faster than zlib at similar ratios; zlib keeps us working without it
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_local = threading.local()  # zstd (de)compressors are not thread-safe
+
+
+def _zstd_compressor():
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=Config.CONTENT_COMPRESSION_LEVEL)
+    return _local.compressor
+
+
+def _zstd_decompressor():
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Compress text, returning (codec, data)"""
+    raw = text.encode("utf-8")
+    if ZSTD_AVAILABLE:
+        return "zstd", _zstd_compressor().compress(raw)
+    return "zlib", zlib.compress(raw, 6)
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """Inverse of compress_text()"""
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Document text is zstd-compressed; install 'zstandard' to read it")
+        raw = _zstd_decompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raw = data
+    return raw.decode("utf-8")
+
+
+def make_preview(text: str, length: Optional[int] = None) -> str:
+    """Short prefix stored on the document row for list endpoints"""
+    return (text or "")[:length or Config.DOCUMENT_PREVIEW_CHARS]
+
+
+def make_content(doc_id: UUID, text: str) -> DocumentContent:
+    """Build the content row for a document"""
+    codec, data = compress_text(text)
+    return DocumentContent(
+        doc_id=doc_id,
+        codec=codec,
+        data=data,
+        size_bytes=len(text.encode("utf-8")),
+    )
+
+
+def load_text(session: Session, doc_id: UUID) -> Optional[str]:
+    """Full text for one document, or None if it has no content row"""
+    content = session.get(DocumentContent, doc_id)
+    if content is None:
+        return None
+    return decompress_text(content.codec, content.data)
+
+
+def load_texts(session: Session, doc_ids: Iterable[UUID], batch_size: int = 500) -> Dict[UUID, str]:
+    """Full text for many documents, fetched in batched IN (...) queries"""
+    doc_ids = list(doc_ids)
+    texts: Dict[UUID, str] = {}
+    for start in range(0, len(doc_ids), batch_size):
+        batch = doc_ids[start:start + batch_size]
+        rows = session.exec(
+            select(DocumentContent.doc_id, DocumentContent.codec, DocumentContent.data)
+            .where(DocumentContent.doc_id.in_(batch))
+        ).all()
+        for doc_id, codec, data in rows:
+            texts[doc_id] = decompress_text(codec, data)
+    return texts
@@ -0,0 +1,193 @@
+"""Token-budgeted context packing for RAG prompts
+
+Takes scored search hits and builds the context block sent to the LLM:
+near-duplicate chunks are dropped, neighbouring chunks of the same document are
+merged into one passage, and passages are added best-first until the token
+budget is spent.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .logger import get_logger
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = get_logger()
+
+_WORD = re.compile(r"\w+")
+_encoding_warned = False
+
+
+def _encoding_unavailable(error: Exception) -> None:
+    """Log (once per process) that token counts fall back to the chars/4 estimate"""
+    global _encoding_warned
+    if not _encoding_warned:
+        _encoding_warned = True
+        logger.warning(f"[CONTEXT] tiktoken encoding unavailable ({error}); estimating tokens as chars/4")
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """
+    tiktoken encoding for a model, or None (no tiktoken, or its BPE file can't be fetched).
+
+    tiktoken downloads the BPE file on first use; offline that raises a network
+    error. The None result is cached, so a turn never retries the download.
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Claude's tokenizer isn't available locally; cl100k is within a few
+            # percent for English text, which is all a budget needs
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        _encoding_unavailable(e)
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count for the target model (~4 chars/token without tiktoken)"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def shingles(text: str, k: int = 5) -> Set[Tuple[str, ...]]:
+    """Word k-shingles (lower-cased) for near-duplicate detection"""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _hit_fields(hit: Dict) -> Tuple[str, str, Optional[str], float]:
+    payload = hit.get("payload", hit)
+    score = hit.get("hybrid_score", hit.get("score", 0)) or 0
+    return payload.get("text", ""), payload.get("source", "unknown"), payload.get("doc_id"), float(score)
+
+
+def dedupe_hits(hits: List[Dict], threshold: float = 0.8) -> List[Dict]:
+    """Drop hits whose text is a near-duplicate of a better-scored hit"""
+    kept: List[Dict] = []
+    kept_shingles: List[Set] = []
+
+    for hit in sorted(hits, key=lambda h: _hit_fields(h)[3], reverse=True):
+        sig = shingles(_hit_fields(hit)[0])
+        if any(jaccard(sig, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(hit)
+        kept_shingles.append(sig)
+
+    return kept
+
+
+def merge_adjacent(hits: List[Dict], positions: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Group hits into passages: consecutive chunks (by position) of one document
+    become a single passage scored by its best chunk.
+
+    Args:
+        hits: Deduplicated hits
+        positions: hit id -> chunk ordinal within its document (hits without one stay alone)
+
+    Returns:
+        Passages as {"text", "source", "score", "hits"} sorted by score
+    """
+    positions = positions or {}
+    passages: List[Dict[str, Any]] = []
+    by_doc: Dict[str, List[Tuple[int, Dict]]] = {}
+
+    for hit in hits:
+        text, source, doc_id, score = _hit_fields(hit)
+        position = positions.get(str(hit.get("id")))
+        if doc_id is None or position is None:
+            passages.append({"text": text, "source": source, "score": score, "hits": [hit]})
+        else:
+            by_doc.setdefault(doc_id, []).append((position, hit))
+
+    for doc_hits in by_doc.values():
+        doc_hits.sort(key=lambda x: x[0])
+        run: List[Dict] = []
+        last_position = None
+        for position, hit in doc_hits:
+            if run and position != last_position + 1:
+                passages.append(_passage(run))
+                run = []
+            run.append(hit)
+            last_position = position
+        if run:
+            passages.append(_passage(run))
+
+    passages.sort(key=lambda p: p["score"], reverse=True)
+    return passages
+
+
+def _passage(run: List[Dict]) -> Dict[str, Any]:
+    fields = [_hit_fields(hit) for hit in run]
+    return {
+        "text": "\n".join(f[0] for f in fields),
+        "source": fields[0][1],
+        "score": max(f[3] for f in fields),
+        "hits": run,
+    }
+
+
+def pack_context(
+    hits: List[Dict],
+    token_budget: int,
+    model: str = "gpt-4o",
+    positions: Optional[Dict[str, int]] = None,
+    dedupe_threshold: float = 0.8,
+) -> Tuple[List[Dict], str, Dict[str, int]]:
+    """
+    Build the LLM context block from search hits.
+
+    Returns:
+        Tuple of (hits_used, context_string, stats)
+    """
+    unique = dedupe_hits(hits, dedupe_threshold)
+    passages = merge_adjacent(unique, positions)
+
+    used_hits: List[Dict] = []
+    parts: List[str] = []
+    tokens = 0
+
+    for passage in passages:
+        block = (
+            f"[Document {len(parts) + 1}] (source: {passage['source']}, relevance: {passage['score']:.3f})\n"
+            f"{passage['text']}\n"
+        )
+        cost = count_tokens(block, model)
+        if tokens + cost > token_budget:
+            continue  # A smaller, lower-scored passage may still fit
+        parts.append(block)
+        used_hits.extend(passage["hits"])
+        tokens += cost
+
+    stats = {
+        "candidates": len(hits),
+        "duplicates_dropped": len(hits) - len(unique),
+        "passages": len(passages),
+        "passages_used": len(parts),
+        "chunks_used": len(used_hits),
+        "tokens": tokens,
+    }
+    return used_hits, "\n".join(parts), stats
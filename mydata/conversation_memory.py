@@ -0,0 +1,208 @@
+"""Rolling conversation memory for chat prompts
+
+A prompt carries the last CHAT_HISTORY_TURNS raw turns plus a running summary
+of everything before them, instead of replaying whole markdown tables from ten
+messages back. The summary is folded forward by a background job after each
+turn (a cheap model, off the request path), so a reply never waits on it.
+
+Every message stores its token count, so the raw window is trimmed against
+CHAT_HISTORY_TOKEN_BUDGET exactly rather than by message count.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlmodel import select
+from .config import Config
+from .context_packer import count_tokens
+from .executors import get_executor
+from .llm_providers import PROVIDERS, CircuitBreaker
+from .models import ChatConversation, ChatMessage
+
+SUMMARY_PROMPT = """You maintain the running memory of a conversation between a user and an assistant that answers questions from a company knowledge base.
+
+Merge the new exchanges into the existing summary. Keep names, figures, decisions, open questions and what the user is trying to do. Drop formatting, pleasantries and table layout - keep only the facts a follow-up question might rely on. Write at most {max_tokens} tokens of plain prose or short bullets.
+
+EXISTING SUMMARY:
+{summary}
+
+NEW EXCHANGES:
+{transcript}
+
+UPDATED SUMMARY:"""
+
+
+def message_tokens(msg: ChatMessage, model: str) -> int:
+    """Stored token count, or a fresh count for rows written before it was tracked"""
+    if msg.token_count is not None:
+        return msg.token_count
+    return count_tokens(msg.content, model)
+
+
+def build_history(
+    database,
+    conversation_id: int,
+    current_msg_id: int,
+    current_content: str,
+    model: str,
+) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    Prompt history for a turn: (messages oldest-first, summary or None).
+
+    The current user message is always included (as current_content, which may
+    be the anonymized form); earlier messages are added newest-first while they
+    fit the token budget. Messages already folded into the summary are never
+    replayed; older ones the background summary hasn't covered yet are, so a
+    turn never drops out of the prompt while the summary catches up.
+    """
+    with database.read_session() as session:
+        conversation = session.get(ChatConversation, conversation_id)
+        stmt = (
+            select(ChatMessage)
+            .where(ChatMessage.conversation_id == conversation_id)
+            .where(ChatMessage.role.in_(["user", "assistant"]))
+        )
+        if conversation and conversation.summary_through_id:
+            stmt = stmt.where(ChatMessage.id > conversation.summary_through_id)
+        # No turn limit: everything past the summary is a candidate, the token budget stops the loop
+        recent = session.exec(stmt.order_by(ChatMessage.id.desc())).all()
+
+    summary = conversation.summary if conversation else None
+    summary_tokens = (conversation.summary_tokens or 0) if summary else 0
+    budget = Config.CHAT_HISTORY_TOKEN_BUDGET - summary_tokens
+
+    messages = []
+    used = 0
+    for msg in recent:
+        if msg.id == current_msg_id:
+            messages.append({"role": msg.role, "content": current_content})
+            used += message_tokens(msg, model)
+            continue
+        tokens = message_tokens(msg, model)
+        if used + tokens > budget:
+            break
+        messages.append({"role": msg.role, "content": msg.content})
+        used += tokens
+
+    messages.reverse()
+    # Providers expect the first message to be from the user
+    while messages and messages[0]["role"] != "user":
+        messages.pop(0)
+    return messages, summary
+
+
+class ConversationSummarizer:
+    """Folds turns that left the raw window into ChatConversation.summary, in the background"""
+
+    def __init__(self, database, providers, anonymizer=None):
+        self.database = database
+        self.providers = providers
+        self.anonymizer = anonymizer
+        # Separate from the chat breakers: a failing cheap summary model must not
+        # open the circuit for chat replies (nor a chat outage stop summaries)
+        self.breakers = {name: CircuitBreaker(f"{name} summaries") for name in PROVIDERS}
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, conversation_id: int) -> None:
+        """Queue a summary update (at most one per conversation in flight)"""
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+        get_executor("llm").submit(self._run, conversation_id)
+
+    def _run(self, conversation_id: int) -> None:
+        try:
+            self.update(conversation_id)
+        except Exception as e:
+            print(f"[CHAT] Summary update for conversation {conversation_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(conversation_id)
+
+    def _pending_messages(self, conversation: ChatConversation) -> List[ChatMessage]:
+        """Messages older than the raw window that the summary doesn't cover yet"""
+        stmt = (
+            select(ChatMessage)
+            .where(ChatMessage.conversation_id == conversation.id)
+            .where(ChatMessage.role.in_(["user", "assistant"]))
+            .order_by(ChatMessage.id)
+        )
+        if conversation.summary_through_id:
+            stmt = stmt.where(ChatMessage.id > conversation.summary_through_id)
+        with self.database.read_session() as session:
+            messages = session.exec(stmt).all()
+        keep_raw = Config.CHAT_HISTORY_TURNS * 2
+        return messages[:-keep_raw] if len(messages) > keep_raw else []
+
+    def update(self, conversation_id: int) -> bool:
+        """Fold pending messages into the summary; returns True if it changed"""
+        with self.database.read_session() as session:
+            conversation = session.get(ChatConversation, conversation_id)
+        if conversation is None:
+            return False
+
+        pending = self._pending_messages(conversation)
+        if not pending:
+            return False
+
+        transcript = "\n\n".join(f"{msg.role.upper()}: {msg.content}" for msg in pending)
+        summary = self._summarize(conversation.summary or "(none yet)", transcript)
+        if not summary:
+            return False
+
+        with self.database.write_session() as session:
+            row = session.get(ChatConversation, conversation_id)
+            # Another update may have advanced past us meanwhile
+            if (row.summary_through_id or 0) >= pending[-1].id:
+                return False
+            row.summary = summary
+            row.summary_through_id = pending[-1].id
+            row.summary_tokens = count_tokens(summary)
+            session.add(row)
+        return True
+
+    def _summarize(self, summary: str, transcript: str) -> Optional[str]:
+        """One cheap LLM call; anonymized on the way out like chat context"""
+        substitutions: Dict[str, Any] = {}
+        if self.anonymizer:
+            summary, summary_subs = self.anonymizer.anonymize_for_llm(summary)
+            transcript, transcript_subs = self.anonymizer.anonymize_for_llm(transcript)
+            substitutions = {**summary_subs, **transcript_subs}
+
+        prompt = SUMMARY_PROMPT.format(
+            max_tokens=Config.CHAT_SUMMARY_MAX_TOKENS, summary=summary, transcript=transcript)
+
+        text = None
+        for provider in PROVIDERS:
+            client = self.providers.get_client(provider)
+            breaker = self.breakers[provider]
+            if client is None or not breaker.allow():
+                continue
+            try:
+                if provider == "anthropic":
+                    response = client.messages.create(
+                        model=Config.CHAT_SUMMARY_MODEL_ANTHROPIC,
+                        max_tokens=Config.CHAT_SUMMARY_MAX_TOKENS * 2,
+                        messages=[{"role": "user", "content": prompt}],
+                    )
+                    text = response.content[0].text
+                else:
+                    response = client.chat.completions.create(
+                        model=Config.CHAT_SUMMARY_MODEL_OPENAI,
+                        max_tokens=Config.CHAT_SUMMARY_MAX_TOKENS * 2,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.2,
+                    )
+                    text = response.choices[0].message.content
+            except Exception as e:
+                breaker.record_failure(e)
+                continue
+            breaker.record_success()
+            break
+
+        if not text:
+            return None
+        if self.anonymizer and substitutions:
+            text, _ = self.anonymizer.deanonymize_with_markup(text, substitutions, markup_style="plain")
+        return text.strip()
@@ -0,0 +1,213 @@
+"""Materialized corpus counters for the stats endpoints
+
+Every write path bumps the relevant counters inside its own write transaction,
+so /stats, /dashboard/stats and /admin/info read a handful of rows instead of
+scanning documents. rebuild_counters() recomputes everything with indexed
+COUNT/GROUP BY queries (first run, or after out-of-band edits).
+
+The same table holds cache generations ("gen:*"). They only ever increase and
+are bumped once a write is visible to search, so a cache key that embeds the
+current generation can live for hours without ever serving stale results.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import case, delete, func, not_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from . import change_log
+from .models import CorpusStat, Document, Chunk, Tag, Cluster
+
+
+DOCUMENTS = "documents"
+CHUNKS = "chunks"
+TAGS = "tags"
+CLUSTERS = "clusters"
+
+SOURCE_PREFIX = "source:"  # source:emails / source:notes / source:documents
+TYPE_PREFIX = "type:"      # type:file / type:email / type:paste ...
+
+NOTE_SOURCES = ("api", "paste", "note", "text", "saved-chat", "saved-response")
+
+GENERATION_PREFIX = "gen:"
+CORPUS_GENERATION = "gen:corpus"    # Any document/vector added or removed
+REBUILD_GENERATION = "gen:rebuild"  # Whole-index rewrites and deletes; part of every token
+
+# Clustering state since the last full fit (see cluster_assignment); not derivable, so rebuilds keep it
+CLUSTER_FIT_PREFIX = "cluster_fit:"
+CLUSTER_FIT_DOCUMENTS = "cluster_fit:documents"    # Documents at the last fit; last_at = fit time
+CLUSTER_FIT_ASSIGNED = "cluster_fit:assigned"      # New documents joined to a cluster since
+CLUSTER_FIT_NOISE = "cluster_fit:noise"            # New documents too far from every centroid
+CLUSTER_FIT_DISTANCE = "cluster_fit:distance_e4"   # Sum of assigned distances (x 10^4)
+CLUSTER_FIT_MEAN_DISTANCE = "cluster_fit:mean_distance_e4"  # Member distance at fit (x 10^4)
+CLUSTER_NEXT_ID = "cluster_fit:next_id"            # Ids are never reused, so old links can't alias
+CLUSTER_REDUCER_DOCUMENTS = "cluster_fit:reducer_documents"  # Documents the reducer was fit on; last_at = fit time
+
+# ML scheduler high-water marks over change_log.seq, one per task; also kept by rebuilds
+WATERMARK_PREFIX = "ml_watermark:"
+
+
+def tag_generation(tag: str) -> str:
+    return f"{GENERATION_PREFIX}tag:{tag}"
+
+
+def source_generation(source_class: str) -> str:
+    """Scope for a classify_source() bucket (emails / notes / documents)"""
+    return f"{GENERATION_PREFIX}source:{source_class}"
+
+
+def classify_source(source: Optional[str]) -> str:
+    """Bucket a document source into emails / notes / documents"""
+    source = (source or "").lower()
+    if "email" in source or "@" in source or "outlook" in source or source.startswith("/o="):
+        return "emails"
+    if source in NOTE_SOURCES or source.startswith("note:"):
+        return "notes"
+    return "documents"
+
+
+def _source_class_sql():
+    """SQL equivalent of classify_source() for rebuilds"""
+    src = func.lower(Document.source)
+    return case(
+        (or_(src.contains("email"), src.contains("@"), src.contains("outlook"), src.startswith("/o=")), "emails"),
+        (or_(src.in_(NOTE_SOURCES), src.startswith("note:")), "notes"),
+        else_="documents",
+    )
+
+
+def bump(session: Session, name: str, delta: int = 1, at: Optional[datetime] = None) -> None:
+    """Atomically add delta to a counter (upsert), tracking the latest timestamp"""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(CorpusStat).values(name=name, value=delta, last_at=at, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "value": CorpusStat.value + delta,
+            "last_at": func.max(
+                func.coalesce(CorpusStat.last_at, stmt.excluded.last_at),
+                func.coalesce(stmt.excluded.last_at, CorpusStat.last_at),
+            ),
+            "updated_at": now,
+        },
+    )
+    session.execute(stmt)
+
+
+def set_counter(session: Session, name: str, value: int, at: Optional[datetime] = None) -> None:
+    """Overwrite a counter (for writes that replace a whole table, e.g. clusters)"""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(CorpusStat).values(name=name, value=value, last_at=at, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"value": value, "last_at": at, "updated_at": now},
+    )
+    session.execute(stmt)
+
+
+def record_document(session: Session, doc: Document, delta: int = 1) -> None:
+    """Count a document insert (delta=1) or delete (delta=-1), and log it for the ML scheduler"""
+    at = doc.created_at if delta > 0 else None
+    bump(session, DOCUMENTS, delta, at)
+    bump(session, SOURCE_PREFIX + classify_source(doc.source), delta, at)
+    bump(session, TYPE_PREFIX + (doc.source_type or "unknown"), delta, at)
+    change_log.record(session, change_log.DOCUMENT_ADDED if delta > 0 else change_log.DOCUMENT_DELETED, doc.id)
+
+
+def read_counters(session: Session) -> Dict[str, CorpusStat]:
+    """All counters keyed by name (a few dozen rows at most)"""
+    return {row.name: row for row in session.exec(select(CorpusStat)).all()}
+
+
+def get_count(counters: Dict[str, CorpusStat], name: str) -> int:
+    row = counters.get(name)
+    return row.value if row else 0
+
+
+def get_last_at(counters: Dict[str, CorpusStat], name: str) -> Optional[datetime]:
+    row = counters.get(name)
+    return row.last_at if row else None
+
+
+def with_prefix(counters: Dict[str, CorpusStat], prefix: str) -> Dict[str, int]:
+    """Counters under a prefix, e.g. with_prefix(c, TYPE_PREFIX) -> {"file": 10, ...}"""
+    return {
+        name[len(prefix):]: row.value
+        for name, row in counters.items()
+        if name.startswith(prefix) and row.value
+    }
+
+
+def bump_generations(session: Session, names: Iterable[str]) -> None:
+    """Advance cache generations (call once the write is visible to search)"""
+    for name in dict.fromkeys(names):
+        bump(session, name)
+
+
+def read_generations(session: Session, names: List[str]) -> Dict[str, int]:
+    rows = session.exec(select(CorpusStat.name, CorpusStat.value).where(CorpusStat.name.in_(names))).all()
+    values = dict(rows)
+    return {name: values.get(name, 0) for name in names}
+
+
+def generation_token(session: Session, tag: Optional[str] = None, source_class: Optional[str] = None) -> str:
+    """
+    Cache-key component for a query scope.
+
+    Unscoped queries follow the whole corpus; tag/source-scoped queries only
+    change when that tag or source bucket does (plus full rebuilds).
+    """
+    scopes = []
+    if tag:
+        scopes.append(tag_generation(tag))
+    if source_class:
+        scopes.append(source_generation(source_class))
+    if not scopes:
+        scopes.append(CORPUS_GENERATION)
+
+    values = read_generations(session, [REBUILD_GENERATION] + scopes)
+    return ".".join(str(values[name]) for name in [REBUILD_GENERATION] + scopes)
+
+
+def rebuild_counters(session: Session) -> Dict[str, int]:
+    """Recompute every counter from the base tables (indexed COUNT/GROUP BY)"""
+    # Generations must never go backwards, so they survive the rebuild (as do clustering state
+    # and scheduler watermarks)
+    session.execute(delete(CorpusStat).where(
+        not_(CorpusStat.name.startswith(GENERATION_PREFIX)),
+        not_(CorpusStat.name.startswith(CLUSTER_FIT_PREFIX)),
+        not_(CorpusStat.name.startswith(WATERMARK_PREFIX)),
+    ))
+
+    set_counter(session, DOCUMENTS, session.scalar(select(func.count(Document.id))) or 0)
+    set_counter(session, CHUNKS, session.scalar(select(func.count(Chunk.id))) or 0)
+    set_counter(session, TAGS, session.scalar(select(func.count(Tag.id))) or 0)
+    set_counter(session, CLUSTERS, session.scalar(select(func.count(Cluster.id))) or 0)
+
+    source_class = _source_class_sql()
+    for klass, count, last_at in session.exec(
+        select(source_class, func.count(Document.id), func.max(Document.created_at))
+        .group_by(source_class)
+    ).all():
+        set_counter(session, SOURCE_PREFIX + klass, count, last_at)
+
+    for source_type, count, last_at in session.exec(
+        select(Document.source_type, func.count(Document.id), func.max(Document.created_at))
+        .group_by(Document.source_type)
+    ).all():
+        set_counter(session, TYPE_PREFIX + (source_type or "unknown"), count, last_at)
+
+    bump(session, REBUILD_GENERATION)
+
+    session.flush()
+    return {
+        name: row.value
+        for name, row in read_counters(session).items()
+        if not name.startswith((GENERATION_PREFIX, CLUSTER_FIT_PREFIX, WATERMARK_PREFIX))
+    }
+
+
+def ensure_counters(session: Session) -> None:
+    """Build the counters once if they have never been populated"""
+    if session.get(CorpusStat, DOCUMENTS) is None:
+        rebuild_counters(session)
@@ -5,7 +5,6 @@ import time
 import signal
 import sys
 import platform
-import traceback
 from pathlib import Path
 from typing import Optional, List, Dict
 from .crypto import CryptoManager
@@ -13,11 +12,13 @@ from .database import Database
 from .storage import EncryptedStorage
 from .embedder import Embedder
 from .vectordb import VectorDB
+from . import change_log
 from .ml_organizer import MLOrganizer
+from .ml_scheduler import MLScheduler, MLTask
 from .ingestion import IngestionPipeline
 from .file_watcher import FileWatcher
 from .email_watcher import EmailWatcher
-from .models import EmailCredential
+from .models import Document, EmailCredential
 from sqlmodel import select
 from .logger import get_logger
 from .hybrid_search import HybridSearcher
@@ -66,15 +67,14 @@ class Daemon:
         self.vectordb.initialize(dimension=self.embedder.dimension)
         self.settings = settings
 
-        # Create pipeline
-        session = self.db.session()
-        self.ml_organizer = MLOrganizer(self.embedder, session)
+        # Create pipeline (each ingest/ML job opens its own short-lived session)
+        self.ml_organizer = MLOrganizer(self.embedder, self.db, self.vectordb)
         self.pipeline = IngestionPipeline(
-            session, self.storage, self.embedder, self.vectordb, self.ml_organizer
+            self.db, self.storage, self.embedder, self.vectordb, self.ml_organizer
         )
 
         # Create hybrid searcher for better search quality
-        self.hybrid_searcher = HybridSearcher()
+        self.hybrid_searcher = HybridSearcher(self.db, self.vectordb)
 
         # Create anonymizer for LLM privacy protection (if enabled)
         self.anonymizer = None
@@ -110,7 +110,10 @@ class Daemon:
         # Start email watchers
         self._start_email_watchers()
 
-        # Start ML organizer (periodic)
+        # Periodic WAL checkpoint + PRAGMA optimize
+        self.db.start_maintenance()
+
+        # Start ML scheduler (wakes on change-log writes)
         ml_thread = threading.Thread(target=self._ml_loop, daemon=True)
         ml_thread.start()
         self._threads.append(ml_thread)
@@ -174,6 +177,8 @@ class Daemon:
         for email_watcher in self.email_watchers:
             email_watcher.stop()
 
+        self.db.stop_maintenance()
+
         # Wait for all threads to finish
         for thread in self._threads:
             if thread.is_alive():
@@ -260,8 +265,8 @@ class Daemon:
                 logger.warning("Falling back to IMAP...")
 
         # Fallback to IMAP if platform-specific watchers not available
-        session = self.db.session()
-        credentials = session.exec(select(EmailCredential).where(EmailCredential.enabled == True)).all()
+        with self.db.read_session() as session:
+            credentials = session.exec(select(EmailCredential).where(EmailCredential.enabled == True)).all()
 
         if not credentials:
             logger.info("No email accounts configured")
@@ -287,30 +292,48 @@ class Daemon:
             self.email_watchers.append(email_watcher)
 
     def _ml_loop(self) -> None:
-        """Periodic ML organization"""
-        from datetime import datetime
-
-        iteration = 0
-
-        while self._running:
-            time.sleep(self.settings.ml_loop_interval_seconds)
-            iteration += 1
-
-            try:
-                current_time = datetime.now().strftime("%H:%M:%S")
-                logger.info(f"[HEARTBEAT] [{current_time}] System active - Iteration #{iteration}")
-                logger.info(f"[HEARTBEAT] Services: API ✓ | File Watcher ✓ | Email ✓ | ML ✓")
-
-                logger.info(f"[ML] Running periodic organization (cycle #{iteration})...")
-                result = self.ml_organizer.run_clustering()
-
-                if result.get("status") == "ok":
-                    logger.info(f"[ML] Organization cycle #{iteration} complete")
-                else:
-                    logger.warning(f"[ML] Cycle #{iteration} skipped: {result.get('reason', 'unknown')}")
-
-                logger.info(f"[ML] Next organization in {self.settings.ml_loop_interval_seconds} seconds ({datetime.now().strftime('%H:%M:%S')})")
-
-            except Exception as e:
-                logger.error(f"[ML] Error in cycle #{iteration}: {e}")
-                logger.error(f"[ML] Traceback: {traceback.format_exc()}")
+        """Event-driven ML organization: tags, clusters and summaries as scheduled tasks"""
+        from .api import requests_in_flight
+
+        def tag_documents(changes):
+            self.ml_organizer.tag_documents([change.doc_id for change in changes])
+
+        def refit_clusters(changes):
+            result = self.ml_organizer.run_clustering()
+            if result.get("status") in ("error", "busy"):
+                # Keep the watermark so the scheduler retries the fit
+                raise RuntimeError(result.get("reason", "clustering failed"))
+
+        def refresh_summaries(changes):
+            # A document deletion or a full fit (cluster_id None) touches every cluster
+            if any(change.kind == change_log.DOCUMENT_DELETED or
+                   (change.kind == change_log.CLUSTER_CHANGED and change.cluster_id is None) for change in changes):
+                self.ml_organizer.refresh_cluster_summaries()
+                return
+            cluster_ids = {change.cluster_id for change in changes if change.cluster_id is not None}
+            doc_ids = [change.doc_id for change in changes if change.kind == change_log.TAGS_CHANGED]
+            if doc_ids:
+                with self.db.read_session() as session:
+                    cluster_ids.update(session.exec(
+                        select(Document.cluster_id)
+                        .where(Document.id.in_(doc_ids), Document.cluster_id.is_not(None))
+                        .distinct()
+                    ).all())
+            if cluster_ids:
+                self.ml_organizer.refresh_cluster_summaries(cluster_ids)
+
+        scheduler = MLScheduler(
+            self.db,
+            [
+                MLTask("tags", [change_log.DOCUMENT_ADDED], tag_documents),
+                MLTask("clusters", [change_log.DOCUMENT_ADDED, change_log.DOCUMENT_DELETED], refit_clusters,
+                       run_at_start=True),
+                MLTask("summaries", [change_log.TAGS_CHANGED, change_log.CLUSTER_CHANGED, change_log.DOCUMENT_DELETED],
+                       refresh_summaries),
+            ],
+            poll_seconds=self.settings.ml_loop_interval_seconds,
+            busy=lambda: requests_in_flight() > 0,
+        )
+        logger.info(f"[ML] Scheduler waiting for changes (polling other processes every "
+                    f"{self.settings.ml_loop_interval_seconds}s)")
+        scheduler.run(lambda: self._running)
@@ -1,45 +1,240 @@
 """Database connection and setup"""
 
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, Optional, Union
-from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy.pool import StaticPool
+from typing import Dict, Generator, Iterator, Optional, Union
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlmodel import create_engine, Session
+from .config import Config
+from .logger import get_logger
+from .models import SQLModel  # Through .models, so its tables are registered for create_all()
+
+logger = get_logger()
+
+
+def pragma_profile() -> Dict[str, Union[int, str]]:
+    """Per-connection pragmas from Config (applied to every pooled connection)"""
+    return {
+        "synchronous": Config.DATABASE_SYNCHRONOUS,
+        "mmap_size": Config.DATABASE_MMAP_SIZE_MB * 1024 * 1024,
+        "cache_size": -Config.DATABASE_CACHE_SIZE_MB * 1024,  # Negative = KiB
+        "temp_store": Config.DATABASE_TEMP_STORE,
+        "busy_timeout": Config.DATABASE_TIMEOUT * 1000,
+    }
+
+
+def apply_pragmas(dbapi_connection: sqlite3.Connection, wal: bool = True) -> None:
+    """Apply the performance profile to a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if wal:
+            # Persistent in the file, but cheap to re-assert
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for name, value in pragma_profile().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
 
 class Database:
-    """Database manager with optional encryption support"""
+    """
+    Database manager with optional encryption support.
 
-    def __init__(self, db_path: Optional[Union[Path, str]] = None):
+    SQLite allows many concurrent readers but only one writer, so we keep two engines:
+    - a pool of read-only connections for queries (API handlers, ML reads)
+    - a single writer connection, serialized by a lock, for inserts/updates
+
+    WAL mode lets readers proceed while the writer commits. Every connection gets
+    the pragma profile from Config (synchronous, mmap, cache, temp_store, busy_timeout);
+    start_maintenance() runs periodic WAL checkpoints and PRAGMA optimize.
+    Use read_session() / write_session() so every request or job gets its own
+    short-lived session instead of sharing one forever.
+    """
+
+    def __init__(self, db_path: Optional[Union[Path, str]] = None, read_pool_size: Optional[int] = None):
         if db_path is None:
             db_path = Path.home() / ".mydata" / "mydata.db"
         else:
             db_path = Path(db_path)
 
         db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
 
         # Note: For full SQLite encryption, use sqlcipher in production
         # For this implementation, we use standard SQLite with application-level encryption
         connect_args = {
             "check_same_thread": False,
+            "timeout": Config.DATABASE_TIMEOUT,
         }
 
-        # Create engine
+        # Writer engine - exactly one connection, serialized by _write_lock
         self.engine = create_engine(
             f"sqlite:///{db_path}",
             echo=False,
             connect_args=connect_args,
-            poolclass=StaticPool,  # Single connection for SQLite
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
         )
+        event.listen(self.engine, "connect", self._on_writer_connect)
+        self._write_lock = threading.RLock()
 
-        # Create tables
+        # Create tables, then migrate columns on tables that already existed
         SQLModel.metadata.create_all(self.engine)
+        from .migrations import run_migrations
+        with self._write_lock:
+            run_migrations(self.engine)
+
+        # Reader engine - pool of read-only connections
+        pool_size = read_pool_size or Config.DATABASE_READ_POOL_SIZE
+        self.read_engine = create_engine(
+            f"sqlite:///{db_path}",
+            echo=False,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=pool_size,
+        )
+        event.listen(self.read_engine, "connect", self._on_reader_connect)
+
+        # Populate materialized stats counters on first run
+        from .counters import ensure_counters
+        with self.write_session() as session:
+            ensure_counters(session)
+
+        self._maintenance_stop = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _on_writer_connect(dbapi_connection, connection_record) -> None:
+        """Enable WAL so readers don't block behind the writer"""
+        apply_pragmas(dbapi_connection, wal=True)
+
+    @staticmethod
+    def _on_reader_connect(dbapi_connection, connection_record) -> None:
+        """Reader connections must never write"""
+        apply_pragmas(dbapi_connection, wal=False)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    def _exec_on_writer(self, sql: str) -> list:
+        """Run a raw pragma on the writer connection (under the write lock)"""
+        with self._write_lock:
+            with self.engine.connect() as conn:
+                return conn.exec_driver_sql(sql).fetchall()
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Optional[tuple]:
+        """
+        Checkpoint the WAL into the main database file.
+
+        PASSIVE never blocks readers or the writer; TRUNCATE also resets the WAL file.
+        Returns (busy, wal_frames, checkpointed_frames).
+        """
+        rows = self._exec_on_writer(f"PRAGMA wal_checkpoint({mode})")
+        return tuple(rows[0]) if rows else None
+
+    def optimize(self) -> None:
+        """Let SQLite refresh query planner statistics where they are stale"""
+        self._exec_on_writer("PRAGMA optimize")
+
+    def start_maintenance(
+        self,
+        checkpoint_interval: Optional[int] = None,
+        optimize_interval: Optional[int] = None,
+    ) -> None:
+        """Start the background checkpoint/optimize thread (idempotent)"""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+
+        checkpoint_interval = checkpoint_interval or Config.DATABASE_CHECKPOINT_INTERVAL
+        optimize_interval = optimize_interval or Config.DATABASE_OPTIMIZE_INTERVAL
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop,
+            args=(checkpoint_interval, optimize_interval),
+            name="mydata-db-maintenance",
+            daemon=True,
+        )
+        self._maintenance_thread.start()
+
+    def stop_maintenance(self) -> None:
+        """Stop the background maintenance thread"""
+        self._maintenance_stop.set()
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            self._maintenance_thread.join(timeout=5)
+        self._maintenance_thread = None
+
+    def _maintenance_loop(self, checkpoint_interval: int, optimize_interval: int) -> None:
+        """Checkpoint the WAL every checkpoint_interval, optimize every optimize_interval"""
+        last_optimize = 0.0
+        elapsed = 0.0
+
+        while not self._maintenance_stop.wait(checkpoint_interval):
+            elapsed += checkpoint_interval
+            try:
+                result = self.checkpoint("PASSIVE")
+                if result:
+                    logger.debug(f"[DB] WAL checkpoint: busy={result[0]} frames={result[1]} done={result[2]}")
+            except Exception as e:
+                logger.warning(f"[DB] WAL checkpoint failed: {e}")
+
+            if elapsed - last_optimize >= optimize_interval:
+                last_optimize = elapsed
+                try:
+                    self.optimize()
+                    logger.debug("[DB] PRAGMA optimize complete")
+                except Exception as e:
+                    logger.warning(f"[DB] PRAGMA optimize failed: {e}")
+
+    @contextmanager
+    def read_session(self) -> Iterator[Session]:
+        """Short-lived read-only session from the reader pool"""
+        session = Session(self.read_engine, expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @contextmanager
+    def write_session(self) -> Iterator[Session]:
+        """
+        Short-lived session on the serialized writer connection.
+
+        Commits on clean exit, rolls back on error. Keep the block small - only
+        one writer can be active at a time, so never embed or call an LLM inside it.
+        """
+        with self._write_lock:
+            session = Session(self.engine, expire_on_commit=False)
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
 
     def get_session(self) -> Generator[Session, None, None]:
-        """Get database session (use with 'with' statement)"""
+        """Get database session (legacy, single-threaded scripts only - see session())"""
         with Session(self.engine) as session:
             yield session
 
     def session(self) -> Session:
-        """Get a new session"""
+        """
+        Get a new session on the writer engine (legacy, for one-off scripts).
+
+        It bypasses the write lock and holds the only writer connection until
+        the caller closes it, so nothing in the package uses it: use
+        read_session()/write_session() instead.
+        """
         return Session(self.engine)
+
+    def dispose(self) -> None:
+        """Stop maintenance and close all pooled connections"""
+        self.stop_maintenance()
+        self.read_engine.dispose()
+        self.engine.dispose()
@@ -0,0 +1,155 @@
+"""SQLite pragma profile benchmark (default pragmas vs. the tuned profile)"""
+
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+from .database import apply_pragmas
+
+
+SCHEMA = """
+CREATE TABLE document (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_type TEXT,
+    raw_text TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX ix_document_source ON document (source);
+CREATE TABLE chunk (
+    id TEXT PRIMARY KEY,
+    doc_id TEXT NOT NULL REFERENCES document (id),
+    text TEXT NOT NULL,
+    start_offset INTEGER,
+    end_offset INTEGER
+);
+CREATE INDEX ix_chunk_doc_id ON chunk (doc_id);
+"""
+
+WORDS = (
+    "project meeting budget client report schedule invoice review contract "
+    "design network substation energy outage planning resource update status"
+).split()
+
+
+def _make_text(rng: random.Random, size: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(size // 7))
+
+
+def _connect(path: Path, tuned: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    if tuned:
+        apply_pragmas(conn, wal=True)
+    return conn
+
+
+def _insert_doc(conn: sqlite3.Connection, rng: random.Random, text_size: int, chunks: int) -> str:
+    doc_id = uuid.uuid4().hex
+    text = _make_text(rng, text_size)
+    source = rng.choice(["email:inbox", "/docs/report.pdf", "note", "api"])
+    conn.execute(
+        "INSERT INTO document VALUES (?, ?, ?, ?, datetime('now'))",
+        (doc_id, source, "file", text),
+    )
+    step = max(1, len(text) // chunks)
+    conn.executemany(
+        "INSERT INTO chunk VALUES (?, ?, ?, ?, ?)",
+        [
+            (uuid.uuid4().hex, doc_id, text[i:i + step], i, i + step)
+            for i in range(0, len(text), step)
+        ],
+    )
+    return doc_id
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_profile(
+    doc_count: int,
+    tuned: bool,
+    commits: int = 500,
+    reads: int = 2000,
+    text_size: int = 4000,
+    workdir: Optional[Path] = None,
+) -> Dict[str, float]:
+    """
+    Build a DB of doc_count documents and time it under one pragma profile.
+
+    Ingest is measured the way the pipeline writes: one transaction per document.
+    Reads are random primary-key lookups plus a chunk fetch by doc_id.
+    """
+    rng = random.Random(42)
+    tmpdir = tempfile.mkdtemp(dir=workdir)
+    path = Path(tmpdir) / "bench.db"
+
+    conn = _connect(path, tuned)
+    conn.executescript(SCHEMA)
+
+    # Bulk-load the corpus up to the target size in a single transaction
+    ids: List[str] = []
+    conn.execute("BEGIN")
+    for _ in range(max(0, doc_count - commits)):
+        ids.append(_insert_doc(conn, rng, text_size, 4))
+    conn.execute("COMMIT")
+
+    # Timed ingest: one commit per document
+    commit_ms: List[float] = []
+    start = time.perf_counter()
+    for _ in range(commits):
+        t0 = time.perf_counter()
+        conn.execute("BEGIN")
+        ids.append(_insert_doc(conn, rng, text_size, 4))
+        conn.execute("COMMIT")
+        commit_ms.append((time.perf_counter() - t0) * 1000)
+    ingest_seconds = time.perf_counter() - start
+    conn.close()
+
+    # Timed reads on a fresh connection (cold page cache for this connection)
+    conn = _connect(path, tuned)
+    read_ms: List[float] = []
+    for _ in range(reads):
+        doc_id = rng.choice(ids)
+        t0 = time.perf_counter()
+        conn.execute("SELECT source, raw_text FROM document WHERE id = ?", (doc_id,)).fetchone()
+        conn.execute("SELECT text FROM chunk WHERE doc_id = ?", (doc_id,)).fetchall()
+        read_ms.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    conn.execute("SELECT source_type, COUNT(*) FROM document GROUP BY source_type").fetchall()
+    scan_ms = (time.perf_counter() - t0) * 1000
+    conn.close()
+
+    size_mb = sum(f.stat().st_size for f in Path(tmpdir).iterdir()) / (1024 * 1024)
+    for f in Path(tmpdir).iterdir():
+        f.unlink()
+    os.rmdir(tmpdir)
+
+    return {
+        "docs": doc_count,
+        "size_mb": round(size_mb, 1),
+        "ingest_docs_per_sec": round(commits / ingest_seconds, 1),
+        "commit_p50_ms": round(statistics.median(commit_ms), 3),
+        "commit_p95_ms": round(_percentile(commit_ms, 0.95), 3),
+        "read_p50_ms": round(statistics.median(read_ms), 3),
+        "read_p95_ms": round(_percentile(read_ms, 0.95), 3),
+        "scan_ms": round(scan_ms, 1),
+    }
+
+
+def run_benchmark(doc_counts: List[int], **kwargs) -> List[Dict[str, object]]:
+    """Run default and tuned profiles for each corpus size"""
+    results = []
+    for count in doc_counts:
+        for tuned in (False, True):
+            result = run_profile(count, tuned, **kwargs)
+            result["profile"] = "tuned" if tuned else "default"
+            results.append(result)
+    return results
@@ -0,0 +1,152 @@
+"""Document vectors for clustering, mean-pooled from stored chunk vectors
+
+Every chunk is embedded once at ingest and its vector lives in Qdrant, so a
+document's vector is just the normalized mean of its chunk vectors - no model
+inference. Chunks are immutable, so a document's vector never changes once
+computed: each refresh fetches vectors only for documents not seen before and
+drops rows for documents that are gone.
+
+The matrix is float16 (half the memory of float32, ample precision for
+clustering) and persisted next to the SQLite file, so a restart or a one-off
+/clusters/rebuild doesn't have to scroll the whole collection again.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .logger import get_logger
+
+logger = get_logger()
+
+
+def cache_path(database) -> Path:
+    """<db>.docvec.npz beside the database file"""
+    return Path(database.db_path).with_suffix(".docvec.npz")
+
+
+class DocumentVectors:
+    """float16 matrix of mean-pooled chunk vectors, keyed by document id"""
+
+    def __init__(self, vectordb, path: Optional[Path] = None):
+        self.vectordb = vectordb
+        self.path = path
+        self.ids: List[str] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float16)
+        self._index: Dict[str, int] = {}
+        self._pending: Dict[str, np.ndarray] = {}  # Rows from ingest, folded in on refresh/snapshot
+        self._dirty = False  # Rows folded in since the last save
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self.ids = [str(i) for i in data["ids"]]
+                self.matrix = data["matrix"].astype(np.float16, copy=False)
+            self._index = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        except Exception as e:
+            logger.warning(f"[ML] Ignoring unreadable document vector cache {self.path}: {e}")
+            self.ids, self._index = [], {}
+            self.matrix = np.zeros((0, 0), dtype=np.float16)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        # Write-then-rename so a crash never leaves a truncated cache
+        tmp = self.path.with_suffix(".tmp.npz")
+        np.savez(tmp, ids=np.array(self.ids, dtype=str), matrix=self.matrix)
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def _pool(self, doc_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """Mean of each document's chunk vectors, L2-normalized (cosine geometry)"""
+        sums: Dict[str, np.ndarray] = {}
+        counts: Dict[str, int] = {}
+        for doc_id, vector in self.vectordb.iter_document_vectors(doc_ids):
+            if doc_id in sums:
+                sums[doc_id] += vector
+                counts[doc_id] += 1
+            else:
+                sums[doc_id] = vector.copy()
+                counts[doc_id] = 1
+
+        ids = [doc_id for doc_id in doc_ids if doc_id in sums]
+        if not ids:
+            return [], np.zeros((0, self.matrix.shape[1] if len(self.ids) else 0), dtype=np.float16)
+
+        pooled = np.stack([sums[doc_id] / counts[doc_id] for doc_id in ids])
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        pooled /= np.where(norms > 0, norms, 1)
+        return ids, pooled.astype(np.float16)
+
+    def refresh(self, doc_ids: Iterable) -> Tuple[int, int]:
+        """
+        Sync the matrix with the given documents: (added, removed).
+
+        Documents whose chunks aren't in Qdrant yet (ingest still embedding)
+        are simply picked up by a later refresh.
+        """
+        wanted = [str(doc_id) for doc_id in doc_ids]
+        with self._lock:
+            self._fold_pending()
+            wanted_set = set(wanted)
+            missing = [doc_id for doc_id in wanted if doc_id not in self._index]
+            keep = [i for i, doc_id in enumerate(self.ids) if doc_id in wanted_set]
+            removed = len(self.ids) - len(keep)
+
+            new_ids, new_rows = self._pool(missing) if missing else ([], None)
+            if new_ids and len(self.ids) and new_rows.shape[1] != self.matrix.shape[1]:
+                # Embedding model changed - start over with the new dimension
+                logger.info("[ML] Embedding dimension changed, rebuilding document vectors")
+                keep, removed = [], len(self.ids)
+                new_ids, new_rows = self._pool(wanted)
+
+            if not new_ids and not removed:
+                if self._dirty:
+                    self._save()
+                return 0, 0
+
+            kept_ids = [self.ids[i] for i in keep]
+            blocks = [self.matrix[keep]] if keep else []
+            if new_ids:
+                blocks.append(new_rows)
+            self.ids = kept_ids + new_ids
+            self.matrix = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float16)
+            self._index = {doc_id: i for i, doc_id in enumerate(self.ids)}
+            self._save()
+            return len(new_ids), removed
+
+    def add(self, doc_id: str, vector: np.ndarray) -> None:
+        """Queue one document's pooled vector from ingest (no matrix copy per document)"""
+        with self._lock:
+            if doc_id not in self._index:
+                self._pending[doc_id] = np.asarray(vector, dtype=np.float16)
+
+    def _fold_pending(self) -> None:
+        """Append queued ingest rows in one concatenate (caller holds the lock)"""
+        dimension = self.matrix.shape[1] if len(self.ids) else None
+        rows = {
+            doc_id: row for doc_id, row in self._pending.items()
+            if doc_id not in self._index and (dimension is None or row.shape[0] == dimension)
+        }
+        self._pending = {}
+        if not rows or len({row.shape[0] for row in rows.values()}) > 1:
+            return  # Mixed dimensions: refresh() will rebuild from Qdrant
+        block = np.stack(list(rows.values()))
+        self.matrix = np.concatenate([self.matrix, block]) if len(self.ids) else block
+        for doc_id in rows:
+            self._index[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+        self._dirty = True
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """(document ids, float32 matrix) for clustering"""
+        with self._lock:
+            self._fold_pending()
+            return list(self.ids), self.matrix.astype(np.float32)
@@ -0,0 +1,119 @@
+"""Structured email metadata extracted at ingest time"""
+
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Union
+from uuid import UUID
+from .models import EmailMetadata
+
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|sv)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+
+
+def parse_email_date(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """RFC 2822 / ISO / Outlook date -> naive UTC datetime (None if unparseable)"""
+    if value is None or value == "":
+        return None
+
+    dt = value if isinstance(value, datetime) else None
+    if dt is None:
+        text = str(value).strip()
+        try:
+            dt = parsedate_to_datetime(text)
+        except (TypeError, ValueError, IndexError):
+            dt = None
+        if dt is None:
+            try:
+                dt = datetime.fromisoformat(text)
+            except ValueError:
+                return None
+
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def normalize_address(value: Optional[str]) -> str:
+    """'Jane Doe <Jane@Example.com>' -> 'jane@example.com' (or the bare lower-cased value)"""
+    name, addr = parseaddr(value or "")
+    return (addr or name or value or "").strip().lower()
+
+
+def join_recipients(values: Union[str, Iterable[str], None]) -> str:
+    """To/Cc header(s) -> comma-separated lower-cased addresses"""
+    if not values:
+        return ""
+    if isinstance(values, str):
+        values = [values]
+    # Outlook gives "A; B" rather than "A, B"
+    values = [v.replace(";", ",") for v in values if v]
+    addresses = [addr.lower() for _, addr in getaddresses(values) if addr]
+    return ",".join(dict.fromkeys(addresses))
+
+
+def normalize_subject(subject: Optional[str]) -> str:
+    """Strip Re:/Fwd: prefixes and whitespace so replies share a thread key"""
+    return " ".join(_SUBJECT_PREFIX.sub("", subject or "").lower().split())
+
+
+def derive_thread_id(
+    message_id: Optional[str],
+    in_reply_to: Optional[str] = None,
+    references: Optional[str] = None,
+    subject: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Thread key: root of References, else In-Reply-To, else own Message-ID.
+
+    Sources without message ids (AppleScript) fall back to the normalized subject.
+    """
+    if references:
+        root = references.split()[0].strip()
+        if root:
+            return root
+    if in_reply_to and in_reply_to.strip():
+        return in_reply_to.strip()
+    if message_id:
+        return message_id.strip()
+    norm = normalize_subject(subject)
+    if norm:
+        return "subject:" + hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
+    return None
+
+
+def parse_header_block(text: str) -> Dict[str, str]:
+    """Read the 'From:/Subject:/Date:' lines the watchers prepend to full_text"""
+    headers: Dict[str, str] = {}
+    for line in (text or "").split("\n")[:10]:
+        if not line.strip():
+            break
+        key, sep, value = line.partition(":")
+        if sep and key.lower() in ("from", "subject", "date", "to", "cc"):
+            headers[key.lower()] = value.strip()
+    return headers
+
+
+def build_email_metadata(doc_id: UUID, email_data: Dict, fallback_sent_at: Optional[datetime] = None) -> EmailMetadata:
+    """Build the metadata row for an email document from a watcher's email_data dict"""
+    sender = email_data.get("sender") or ""
+    subject = email_data.get("subject") or ""
+    message_id = (email_data.get("message_id") or "").strip() or None
+
+    thread_id = email_data.get("thread_id") or derive_thread_id(
+        message_id,
+        email_data.get("in_reply_to"),
+        email_data.get("references"),
+        subject,
+    )
+
+    return EmailMetadata(
+        doc_id=doc_id,
+        sender=sender[:500],
+        sender_email=normalize_address(sender),
+        recipients=join_recipients(email_data.get("recipients")),
+        subject=subject[:1000],
+        sent_at=parse_email_date(email_data.get("date")) or fallback_sent_at or datetime.utcnow(),
+        message_id=message_id,
+        thread_id=thread_id,
+    )
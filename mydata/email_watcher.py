@@ -146,6 +146,10 @@ class EmailWatcher:
                 "subject": subject,
                 "sender": sender,
                 "date": date,
+                "recipients": [str(msg["to"] or ""), str(msg["cc"] or "")],
+                "message_id": str(msg["message-id"] or ""),
+                "in_reply_to": str(msg["in-reply-to"] or ""),
+                "references": str(msg["references"] or ""),
                 "body": body,
                 "attachments": attachments,
                 "full_text": f"From: {sender}\nSubject: {subject}\nDate: {date}\n\n{body}",
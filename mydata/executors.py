@@ -0,0 +1,53 @@
+"""Bounded thread pools for blocking work called from the async API"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+from .config import Config
+
+
+# Pool name -> max workers. Kept separate so a slow LLM call can never
+# starve embedding, and CPU-heavy text analysis can't starve DB/vector I/O.
+POOL_SIZES: Dict[str, int] = {
+    "io": Config.API_IO_WORKERS,        # SQLite queries, Qdrant calls, ingestion
+    "embed": Config.API_EMBED_WORKERS,  # Sentence-transformer inference
+    "cpu": Config.API_CPU_WORKERS,      # Regex analysis, clustering
+    "llm": Config.API_LLM_WORKERS,      # Anthropic / OpenAI HTTP calls
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Get (or lazily create) the named executor"""
+    if name not in POOL_SIZES:
+        raise ValueError(f"Unknown executor: {name}")
+
+    executor = _executors.get(name)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=POOL_SIZES[name],
+                    thread_name_prefix=f"mydata-{name}",
+                )
+                _executors[name] = executor
+    return executor
+
+
+async def run_in_executor(name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the named executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(name), partial(func, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    """Shut down all executors (called on API shutdown)"""
+    with _lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=wait)
+        _executors.clear()
@@ -1,96 +1,203 @@
-"""Hybrid search combining vector similarity and keyword matching (BM25)"""
+"""Hybrid search combining vector similarity and keyword matching (BM25)
 
-from typing import List, Dict
+Two retrievers - dense embeddings for meaning, BM25 for exact terms like
+project codes and employee ids - return ranked lists that are fused, so
+keyword-only hits surface even when the embedding misses them entirely.
+
+The keyword side comes from the Qdrant collection's sparse vectors when it has
+them (one batched query, one filter); legacy dense-only collections fall back
+to the FTS5 keyword index, queried in parallel with Qdrant.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import numpy as np
-from rank_bm25 import BM25Okapi
+from sqlmodel import select
+from . import keyword_index, sparse_encoder
+from .config import Config
+from .executors import get_executor
+from .models import Tag
+
+SEARCH_MODES = ("vector", "keyword", "hybrid")
+FUSION_METHODS = ("rrf", "score")
+
+
+def tag_filter(database, tag: Optional[str]) -> Optional[dict]:
+    """
+    Qdrant filter for a tag: payloads only carry doc_id, so the tag becomes
+    the ids of its documents (from the tags table, like the FTS5 path).
+    """
+    if not tag:
+        return None
+    with database.read_session() as session:
+        doc_ids = session.exec(select(Tag.doc_id).where(Tag.tag == tag).distinct()).all()
+    return {"doc_ids": [str(doc_id) for doc_id in doc_ids]}
+
+
+def fuse(
+    result_lists: Sequence[List[Dict]],
+    weights: Sequence[float],
+    method: str = "rrf",
+    rrf_k: int = 60,
+    limit: int = 10,
+) -> List[Dict]:
+    """
+    Fuse ranked result lists into one, best first.
+
+    rrf:   sum of weight / (rrf_k + rank) - ignores raw scores, so cosine and
+           BM25 scales never need reconciling
+    score: sum of weight * score / max(score) per list
+
+    Each fused hit keeps the first list's dict for that id (payload etc.) and
+    gains hybrid_score plus the raw score from every list (None if absent).
+    """
+    positions: Dict[str, int] = {}
+    first: List[Dict] = []
+    for results in result_lists:
+        for hit in results:
+            key = str(hit["id"])
+            if key not in positions:
+                positions[key] = len(first)
+                first.append(hit)
+
+    fused = np.zeros(len(first))
+    raw_scores = np.full((len(result_lists), len(first)), np.nan)
+
+    for i, (results, weight) in enumerate(zip(result_lists, weights)):
+        if not results or weight == 0:
+            continue
+        index = np.fromiter((positions[str(hit["id"])] for hit in results), dtype=np.intp, count=len(results))
+        scores = np.fromiter((hit.get("score") or 0.0 for hit in results), dtype=float, count=len(results))
+        raw_scores[i, index] = scores
+
+        if method == "rrf":
+            contribution = weight / (rrf_k + np.arange(1, len(results) + 1))
+        else:
+            top = scores.max()
+            contribution = weight * (scores / top if top > 0 else np.zeros_like(scores))
+        np.add.at(fused, index, contribution)
+
+    order = np.argsort(-fused, kind="stable")[:limit]
+    return [
+        {
+            **first[j],
+            "hybrid_score": float(fused[j]),
+            "list_scores": [None if np.isnan(s) else float(s) for s in raw_scores[:, j]],
+        }
+        for j in order
+    ]
 
 
 class HybridSearcher:
-    """Combines vector search with BM25 keyword search for better results"""
+    """Vector + keyword retrieval with rank fusion"""
 
-    def __init__(self, vector_weight: float = 0.7, bm25_weight: float = 0.3):
+    def __init__(
+        self,
+        database,
+        vectordb,
+        vector_weight: float = Config.HYBRID_SEARCH_VECTOR_WEIGHT,
+        bm25_weight: float = Config.HYBRID_SEARCH_BM25_WEIGHT,
+        fusion: str = Config.HYBRID_FUSION,
+        rrf_k: int = Config.HYBRID_RRF_K,
+    ):
+        self.database = database
+        self.vectordb = vectordb
         self.vector_weight = vector_weight
         self.bm25_weight = bm25_weight
-        self._bm25_index = None
-        self._doc_texts = []
-        self._doc_ids = []
-
-    def build_bm25_index(self, documents: List[Dict]) -> None:
-        """Build BM25 index from documents"""
-        self._doc_texts = [doc.get('text', '') for doc in documents]
-        self._doc_ids = [doc.get('id') for doc in documents]
-
-        # Tokenize documents
-        tokenized_docs = [text.lower().split() for text in self._doc_texts]
-
-        # Build BM25 index
-        self._bm25_index = BM25Okapi(tokenized_docs)
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+
+    @property
+    def native(self) -> bool:
+        """Keyword hits come from Qdrant's sparse vectors"""
+        return self.vectordb.has_sparse
+
+    @property
+    def enabled(self) -> bool:
+        return self.native or keyword_index.available(self.database)
+
+    def _filter(self, tag: Optional[str]) -> Optional[dict]:
+        return tag_filter(self.database, tag)
+
+    def keyword_search(self, query: str, limit: int, tag: Optional[str] = None) -> List[Dict]:
+        if self.native:
+            return self.vectordb.sparse_search(sparse_encoder.encode_query(query), limit, self._filter(tag))
+        return keyword_index.search(self.database, query, limit=limit, tag=tag)
+
+    def native_search(
+        self, query_vector, query: str, limit: int, tag: Optional[str] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """(vector_hits, keyword_hits) from one batched Qdrant call"""
+        return self.vectordb.hybrid_search(
+            query_vector, sparse_encoder.encode_query(query), limit=limit, filter_dict=self._filter(tag))
+
+    def combine(
+        self,
+        vector_results: List[Dict],
+        keyword_results: List[Dict],
+        limit: int = 10,
+        vector_weight: Optional[float] = None,
+        bm25_weight: Optional[float] = None,
+        fusion: Optional[str] = None,
+    ) -> List[Dict]:
+        """Fuse the two retrievers' lists (per-call weights/fusion override the defaults)"""
+        fused = fuse(
+            [vector_results, keyword_results],
+            weights=[
+                self.vector_weight if vector_weight is None else vector_weight,
+                self.bm25_weight if bm25_weight is None else bm25_weight,
+            ],
+            method=fusion or self.fusion,
+            rrf_k=self.rrf_k,
+            limit=limit,
+        )
+        for hit in fused:
+            hit["vector_score"], hit["bm25_score"] = hit.pop("list_scores")
+        return fused
 
     def search(
         self,
         query: str,
-        vector_results: List[Dict],
-        limit: int = 10
+        embed: Callable[[str], Sequence[float]],
+        limit: int = 10,
+        mode: str = "hybrid",
+        tag: Optional[str] = None,
+        vector_weight: Optional[float] = None,
+        bm25_weight: Optional[float] = None,
+        fusion: Optional[str] = None,
     ) -> List[Dict]:
         """
-        Hybrid search combining vector and BM25 scores
+        Retrieve with one or both retrievers and fuse
 
         Args:
             query: Search query string
-            vector_results: Results from vector search with scores
+            embed: Embeds the query for the dense side
             limit: Number of results to return
+            mode: "vector", "keyword" or "hybrid"
+            tag: Restrict hits to documents with this tag
 
         Returns:
-            Re-ranked results with hybrid scores
+            Fused results with hybrid, vector and BM25 scores
         """
-        if not self._bm25_index:
-            # No BM25 index, return vector results as-is
-            return vector_results[:limit]
-
-        # Get BM25 scores for query
-        query_tokens = query.lower().split()
-        bm25_scores = self._bm25_index.get_scores(query_tokens)
-
-        # Create BM25 score lookup by doc ID
-        bm25_lookup = {}
-        for doc_id, score in zip(self._doc_ids, bm25_scores):
-            bm25_lookup[doc_id] = score
-
-        # Normalize scores to [0, 1]
-        def normalize_scores(scores):
-            if not scores or max(scores) == 0:
-                return scores
-            max_score = max(scores)
-            return [s / max_score for s in scores]
-
-        # Combine scores
-        hybrid_results = []
-        vector_scores = [r.get('score', 0) for r in vector_results]
-        normalized_vector = normalize_scores(vector_scores)
-
-        for i, result in enumerate(vector_results):
-            doc_id = result.get('id')
-
-            # Get BM25 score for this document
-            bm25_score = bm25_lookup.get(doc_id, 0)
-
-            # Normalize BM25 score
-            normalized_bm25 = bm25_score / max(bm25_scores) if max(bm25_scores) > 0 else 0
-
-            # Compute hybrid score
-            hybrid_score = (
-                self.vector_weight * normalized_vector[i] +
-                self.bm25_weight * normalized_bm25
-            )
-
-            # Add to result
-            result_copy = result.copy()
-            result_copy['hybrid_score'] = hybrid_score
-            result_copy['vector_score'] = result['score']
-            result_copy['bm25_score'] = bm25_score
-            hybrid_results.append(result_copy)
-
-        # Sort by hybrid score
-        hybrid_results.sort(key=lambda x: x['hybrid_score'], reverse=True)
-
-        return hybrid_results[:limit]
+        if mode == "keyword":
+            return self.keyword_search(query, limit, tag=tag)
+        if mode == "vector" or not self.enabled:
+            return self.vectordb.search(query_vector=embed(query), limit=limit, filter_dict=self._filter(tag))
+
+        candidates = limit * Config.HYBRID_CANDIDATE_MULTIPLIER
+        if self.native:
+            vector_results, keyword_results = self.native_search(embed(query), query, candidates, tag)
+        else:
+            # FTS5 lookup runs on the io pool while this thread embeds and scans Qdrant
+            keyword_future = get_executor("io").submit(self.keyword_search, query, candidates, tag)
+            vector_results = self.vectordb.search(
+                query_vector=embed(query), limit=candidates, filter_dict=self._filter(tag))
+            keyword_results = keyword_future.result()
+
+        return self.combine(
+            vector_results,
+            keyword_results,
+            limit=limit,
+            vector_weight=vector_weight,
+            bm25_weight=bm25_weight,
+            fusion=fusion,
+        )
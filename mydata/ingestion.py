@@ -5,7 +5,12 @@ from pathlib import Path
 from typing import Optional, List
 from uuid import UUID, uuid4
 from datetime import datetime
-from sqlmodel import Session
+from sqlmodel import select
+from . import counters, keyword_index, sparse_encoder
+from .config import Config
+from .content_store import make_content, make_preview
+from .email_metadata import build_email_metadata
+from .database import Database
 from .models import Document, Chunk
 from .storage import EncryptedStorage
 from .embedder import Embedder
@@ -18,13 +23,13 @@ class IngestionPipeline:
 
     def __init__(
         self,
-        db_session: Session,
+        database: Database,
         storage: EncryptedStorage,
         embedder: Embedder,
         vectordb: VectorDB,
         ml_organizer: Optional[MLOrganizer] = None,
     ):
-        self.db = db_session
+        self.database = database
         self.storage = storage
         self.embedder = embedder
         self.vectordb = vectordb
@@ -57,7 +62,8 @@ class IngestionPipeline:
         file_hash = self.storage.compute_hash(content)
 
         # Check if already exists
-        existing = self.db.query(Document).filter(Document.file_hash == file_hash).first()
+        with self.database.read_session() as session:
+            existing = session.exec(select(Document).where(Document.file_hash == file_hash)).first()
         if existing:
             print(f"[!] File already indexed: {file_path.name}")
             return existing.id
@@ -72,16 +78,19 @@ class IngestionPipeline:
             source_type="file",
             mime_type=self._detect_mime_type(file_path),
             file_hash=file_hash,
-            raw_text=text,
+            preview=make_preview(text),
             file_modified_at=metadata.get('modified_at'),
             file_created_at=metadata.get('created_at'),
             file_size_bytes=metadata.get('size_bytes'),
             file_owner=metadata.get('owner'),
         )
 
-        self.db.add(doc)
-        self.db.commit()
-        self.db.refresh(doc)
+        content = make_content(doc.id, text)  # Compress outside the write lock
+
+        with self.database.write_session() as session:
+            session.add(doc)
+            session.add(content)
+            counters.record_document(session, doc)
 
         # Process chunks and embeddings
         self._process_document(doc, text)
@@ -100,12 +109,15 @@ class IngestionPipeline:
         doc = Document(
             source=source,
             source_type="paste" if source == "stdin" else "other",
-            raw_text=text,
+            preview=make_preview(text),
         )
 
-        self.db.add(doc)
-        self.db.commit()
-        self.db.refresh(doc)
+        content = make_content(doc.id, text)  # Compress outside the write lock
+
+        with self.database.write_session() as session:
+            session.add(doc)
+            session.add(content)
+            counters.record_document(session, doc)
 
         # Process chunks and embeddings
         self._process_document(doc, text)
@@ -136,12 +148,17 @@ class IngestionPipeline:
         doc = Document(
             source=source,
             source_type="email",
-            raw_text=text,
+            preview=make_preview(text),
         )
 
-        self.db.add(doc)
-        self.db.commit()
-        self.db.refresh(doc)
+        content = make_content(doc.id, text)  # Compress outside the write lock
+        metadata = build_email_metadata(doc.id, email_data, fallback_sent_at=doc.created_at)
+
+        with self.database.write_session() as session:
+            session.add(doc)
+            session.add(content)
+            session.add(metadata)
+            counters.record_document(session, doc)
 
         # Process chunks and embeddings
         chunk_count = self._process_document(doc, text)
@@ -158,48 +175,65 @@ class IngestionPipeline:
     def _process_document(self, doc: Document, text: str) -> int:
         """Process document: chunk, embed, and organize"""
         # Simple chunking (split by paragraphs or fixed size)
-        chunks = self._chunk_text(text, max_length=512)
+        chunks = self._chunk_text(text, max_length=Config.CHUNK_SIZE)
 
         # Create chunk records and embeddings
+        new_chunks = []
         chunk_ids = []
         chunk_texts = []
-
-        for i, chunk_text in enumerate(chunks):
-            chunk = Chunk(
-                doc_id=doc.id,
-                text=chunk_text,
-                start_offset=i * 512,  # Approximate
-                end_offset=i * 512 + len(chunk_text),
-            )
-            self.db.add(chunk)
-            chunk_ids.append(chunk.id)
-            chunk_texts.append(chunk_text)
-
-        self.db.commit()
+        keyword_indexed = keyword_index.available(self.database)
+
+        with self.database.write_session() as session:
+            for i, chunk_text in enumerate(chunks):
+                chunk = Chunk(
+                    doc_id=doc.id,
+                    text=chunk_text,
+                    start_offset=i * Config.CHUNK_SIZE,  # Approximate
+                    end_offset=i * Config.CHUNK_SIZE + len(chunk_text),
+                    chunk_index=i,
+                )
+                session.add(chunk)
+                new_chunks.append(chunk)
+                chunk_ids.append(chunk.id)
+                chunk_texts.append(chunk_text)
+            counters.bump(session, counters.CHUNKS, len(chunks))
+            # Keyword index is updated in the same transaction as the rows
+            if keyword_indexed:
+                keyword_index.index_chunks(session, new_chunks)
 
         # Generate embeddings
         if chunk_texts:
             embeddings = self.embedder.embed_batch(chunk_texts)
 
-            # Store in vector DB
-            for chunk_id, embedding in zip(chunk_ids, embeddings):
+            # Store in vector DB - ids and filter fields only; search hydrates
+            # the text from the chunks table (chunk_store.hydrate_hits)
+            for i, (chunk_id, embedding) in enumerate(zip(chunk_ids, embeddings)):
                 self.vectordb.upsert(
                     doc_id=str(chunk_id),
                     vector=embedding,
                     payload={
                         "doc_id": str(doc.id),
-                        "text": chunk_texts[chunk_ids.index(chunk_id)][:200],
                         "source": doc.source,
+                        "start_offset": i * Config.CHUNK_SIZE,
                     },
+                    sparse=sparse_encoder.encode_document(chunk_texts[i]),
                 )
 
-        # Run ML organization
+            # Vectors are now searchable - move cached search results forward
+            with self.database.write_session() as session:
+                counters.bump_generations(session, [
+                    counters.CORPUS_GENERATION,
+                    counters.source_generation(counters.classify_source(doc.source)),
+                ])
+
+        # Cluster assignment from the fresh chunk vectors; tagging is scheduled
+        # work picked up from the change log (record_document above)
         if self.ml_organizer:
-            self.ml_organizer.organize_document(str(doc.id), text)
+            self.ml_organizer.organize_document(doc.id, chunk_vectors=embeddings if chunk_texts else None)
 
         return len(chunks)
 
-    def _chunk_text(self, text: str, max_length: int = 512) -> List[str]:
+    def _chunk_text(self, text: str, max_length: int = Config.CHUNK_SIZE) -> List[str]:
         """Simple text chunking"""
         # Split by paragraphs first
         paragraphs = text.split("\n\n")
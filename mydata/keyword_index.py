@@ -0,0 +1,124 @@
+"""Persistent BM25 keyword index over chunk text (SQLite FTS5)
+
+The chunk_fts virtual table is an inverted index in the same database file: it
+is created and backfilled once by a migration, then kept current by
+IngestionPipeline, which indexes new chunks in the same transaction that
+inserts them. Nothing has to be rebuilt in RAM at startup.
+
+Queries run entirely inside SQLite: FTS5 walks only the postings of the query
+terms and ORDER BY rank LIMIT k keeps just the top k, so cost tracks the
+matching postings rather than the corpus size.
+"""
+
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import text
+from .logger import get_logger
+
+logger = get_logger()
+
+FTS_TABLE = "chunk_fts"
+MAX_QUERY_TERMS = 32  # Long pasted queries would otherwise OR together hundreds of terms
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Whether the index exists, by database path (FTS5 can be missing from a SQLite build)
+_available: Dict[str, bool] = {}
+
+
+def create_index(conn: sqlite3.Connection) -> bool:
+    """Create chunk_fts if missing and index every existing chunk; False without FTS5"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+        if cursor.fetchone():
+            return True
+
+        logger.info("[DB] Building keyword index (chunk_fts)...")
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "chunk_id UNINDEXED, doc_id UNINDEXED, text, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} (chunk_id, doc_id, text) SELECT id, doc_id, text FROM chunks")
+            indexed = cursor.rowcount
+            cursor.execute("COMMIT")
+        except sqlite3.OperationalError as e:
+            cursor.execute("ROLLBACK")
+            if "fts5" in str(e).lower():
+                logger.warning(f"[DB] SQLite {sqlite3.sqlite_version} has no FTS5 - keyword search disabled")
+                return False
+            raise
+        logger.info(f"[DB] Keyword index built for {indexed} chunks")
+        return True
+    finally:
+        cursor.close()
+
+
+def available(database) -> bool:
+    """Does this database have the keyword index?"""
+    key = str(database.db_path)
+    if key not in _available:
+        with database.read_session() as session:
+            found = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+        _available[key] = found is not None
+    return _available[key]
+
+
+def index_chunks(session, chunks: Iterable) -> None:
+    """Add new Chunk rows to the index (call inside the write session that inserts them)"""
+    rows = [
+        {"chunk_id": chunk.id.hex, "doc_id": chunk.doc_id.hex, "text": chunk.text}
+        for chunk in chunks
+    ]
+    if rows:
+        session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (chunk_id, doc_id, text) VALUES (:chunk_id, :doc_id, :text)"),
+            rows,
+        )
+
+
+def match_expression(query: str) -> Optional[str]:
+    """'Who owns PRJ-9002?' -> '"who" OR "owns" OR "prj" OR "9002"' (None if no terms)"""
+    terms = list(dict.fromkeys(term.lower() for term in _TERM.findall(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    # Quoting makes every term a literal, so user input can't inject FTS5 syntax
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def search(database, query: str, limit: int = 10, tag: Optional[str] = None) -> List[Dict]:
+    """Top-k chunks by BM25, best first, as {"id", "score", "payload": {"doc_id", "source"}}"""
+    expression = match_expression(query)
+    if not expression or not available(database):
+        return []
+
+    tag_filter = " AND doc_id IN (SELECT doc_id FROM tags WHERE tag = :tag)" if tag else ""
+    # Top-k inside the FTS query, so the join only touches k rows
+    sql = (
+        "SELECT m.chunk_id, m.doc_id, m.rank, d.source FROM ("
+        f"SELECT chunk_id, doc_id, rank FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH :expression{tag_filter} ORDER BY rank LIMIT :limit"
+        ") m LEFT JOIN documents d ON d.id = m.doc_id ORDER BY m.rank"
+    )
+    params = {"expression": expression, "limit": limit}
+    if tag:
+        params["tag"] = tag
+
+    with database.read_session() as session:
+        rows = session.execute(text(sql), params).all()
+    return [
+        {
+            "id": str(UUID(chunk_id)),
+            "score": -rank,  # FTS5 bm25() is negative; higher is better here
+            "payload": {"doc_id": str(UUID(doc_id)), "source": source or ""},
+        }
+        for chunk_id, doc_id, rank, source in rows
+    ]
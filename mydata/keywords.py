@@ -0,0 +1,147 @@
+"""TF-IDF keywords for document tags and class-based TF-IDF for cluster labels
+
+Plain term frequency promotes words every document uses ("will", "team"). Tags
+are scored by TF-IDF against a corpus document-frequency table (term_stats)
+that is updated in the same transaction as the tags, so IDF sharpens as the
+corpus grows without ever re-scanning old documents. Cluster labels use
+c-TF-IDF: a term scores high when it is frequent in one cluster and rare
+across the others.
+
+Both work on sparse (row, term, count) triples in NumPy - no per-document
+Counter, no dense document x vocabulary matrix.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from .models import TermStat
+from .sparse_encoder import tokenize
+
+# term_stats row holding the number of documents counted (tokens are never empty)
+DOCUMENT_COUNT_TERM = ""
+
+# Boilerplate common enough in mail and office documents to never be a keyword
+STOP_WORDS = frozenset({
+    "the", "is", "at", "which", "on", "a", "an", "and", "or", "but",
+    "in", "with", "to", "for", "of", "this", "that", "it", "be", "as",
+    "are", "was", "were", "been", "being", "have", "has", "had", "do",
+    "does", "did", "will", "would", "could", "should", "may", "might",
+    "must", "shall", "can", "need", "from", "by", "about", "into",
+    "through", "during", "before", "after", "above", "below", "between",
+    "under", "again", "further", "then", "once", "here", "there", "when",
+    "where", "why", "how", "all", "each", "few", "more", "most", "other",
+    "some", "such", "no", "nor", "not", "only", "own", "same", "so",
+    "than", "too", "very", "just", "also", "now", "re", "ve", "ll",
+    "hi", "hello", "thanks", "thank", "please", "regards", "best",
+    "sent", "subject", "date", "email", "mailto", "http", "https",
+    "www", "com", "org", "net", "au", "gmail", "outlook",
+})
+
+
+def terms(text: str) -> List[str]:
+    """Candidate keywords: alphabetic tokens longer than three letters, minus stop words"""
+    return [t for t in tokenize(text) if len(t) > 3 and t.isalpha() and t not in STOP_WORDS]
+
+
+def count_matrix(term_lists: Sequence[List[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """(rows, term ids, counts, vocabulary): one entry per distinct term in each row"""
+    vocabulary: Dict[str, int] = {}
+    lengths = np.fromiter((len(t) for t in term_lists), dtype=np.int64, count=len(term_lists))
+    ids = np.fromiter(
+        (vocabulary.setdefault(term, len(vocabulary)) for row in term_lists for term in row),
+        dtype=np.int64, count=int(lengths.sum()),
+    )
+    rows = np.repeat(np.arange(len(term_lists), dtype=np.int64), lengths)
+    size = max(len(vocabulary), 1)
+    keys, counts = np.unique(rows * size + ids, return_counts=True)
+    return keys // size, keys % size, counts, list(vocabulary)
+
+
+def _top_k(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, n_rows: int, k: int) -> List[List[Tuple[int, float]]]:
+    """Best k (term id, score) per row, highest first"""
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < k
+    result: List[List[Tuple[int, float]]] = [[] for _ in range(n_rows)]
+    for row, col, score in zip(rows[keep], cols[keep], scores[keep]):
+        result[row].append((int(col), float(score)))
+    return result
+
+
+def load_document_frequencies(session: Session, vocabulary: Sequence[str], batch_size: int = 500) -> Dict[str, int]:
+    """Stored document frequency for each term (plus DOCUMENT_COUNT_TERM), batched IN (...)"""
+    wanted = [DOCUMENT_COUNT_TERM] + list(vocabulary)
+    frequencies: Dict[str, int] = {}
+    for start in range(0, len(wanted), batch_size):
+        batch = wanted[start:start + batch_size]
+        frequencies.update(session.exec(
+            select(TermStat.term, TermStat.doc_freq).where(TermStat.term.in_(batch))
+        ).all())
+    return frequencies
+
+
+def add_document_frequencies(session: Session, vocabulary: Sequence[str], doc_freq: np.ndarray, documents: int) -> None:
+    """Fold a batch's per-term document counts into term_stats (one executemany upsert)"""
+    table = TermStat.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["term"],
+        set_={"doc_freq": table.c.doc_freq + stmt.excluded.doc_freq, "updated_at": stmt.excluded.updated_at},
+    )
+    now = datetime.utcnow()
+    rows = [{"term": DOCUMENT_COUNT_TERM, "doc_freq": documents, "updated_at": now}]
+    rows.extend(
+        {"term": term, "doc_freq": int(count), "updated_at": now}
+        for term, count in zip(vocabulary, doc_freq) if count
+    )
+    session.connection().execute(stmt, rows)
+
+
+def tfidf_keywords(
+    term_lists: Sequence[List[str]],
+    stored_frequencies: Dict[str, int],
+    top_k: int = 3,
+    min_count: int = 2,
+) -> Tuple[List[List[Tuple[str, float]]], List[str], np.ndarray]:
+    """
+    Top TF-IDF terms per document: ([(term, score), ...] per row, vocabulary, batch doc freq).
+
+    IDF counts the batch itself on top of the stored frequencies (smoothed:
+    ln((1 + N) / (1 + df)) + 1); TF is sublinear (1 + ln count). Terms seen
+    fewer than min_count times in a document are not keywords for it.
+    """
+    rows, cols, counts, vocabulary = count_matrix(term_lists)
+    batch_df = np.bincount(cols, minlength=len(vocabulary))
+    stored = np.fromiter((stored_frequencies.get(t, 0) for t in vocabulary), dtype=np.float64, count=len(vocabulary))
+    documents = stored_frequencies.get(DOCUMENT_COUNT_TERM, 0) + len(term_lists)
+    idf = np.log((1 + documents) / (1 + stored + batch_df)) + 1
+
+    keep = counts >= min_count
+    rows, cols = rows[keep], cols[keep]
+    scores = (1 + np.log(counts[keep])) * idf[cols]
+    top = _top_k(rows, cols, scores, len(term_lists), top_k)
+    return [[(vocabulary[col], score) for col, score in row] for row in top], vocabulary, batch_df
+
+
+def class_tfidf_labels(class_texts: Dict[int, Iterable[str]], top_k: int = 3) -> Dict[int, List[str]]:
+    """
+    Top c-TF-IDF terms per class (cluster).
+
+    Each class is one big document: weight = tf(t, c) / |c| * ln(1 + A / f(t)),
+    with A the average class size in terms and f(t) the term's total count.
+    """
+    labels = list(class_texts)
+    term_lists = [[t for text in class_texts[label] for t in terms(text)] for label in labels]
+    rows, cols, counts, vocabulary = count_matrix(term_lists)
+    if not len(rows):
+        return {label: [] for label in labels}
+
+    class_sizes = np.bincount(rows, weights=counts, minlength=len(labels))
+    term_totals = np.bincount(cols, weights=counts, minlength=len(vocabulary))
+    average = class_sizes.mean()
+    scores = counts / np.maximum(class_sizes[rows], 1) * np.log(1 + average / term_totals[cols])
+    top = _top_k(rows, cols, scores, len(labels), top_k)
+    return {label: [vocabulary[col] for col, _ in row] for label, row in zip(labels, top)}
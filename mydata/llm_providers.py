@@ -0,0 +1,167 @@
+"""Long-lived LLM provider clients with circuit breakers
+
+The registry decrypts each API key once and keeps one SDK client per provider;
+the Anthropic and OpenAI clients own an httpx connection pool, so reusing them
+keeps TLS connections warm between chat turns. POST /api-key invalidates the
+affected provider.
+
+Each provider has a circuit breaker: after LLM_BREAKER_FAILURES consecutive
+failures it is skipped for LLM_BREAKER_RESET_SECONDS, then a single trial call
+decides whether it closes again. Failover no longer pays a failing provider's
+timeout on every request.
+
+Both SDKs honour ANTHROPIC_BASE_URL / OPENAI_BASE_URL, which is how a local
+fake provider server can stand in for the real APIs.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlmodel import select
+from .config import Config
+from .models import ApiKey
+
+PROVIDERS = ("anthropic", "openai")  # Failover order
+
+_MISSING = object()  # Cached "no key configured / SDK not installed"
+
+
+class CircuitBreaker:
+    """closed -> open after repeated failures -> half_open trial -> closed/open"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = Config.LLM_BREAKER_FAILURES,
+        reset_seconds: float = Config.LLM_BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a call go through now? (claims the single half-open trial)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial_started = None
+            # A trial that never reported back (abandoned stream) expires after reset_seconds
+            if self.state == "half_open" and (
+                self._trial_started is None or now - self._trial_started >= self.reset_seconds
+            ):
+                self._trial_started = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_started = None
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error else None
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"[LLM] Circuit for {self.name} opened after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_started = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = max(0.0, round(self.reset_seconds - (time.monotonic() - self.opened_at), 1))
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in_seconds": retry_in,
+                "last_error": self.last_error,
+            }
+
+
+class ProviderRegistry:
+    """Cached, pooled SDK clients for each configured LLM provider"""
+
+    def __init__(self, database, crypto):
+        self.database = database
+        self.crypto = crypto
+        self.breakers: Dict[str, CircuitBreaker] = {name: CircuitBreaker(name) for name in PROVIDERS}
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _load_key(self, service: str) -> Optional[str]:
+        stmt = select(ApiKey).where(ApiKey.service == service, ApiKey.enabled == True)
+        with self.database.read_session() as session:
+            record = session.exec(stmt).first()
+        if not record:
+            return None
+        return self.crypto.decrypt_str(record.encrypted_key)
+
+    def _build_client(self, service: str, api_key: str):
+        try:
+            if service == "anthropic":
+                import anthropic
+                return anthropic.Anthropic(
+                    api_key=api_key,
+                    timeout=Config.LLM_TIMEOUT_SECONDS,
+                    max_retries=Config.LLM_MAX_RETRIES,
+                )
+            if service == "openai":
+                from openai import OpenAI
+                return OpenAI(
+                    api_key=api_key,
+                    timeout=Config.LLM_TIMEOUT_SECONDS,
+                    max_retries=Config.LLM_MAX_RETRIES,
+                )
+        except ImportError:
+            return None  # SDK not installed
+        raise ValueError(f"Unknown LLM provider: {service}")
+
+    def get_client(self, service: str):
+        """SDK client for a provider, or None if no key is configured"""
+        client = self._clients.get(service)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service)
+                if client is None:
+                    api_key = self._load_key(service)
+                    client = self._build_client(service, api_key) if api_key else None
+                    client = _MISSING if client is None else client
+                    self._clients[service] = client
+        return None if client is _MISSING else client
+
+    def invalidate(self, service: Optional[str] = None) -> None:
+        """
+        Forget a cached key/client (after the key changes).
+
+        The old client isn't closed here - a request on another thread may still
+        be using it; its pool is released when that reference goes away.
+        """
+        with self._lock:
+            names = [service] if service else list(self._clients)
+            for name in names:
+                self._clients.pop(name, None)
+                if name in self.breakers:
+                    self.breakers[name].record_success()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "configured": self.get_client(name) is not None,
+                "circuit": self.breakers[name].snapshot(),
+            }
+            for name in PROVIDERS
+        }
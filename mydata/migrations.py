@@ -0,0 +1,248 @@
+"""In-place schema migrations for existing databases
+
+SQLModel's create_all() only creates missing tables, so column changes on
+existing tables are applied here. Every migration is idempotent: it inspects
+the current schema and does nothing if it has already been applied.
+"""
+
+import sqlite3
+from typing import Callable, List, Set
+from .logger import get_logger
+
+logger = get_logger()
+
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> Set[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def move_raw_text_to_content_store(conn: sqlite3.Connection) -> None:
+    """documents.raw_text -> compressed document_content rows + documents.preview"""
+    from .content_store import compress_text, make_preview
+
+    cursor = conn.cursor()
+    columns = _columns(cursor, "documents")
+    if "raw_text" not in columns:
+        return
+
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} cannot drop columns; "
+            "upgrade Python/SQLite (3.35+) to migrate documents.raw_text"
+        )
+
+    logger.info("[DB] Migrating documents.raw_text to compressed document_content...")
+    cursor.execute("BEGIN")
+    try:
+        if "preview" not in columns:
+            cursor.execute("ALTER TABLE documents ADD COLUMN preview VARCHAR NOT NULL DEFAULT ''")
+
+        moved = 0
+        last_rowid = 0
+        while True:
+            cursor.execute(
+                "SELECT rowid, id, raw_text FROM documents WHERE rowid > ? ORDER BY rowid LIMIT 500",
+                (last_rowid,),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            content_rows = []
+            preview_rows = []
+            for rowid, doc_id, raw_text in rows:
+                text = raw_text or ""
+                codec, data = compress_text(text)
+                content_rows.append((doc_id, codec, data, len(text.encode("utf-8"))))
+                preview_rows.append((make_preview(text), rowid))
+                last_rowid = rowid
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO document_content (doc_id, codec, data, size_bytes) VALUES (?, ?, ?, ?)",
+                content_rows,
+            )
+            cursor.executemany("UPDATE documents SET preview = ? WHERE rowid = ?", preview_rows)
+            moved += len(rows)
+
+        cursor.execute("ALTER TABLE documents DROP COLUMN raw_text")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"[DB] Moved text for {moved} documents (run VACUUM to reclaim file space)")
+
+
+def _format_datetime(dt) -> str:
+    """Same text format SQLAlchemy uses for DateTime columns on SQLite"""
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def backfill_email_metadata(conn: sqlite3.Connection) -> None:
+    """Create email_metadata rows for emails ingested before the table existed"""
+    from .email_metadata import derive_thread_id, normalize_address, parse_email_date, parse_header_block
+
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT d.id, d.preview, d.created_at FROM documents d "
+        "LEFT JOIN email_metadata m ON m.doc_id = d.id "
+        "WHERE d.source_type = 'email' AND m.doc_id IS NULL"
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        cursor.close()
+        return
+
+    logger.info(f"[DB] Backfilling email metadata for {len(rows)} emails...")
+    records = []
+    for doc_id, preview, created_at in rows:
+        headers = parse_header_block(preview or "")
+        sender = headers.get("from", "")
+        subject = headers.get("subject", "")
+        sent_at = parse_email_date(headers.get("date"))
+        records.append((
+            doc_id,
+            sender[:500],
+            normalize_address(sender),
+            "",
+            subject[:1000],
+            _format_datetime(sent_at) if sent_at else created_at,
+            None,
+            derive_thread_id(None, subject=subject),
+        ))
+
+    cursor.execute("BEGIN")
+    try:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO email_metadata "
+            "(doc_id, sender, sender_email, recipients, subject, sent_at, message_id, thread_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            records,
+        )
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+
+
+def add_conversation_memory_columns(conn: sqlite3.Connection) -> None:
+    """Rolling summary columns on chat_conversations, token_count on chat_messages"""
+    cursor = conn.cursor()
+    try:
+        conversation_columns = _columns(cursor, "chat_conversations")
+        message_columns = _columns(cursor, "chat_messages")
+        statements = []
+        if "summary" not in conversation_columns:
+            statements.append("ALTER TABLE chat_conversations ADD COLUMN summary VARCHAR")
+        if "summary_through_id" not in conversation_columns:
+            statements.append("ALTER TABLE chat_conversations ADD COLUMN summary_through_id INTEGER")
+        if "summary_tokens" not in conversation_columns:
+            statements.append("ALTER TABLE chat_conversations ADD COLUMN summary_tokens INTEGER")
+        if "token_count" not in message_columns:
+            statements.append("ALTER TABLE chat_messages ADD COLUMN token_count INTEGER")
+        if not statements:
+            return
+
+        logger.info("[DB] Adding conversation memory columns...")
+        cursor.execute("BEGIN")
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        cursor.close()
+
+
+def add_cluster_centroid_columns(conn: sqlite3.Connection) -> None:
+    """clusters.centroid / clusters.radius for incremental assignment"""
+    cursor = conn.cursor()
+    try:
+        columns = _columns(cursor, "clusters")
+        statements = []
+        if "centroid" not in columns:
+            statements.append("ALTER TABLE clusters ADD COLUMN centroid BLOB")
+        if "radius" not in columns:
+            statements.append("ALTER TABLE clusters ADD COLUMN radius FLOAT")
+        if not statements:
+            return
+
+        logger.info("[DB] Adding cluster centroid columns...")
+        cursor.execute("BEGIN")
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        cursor.close()
+
+
+def create_keyword_index(conn: sqlite3.Connection) -> None:
+    """chunk_fts FTS5 index over chunk text, backfilled from existing chunks"""
+    from .keyword_index import create_index
+
+    create_index(conn)
+
+
+def add_chunk_index(conn: sqlite3.Connection) -> None:
+    """chunks.chunk_index, backfilled by ranking each document's chunks on start_offset"""
+    cursor = conn.cursor()
+    try:
+        if "chunk_index" in _columns(cursor, "chunks"):
+            return
+
+        logger.info("[DB] Adding chunks.chunk_index...")
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("ALTER TABLE chunks ADD COLUMN chunk_index INTEGER")
+            cursor.execute("SELECT rowid, doc_id FROM chunks ORDER BY doc_id, start_offset, rowid")
+            current_doc = None
+            index = 0
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                updates = []
+                for rowid, doc_id in rows:
+                    if doc_id != current_doc:
+                        current_doc, index = doc_id, 0
+                    updates.append((index, rowid))
+                    index += 1
+                conn.executemany("UPDATE chunks SET chunk_index = ? WHERE rowid = ?", updates)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        cursor.close()
+
+
+# Applied in order on every startup
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    move_raw_text_to_content_store,
+    backfill_email_metadata,
+    add_conversation_memory_columns,
+    create_keyword_index,
+    add_cluster_centroid_columns,
+    add_chunk_index,
+]
+
+
+def run_migrations(engine) -> None:
+    """Apply pending migrations on a raw connection from the writer engine"""
+    raw = engine.raw_connection()
+    try:
+        for migration in MIGRATIONS:
+            migration(raw.driver_connection)
+    finally:
+        raw.close()
@@ -1,383 +1,439 @@
 """ML-based organization: clustering and auto-tagging"""
 
-import numpy as np
+import importlib.util
+import threading
 from collections import Counter
-from typing import Optional, List, Dict, Any
-from sqlmodel import Session, select
-from .models import Document, Chunk, Cluster, Tag
+from datetime import datetime
+from typing import Optional, List, Dict
+import numpy as np
+from sqlalchemy import bindparam, delete, func, update
+from sqlmodel import select
+from . import change_log, cluster_assignment, cluster_worker, counters, keywords
+from .database import Database
+from .doc_vectors import DocumentVectors, cache_path
+from .config import Config
+from .content_store import load_texts
+from .models import CorpusStat, Document, Cluster, Tag
 from .embedder import Embedder
 
 
-# Try to import clustering libraries
-try:
-    import hdbscan
-    import umap
-    CLUSTERING_AVAILABLE = True
-except ImportError:
-    CLUSTERING_AVAILABLE = False
+# Clustering libraries are only imported where the fit runs (the worker
+# process by default), so the API process never loads numba
+CLUSTERING_AVAILABLE = all(importlib.util.find_spec(name) for name in ("hdbscan", "umap"))
+
+# One full fit at a time per process: the daemon scheduler and /clusters/rebuild
+# both rewrite the document vector cache and the reducer and spawn a worker
+_fit_lock = threading.Lock()
 
 
 class MLOrganizer:
     """Organizes documents using ML clustering and tagging"""
 
-    def __init__(self, embedder: Embedder, db_session: Session):
+    def __init__(self, embedder: Embedder, database: Database, vectordb=None):
         self.embedder = embedder
-        self.db = db_session
+        self.database = database
+        self.vectordb = vectordb
+        # Clustering reads stored chunk vectors instead of re-embedding documents
+        self.doc_vectors = DocumentVectors(vectordb, cache_path(database)) if vectordb is not None else None
         self._clusterer = None
         self._tagger = None
-
-    def run_clustering(self, min_cluster_size: int = 5, min_samples: int = 3) -> dict:
-        """Run HDBSCAN clustering on all document embeddings"""
-        from datetime import datetime
-        from sqlalchemy import func
-
+        # Centroids from the last full fit, reloaded when a newer fit is recorded
+        self._centroids: Optional[cluster_assignment.CentroidIndex] = None
+        self._centroids_fit_at: Optional[datetime] = None
+
+    def run_clustering(self, min_cluster_size: int = 5, min_samples: int = 3, force: bool = False) -> dict:
+        """
+        Refit clusters when needed (HDBSCAN over all document vectors).
+
+        New documents are assigned to existing clusters at ingest
+        (assign_document); a full refit runs only when there are no clusters
+        yet, drift since the last fit crosses a threshold, or force=True.
+        The daemon calls this from its scheduler when documents change.
+        """
         start_time = datetime.now()
         timestamp = start_time.strftime("%H:%M:%S")
 
-        # Get document and chunk counts - OPTIMIZED with COUNT
+        # Document and cluster counts from the materialized counters
         try:
-            doc_count = self.db.scalar(select(func.count(Document.id)))
-            chunk_count = self.db.scalar(select(func.count(Chunk.id)))
-            tag_count = self.db.scalar(select(func.count(Tag.id)))
-            cluster_count = self.db.scalar(select(func.count(Cluster.id)))
-
-            # Track if there are changes since last run
-            if not hasattr(self, '_last_doc_count'):
-                self._last_doc_count = doc_count
-                self._last_chunk_count = chunk_count
-                self._last_tag_count = tag_count
-                has_changes = True
-            else:
-                has_changes = (
-                    doc_count != self._last_doc_count or
-                    chunk_count != self._last_chunk_count or
-                    tag_count != self._last_tag_count
-                )
-
-            # Only print details if there are changes
-            if has_changes:
-                print(f"[ML] [{timestamp}] Database activity detected:")
-
-                if doc_count != self._last_doc_count:
-                    diff = doc_count - self._last_doc_count
-                    print(f"      • Documents: {doc_count} (+{diff})")
-                else:
-                    print(f"      • Documents: {doc_count}")
-
-                if chunk_count != self._last_chunk_count:
-                    diff = chunk_count - self._last_chunk_count
-                    print(f"      • Chunks: {chunk_count} (+{diff})")
-                else:
-                    print(f"      • Chunks: {chunk_count}")
-
-                if tag_count != self._last_tag_count:
-                    diff = tag_count - self._last_tag_count
-                    print(f"      • Tags: {tag_count} (+{diff})")
-                else:
-                    print(f"      • Tags: {tag_count}")
-
-                print(f"      • Clusters: {cluster_count}")
-
-                # Update last counts
-                self._last_doc_count = doc_count
-                self._last_chunk_count = chunk_count
-                self._last_tag_count = tag_count
-
+            with self.database.read_session() as session:
+                stats = counters.read_counters(session)
         except Exception as e:
             print(f"[ML] [{timestamp}] Warning: Could not fetch stats: {e}")
-            doc_count = 0
-            has_changes = False
+            stats = {}
+        doc_count = counters.get_count(stats, counters.DOCUMENTS)
+        chunk_count = counters.get_count(stats, counters.CHUNKS)
+        cluster_count = counters.get_count(stats, counters.CLUSTERS)
+
+        drift = cluster_assignment.drift_status(stats)
 
         # Check if clustering is available
         if not CLUSTERING_AVAILABLE:
-            if has_changes:
-                print(f"[ML] [{timestamp}] Using tag-based organization (HDBSCAN/UMAP not installed)")
-            return {"status": "skipped", "reason": "missing dependencies", "has_changes": has_changes}
+            return {"status": "skipped", "reason": "missing dependencies"}
 
-        if has_changes:
-            print(f"[ML] [{timestamp}] HDBSCAN/UMAP available - running clustering...")
-
-        # Run clustering if there are enough documents AND (changes OR no clusters exist)
-        needs_clustering = has_changes or cluster_count == 0
+        # New documents were already placed at ingest; refit only on drift
+        needs_clustering = force or cluster_count == 0 or drift["refit"]
         if doc_count >= min_cluster_size and needs_clustering:
-            if cluster_count == 0 and not has_changes:
+            print(f"[ML] [{timestamp}] {doc_count} documents, {chunk_count} chunks, {cluster_count} clusters")
+            if cluster_count == 0:
                 print(f"[ML] [{timestamp}] No clusters exist yet - running initial clustering...")
+            elif not force:
+                print(f"[ML] [{timestamp}] Cluster drift ({', '.join(drift['reasons'])}) - refitting...")
+            refit_reason = "forced" if force else cluster_assignment.reducer_refit_reason(stats, doc_count, drift)
+            if not _fit_lock.acquire(blocking=False):
+                print(f"[ML] [{timestamp}] Another cluster fit is running - skipping")
+                return {"status": "busy", "reason": "a cluster fit is already running",
+                        "clusters": cluster_count, "drift": drift}
             try:
-                new_clusters = self._perform_clustering(min_cluster_size, min_samples, timestamp)
+                new_clusters = self._perform_clustering(min_cluster_size, min_samples, timestamp, refit_reason)
                 cluster_count = new_clusters
             except Exception as e:
                 print(f"[ML] [{timestamp}] Clustering failed: {e}")
                 import traceback
                 traceback.print_exc()
+                return {"status": "error", "reason": str(e), "clusters": cluster_count, "drift": drift}
+            finally:
+                _fit_lock.release()
 
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-
-        if has_changes:
+            duration = (datetime.now() - start_time).total_seconds()
             print(f"[ML] [{timestamp}] Analysis complete in {duration:.2f}s - {cluster_count} clusters")
 
         return {
             "status": "ok",
             "clusters": cluster_count,
-            "has_changes": has_changes,
             "doc_count": doc_count,
-            "chunk_count": chunk_count
+            "chunk_count": chunk_count,
+            "drift": drift,
         }
 
-    def _perform_clustering(self, min_cluster_size: int, min_samples: int, timestamp: str) -> int:
-        """Actually perform HDBSCAN clustering on document embeddings"""
-        from sqlalchemy import func
-
-        # Step 1: Get all documents with their embeddings via chunks
-        # We'll cluster at the document level using average chunk embeddings
-        print(f"[ML] [{timestamp}] Fetching document embeddings...")
+    def _perform_clustering(
+        self, min_cluster_size: int, min_samples: int, timestamp: str, refit_reason: Optional[str] = None
+    ) -> int:
+        """Actually perform HDBSCAN clustering on document embeddings (refit_reason: refit the reducer)"""
+        from uuid import UUID
 
-        # Get documents with text for label generation
-        # Use a fresh query to avoid stale session issues
-        docs = self.db.exec(select(Document).limit(5000)).all()
-        if len(docs) < min_cluster_size:
-            print(f"[ML] [{timestamp}] Not enough documents for clustering ({len(docs)} < {min_cluster_size})")
+        if self.doc_vectors is None:
+            print(f"[ML] [{timestamp}] No vector store - skipping clustering")
             return 0
 
-        # Extract document data immediately to avoid session staleness during long clustering
-        doc_data = []
-        for doc in docs:
-            try:
-                if doc.raw_text and len(doc.raw_text) > 50:
-                    doc_data.append({
-                        'id': doc.id,
-                        'raw_text': doc.raw_text
-                    })
-            except Exception:
-                # Document may have been deleted - skip it
-                continue
-
-        if len(doc_data) < min_cluster_size:
-            print(f"[ML] [{timestamp}] Not enough valid documents ({len(doc_data)} < {min_cluster_size})")
+        # Step 1: Document vectors = mean of each document's stored chunk vectors.
+        # Only documents not seen before are fetched from Qdrant; no inference.
+        print(f"[ML] [{timestamp}] Fetching document embeddings...")
+        with self.database.read_session() as session:
+            all_doc_ids = session.exec(select(Document.id)).all()
+        if len(all_doc_ids) < min_cluster_size:
+            print(f"[ML] [{timestamp}] Not enough documents for clustering ({len(all_doc_ids)} < {min_cluster_size})")
             return 0
 
-        # Get embeddings for documents (use first chunk of each)
-        doc_embeddings = []
-        doc_ids = []
-        doc_texts = []
-
-        for doc_info in doc_data:
-            # Get the embedding from embedder (it may be cached or need to generate)
-            raw_text = doc_info['raw_text']
-            if raw_text and len(raw_text) > 50:
-                try:
-                    # Use first 1000 chars for embedding (representative sample)
-                    text_sample = raw_text[:1000]
-                    embedding = self.embedder.embed(text_sample)
-                    if embedding is not None and len(embedding) > 0:
-                        doc_embeddings.append(embedding)
-                        doc_ids.append(doc_info['id'])
-                        doc_texts.append(raw_text[:500])  # For label generation
-                except Exception:
-                    continue
-
-        if len(doc_embeddings) < min_cluster_size:
-            print(f"[ML] [{timestamp}] Not enough valid embeddings ({len(doc_embeddings)} < {min_cluster_size})")
+        added, removed = self.doc_vectors.refresh(all_doc_ids)
+        if added or removed:
+            print(f"[ML] [{timestamp}] Document vectors: +{added} / -{removed} ({len(self.doc_vectors)} cached)")
+        vector_ids, embeddings_array = self.doc_vectors.snapshot()
+        doc_ids = [UUID(doc_id) for doc_id in vector_ids]
+
+        if len(doc_ids) < min_cluster_size:
+            print(f"[ML] [{timestamp}] Not enough valid embeddings ({len(doc_ids)} < {min_cluster_size})")
             return 0
 
-        print(f"[ML] [{timestamp}] Got {len(doc_embeddings)} embeddings, reducing dimensions...")
+        # Previews are enough for labels (full text would mean decompressing every document)
+        with self.database.read_session() as session:
+            previews = dict(session.exec(select(Document.id, Document.preview)).all())
+        doc_texts = [(previews.get(doc_id) or "")[:500] for doc_id in doc_ids]
 
-        # Step 2: Reduce dimensions (1024 -> 10-15 dimensions)
-        embeddings_array = np.array(doc_embeddings)
+        if refit_reason:
+            print(f"[ML] [{timestamp}] Got {len(doc_ids)} embeddings, refitting reducer ({refit_reason})...")
+        else:
+            print(f"[ML] [{timestamp}] Got {len(doc_ids)} embeddings, projecting with the stored reducer...")
 
-        # Try UMAP first, fall back to PCA if numba fails on Windows
-        try:
-            n_neighbors = min(15, len(doc_embeddings) - 1)
-            reducer = umap.UMAP(
-                n_components=min(10, len(doc_embeddings) - 1),
-                n_neighbors=n_neighbors,
-                min_dist=0.1,
-                metric='cosine',
-                random_state=42
-            )
-            reduced_embeddings = reducer.fit_transform(embeddings_array)
-            print(f"[ML] [{timestamp}] Reduced dimensions with UMAP")
-        except Exception as umap_err:
-            print(f"[ML] [{timestamp}] UMAP failed ({umap_err}), using PCA fallback...")
-            from sklearn.decomposition import PCA
-            n_components = min(10, len(doc_embeddings) - 1, embeddings_array.shape[1])
-            pca = PCA(n_components=n_components, random_state=42)
-            reduced_embeddings = pca.fit_transform(embeddings_array)
-            print(f"[ML] [{timestamp}] Reduced dimensions with PCA")
-
-        print(f"[ML] [{timestamp}] Running HDBSCAN clustering...")
-
-        # Step 3: Cluster with HDBSCAN
-        clusterer = hdbscan.HDBSCAN(
-            min_cluster_size=min_cluster_size,
-            min_samples=min_samples,
-            metric='euclidean',
-            cluster_selection_method='eom'
+        # Steps 2-3: Reduce (persisted PCA + UMAP) + HDBSCAN. By default in a
+        # separate, niced and memory-capped process that returns only the labels
+        fit_args = (
+            embeddings_array, vector_ids, min_cluster_size, min_samples,
+            str(cluster_worker.reducer_path(self.database)), bool(refit_reason), Config.CLUSTER_PCA_COMPONENTS,
         )
-        cluster_labels = clusterer.fit_predict(reduced_embeddings)
+        if Config.CLUSTER_WORKER_ENABLED:
+            print(f"[ML] [{timestamp}] Running UMAP + HDBSCAN in worker process...")
+            cluster_labels, reducer_refit = cluster_worker.fit_labels_in_worker(*fit_args)
+        else:
+            print(f"[ML] [{timestamp}] Running UMAP + HDBSCAN...")
+            cluster_labels, reducer_refit = cluster_worker.fit_labels(*fit_args)
 
-        # Count clusters (excluding noise labeled as -1)
-        unique_clusters = set(cluster_labels) - {-1}
-        num_clusters = len(unique_clusters)
+        # Members per cluster from one argsort (noise, labeled -1, excluded)
+        members = cluster_assignment.group_members(cluster_labels)
+        num_clusters = len(members)
 
         print(f"[ML] [{timestamp}] Found {num_clusters} clusters, updating database...")
 
-        # Step 4: Clear old clusters and create new ones
-        self.db.exec(select(Cluster)).all()  # Force load
-        from sqlalchemy import delete
-        self.db.execute(delete(Cluster))
-
-        # Step 5: Create cluster records with auto-generated labels
-        cluster_info = {}
-        for label in unique_clusters:
-            # Get documents in this cluster
-            cluster_doc_indices = [i for i, l in enumerate(cluster_labels) if l == label]
-            cluster_texts = [doc_texts[i] for i in cluster_doc_indices]
-
-            # Generate label from common words
-            cluster_label = self._generate_cluster_label(cluster_texts)
-
-            cluster = Cluster(
-                id=int(label) + 1,  # 1-indexed
-                label=cluster_label,
-                description=f"Auto-generated cluster with {len(cluster_doc_indices)} documents",
-                document_count=len(cluster_doc_indices)
-            )
-            self.db.add(cluster)
-            cluster_info[label] = cluster.id
-
-        # Step 6: Update documents with cluster assignments
-        for i, (doc_id, label) in enumerate(zip(doc_ids, cluster_labels)):
-            if label != -1:  # Not noise
-                # Update document's cluster_id
-                doc = self.db.get(Document, doc_id)
-                if doc:
-                    doc.cluster_id = cluster_info[label]
+        # Step 4: Label clusters by class-based TF-IDF, before taking the writer
+        top_terms = keywords.class_tfidf_labels(
+            {label: [doc_texts[i] for i in indices] for label, indices in members.items()})
+        cluster_rows = [
+            (label, " / ".join(t.capitalize() for t in top_terms[label]) or "Miscellaneous", len(indices))
+            for label, indices in members.items()
+        ]
+
+        # Step 5: Centroids in embedding space (for ingest-time assignment), and
+        # old ids carried over to the new clusters with the most shared members
+        geometry, mean_distance = cluster_assignment.cluster_geometry(embeddings_array, members)
+        new_members = {label: {vector_ids[i] for i in indices} for label, indices in members.items()}
+        with self.database.read_session() as session:
+            old_rows = session.exec(
+                select(Document.id, Document.cluster_id).where(Document.cluster_id.is_not(None))
+            ).all()
+        old_members: Dict[int, set] = {}
+        for doc_id, cluster_id in old_rows:
+            old_members.setdefault(cluster_id, set()).add(str(doc_id))
+        matched = cluster_assignment.match_clusters(new_members, old_members, Config.CLUSTER_MATCH_MIN_JACCARD)
 
         try:
-            self.db.commit()
-            print(f"[ML] [{timestamp}] Saved {num_clusters} clusters to database")
+            with self.database.write_session() as session:
+                existing_ids = set(session.exec(select(Cluster.id)).all())
+                unmatched = [label for label, _, _ in cluster_rows if label not in matched]
+                cluster_info = dict(matched)
+                cluster_info.update(zip(unmatched, cluster_assignment.allocate_ids(session, len(unmatched), existing_ids)))
+
+                # Step 6: Drop clusters with no successor; update or create the rest
+                retired = existing_ids - set(cluster_info.values())
+                if retired:
+                    session.execute(update(Document).where(Document.cluster_id.in_(retired)).values(cluster_id=None))
+                    session.execute(delete(Cluster).where(Cluster.id.in_(retired)))
+
+                now = datetime.utcnow()
+                kept = {
+                    cluster.id: cluster
+                    for cluster in session.exec(select(Cluster).where(Cluster.id.in_(list(matched.values()))))
+                }
+                for label, cluster_label, size in cluster_rows:
+                    centroid, radius = geometry[label]
+                    cluster = kept.get(cluster_info[label]) or Cluster(id=cluster_info[label], created_at=now)
+                    cluster.label = cluster_label
+                    cluster.description = self._cluster_description(size)
+                    cluster.document_count = size
+                    cluster.centroid = cluster_assignment.pack_vector(centroid)
+                    cluster.radius = radius
+                    cluster.updated_at = now
+                    session.add(cluster)
+                session.flush()
+                counters.set_counter(session, counters.CLUSTERS, len(cluster_rows))
+                cluster_assignment.record_fit(session, len(all_doc_ids), mean_distance, now)
+                if reducer_refit:
+                    counters.set_counter(session, counters.CLUSTER_REDUCER_DOCUMENTS, len(vector_ids), now)
+                change_log.record(session, change_log.CLUSTER_CHANGED)  # All clusters
+
+                # Step 7: Update documents with cluster assignments (noise -> no cluster)
+                # as one executemany UPDATE, with no ORM loads
+                documents = Document.__table__
+                session.connection().execute(
+                    documents.update()
+                    .where(documents.c.id == bindparam("doc_id"))
+                    .values(cluster_id=bindparam("new_cluster_id")),
+                    [
+                        {"doc_id": doc_id, "new_cluster_id": cluster_info.get(int(label))}
+                        for doc_id, label in zip(doc_ids, cluster_labels)
+                    ],
+                )
+
+            print(f"[ML] [{timestamp}] Saved {num_clusters} clusters to database "
+                  f"({len(matched)} kept their id, {len(unmatched)} new, {len(retired)} retired)")
         except Exception as e:
             print(f"[ML] [{timestamp}] Failed to save clusters: {e}")
-            self.db.rollback()
+            raise
 
         return num_clusters
 
-    def _generate_cluster_label(self, texts: List[str], top_k: int = 3) -> str:
-        """Generate a descriptive label for a cluster from its documents"""
-        # Combine all texts
-        combined = " ".join(texts)
-        words = combined.lower().split()
-
-        # Extended stop words
-        stop_words = {
-            "the", "is", "at", "which", "on", "a", "an", "and", "or", "but",
-            "in", "with", "to", "for", "of", "this", "that", "it", "be", "as",
-            "are", "was", "were", "been", "being", "have", "has", "had", "do",
-            "does", "did", "will", "would", "could", "should", "may", "might",
-            "must", "shall", "can", "need", "from", "by", "about", "into",
-            "through", "during", "before", "after", "above", "below", "between",
-            "under", "again", "further", "then", "once", "here", "there", "when",
-            "where", "why", "how", "all", "each", "few", "more", "most", "other",
-            "some", "such", "no", "nor", "not", "only", "own", "same", "so",
-            "than", "too", "very", "just", "also", "now", "re", "ve", "ll",
-            "hi", "hello", "thanks", "thank", "please", "regards", "best",
-            "sent", "from", "subject", "date", "email", "mailto", "http", "https",
-            "www", "com", "org", "net", "au", "gmail", "outlook"
-        }
-
-        # Filter and count words
-        words = [w.strip(".,!?;:()[]{}\"'<>") for w in words
-                 if w not in stop_words and len(w) > 3 and w.isalpha()]
-
-        counter = Counter(words)
-        top_words = [word.capitalize() for word, _ in counter.most_common(top_k)]
-
-        if top_words:
-            return " / ".join(top_words)
-        return "Miscellaneous"
-
-    def auto_tag(self, doc_id: str, text: str, top_k: int = 3) -> List[str]:
-        """Generate tags for a document using keyword extraction"""
-        # Simple frequency-based tagging
-        # In production, use SetFit or a zero-shot classifier
-
-        words = text.lower().split()
-        # Remove common stop words
-        stop_words = {
-            "the",
-            "is",
-            "at",
-            "which",
-            "on",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "in",
-            "with",
-            "to",
-            "for",
-            "of",
-        }
-        words = [w.strip(".,!?;:") for w in words if w not in stop_words and len(w) > 3]
+    def _centroid_index(self) -> Optional[cluster_assignment.CentroidIndex]:
+        """Centroids of the latest fit (reloaded after a refit by any process)"""
+        with self.database.read_session() as session:
+            fit = session.get(CorpusStat, counters.CLUSTER_FIT_DOCUMENTS)
+            fit_at = fit.last_at if fit else None
+            if fit_at != self._centroids_fit_at:
+                self._centroids = cluster_assignment.CentroidIndex.load(session)
+                self._centroids_fit_at = fit_at
+        return self._centroids
+
+    def assign_document(self, doc_id, chunk_vectors) -> Optional[int]:
+        """
+        Place a new document in the nearest existing cluster, or leave it as noise.
+
+        chunk_vectors are the embeddings ingest just computed, so this needs no
+        Qdrant round trip; the pooled vector also goes into the clustering cache.
+        """
+        vector = cluster_assignment.normalize(np.asarray(chunk_vectors, dtype=np.float32).mean(axis=0))
+        if self.doc_vectors is not None:
+            self.doc_vectors.add(str(doc_id), vector)
+
+        index = self._centroid_index()
+        if index is None or index.centroids.shape[1] != vector.shape[0]:
+            return None
 
-        # Get most common words as tags
-        counter = Counter(words)
-        tags = [word for word, count in counter.most_common(top_k) if count > 1]
+        cluster_id, distance = index.assign(vector)
+        with self.database.write_session() as session:
+            if cluster_id is not None:
+                session.execute(update(Document).where(Document.id == doc_id).values(cluster_id=cluster_id))
+                session.execute(
+                    update(Cluster)
+                    .where(Cluster.id == cluster_id)
+                    .values(document_count=Cluster.document_count + 1)
+                )
+                change_log.record(session, change_log.CLUSTER_CHANGED, doc_id, cluster_id)
+            cluster_assignment.record_assignment(session, cluster_id, distance)
+        return cluster_id
 
-        # Detect common patterns
+    @staticmethod
+    def _pattern_tags(text: str) -> List[str]:
+        """Topic tags from tell-tale words, on top of the TF-IDF keywords"""
         text_lower = text.lower()
+        tags = []
         if any(word in text_lower for word in ["buy", "sell", "stock", "shares", "$"]):
             tags.append("finance")
         if any(word in text_lower for word in ["def", "class", "import", "function"]):
             tags.append("code")
         if any(word in text_lower for word in ["doctor", "appointment", "health"]):
             tags.append("health")
-
-        return list(set(tags))[:top_k]
-
-    def organize_document(self, doc_id: str, text: str) -> dict:
-        """Run full ML organization on a document"""
+        return tags
+
+    def organize_document(self, doc_id, chunk_vectors=None) -> dict:
+        """
+        Ingest-time organization: cluster assignment from the fresh chunk vectors.
+
+        Tags and cluster summaries are scheduled work (tag_documents,
+        refresh_cluster_summaries), driven by the change log. A process with no
+        scheduler running (CLI ingest) tags the document right away instead, so
+        it never waits on a daemon that may not be started; a daemon that is
+        running elsewhere skips documents that already have tags.
+        """
         from uuid import UUID
 
-        # Auto-tag
-        tags = self.auto_tag(doc_id, text)
-
-        # Save tags to database
-        # Convert doc_id to UUID if it's a string
         if isinstance(doc_id, str):
+            doc_id = UUID(doc_id)
+
+        cluster_id = None
+        if chunk_vectors is not None and len(chunk_vectors):
             try:
-                doc_id_uuid = UUID(doc_id)
-            except Exception:
-                # If conversion fails, skip tagging
-                return {"tags": [], "cluster_id": None}
-        else:
-            doc_id_uuid = doc_id
+                cluster_id = self.assign_document(doc_id, chunk_vectors)
+            except Exception as e:
+                print(f"Warning: Failed to assign cluster: {e}")
 
-        for tag_text in tags:
-            tag = Tag(doc_id=doc_id_uuid, tag=tag_text, confidence=0.8)
-            self.db.add(tag)
+        if not change_log.consumer_running():
+            try:
+                self.tag_documents([doc_id])
+            except Exception as e:
+                print(f"Warning: Failed to tag document: {e}")
+
+        return {"cluster_id": cluster_id}
+
+    def tag_documents(self, doc_ids, top_k: int = 3, batch_size: int = 500) -> int:
+        """
+        Auto-tag documents that have no tags yet; returns the number tagged.
+
+        Keywords are the top TF-IDF terms against the corpus document
+        frequencies, which each batch updates in the same transaction as its
+        tags (one executemany per table).
+        """
+        doc_ids = list(dict.fromkeys(doc_ids))
+        tagged_count = 0
+        for start in range(0, len(doc_ids), batch_size):
+            batch = doc_ids[start:start + batch_size]
+            with self.database.read_session() as session:
+                tagged = set(session.exec(select(Tag.doc_id).where(Tag.doc_id.in_(batch)).distinct()).all())
+                texts = load_texts(session, [doc_id for doc_id in batch if doc_id not in tagged])
+            if not texts:
+                continue
 
-        try:
-            self.db.commit()
-        except Exception as e:
-            print(f"Warning: Failed to save tags: {e}")
-            self.db.rollback()
+            batch_ids = list(texts)
+            term_lists = [keywords.terms(texts[doc_id]) for doc_id in batch_ids]
+            vocabulary = list(dict.fromkeys(t for row in term_lists for t in row))
+            with self.database.read_session() as session:
+                stored = keywords.load_document_frequencies(session, vocabulary)
+            doc_keywords, vocabulary, batch_df = keywords.tfidf_keywords(term_lists, stored, top_k=top_k)
+
+            now = datetime.utcnow()
+            tag_rows = []
+            for doc_id, scored in zip(batch_ids, doc_keywords):
+                best = scored[0][1] if scored else 1.0
+                tags = {term: round(score / best, 3) for term, score in scored}
+                for tag in self._pattern_tags(texts[doc_id]):
+                    tags.setdefault(tag, 0.8)
+                # Best first, so a pattern tag outranks weak keywords instead of being cut off
+                ranked = sorted(tags.items(), key=lambda item: item[1], reverse=True)
+                tag_rows.extend(
+                    {"doc_id": doc_id, "tag": tag, "confidence": confidence, "created_at": now}
+                    for tag, confidence in ranked[:top_k]
+                )
 
-        return {"tags": tags, "cluster_id": None}
+            with self.database.write_session() as session:
+                keywords.add_document_frequencies(session, vocabulary, batch_df, len(batch_ids))
+                if tag_rows:
+                    session.connection().execute(Tag.__table__.insert(), tag_rows)
+                change_log.record_many(
+                    session, change_log.TAGS_CHANGED, list(dict.fromkeys(row["doc_id"] for row in tag_rows)))
+                counters.bump(session, counters.TAGS, len(tag_rows))
+                counters.bump_generations(session, [counters.tag_generation(row["tag"]) for row in tag_rows])
+            tagged_count += len(batch_ids)
+        return tagged_count
+
+    @staticmethod
+    def _cluster_description(size: int, top_tags: Optional[List[str]] = None) -> str:
+        description = f"Auto-generated cluster with {size} documents"
+        if top_tags:
+            description += f" (top tags: {', '.join(top_tags)})"
+        return description
+
+    def refresh_cluster_summaries(self, cluster_ids=None, top_k: int = 3) -> int:
+        """Recount members and refresh descriptions for the given clusters (None = all)"""
+        with self.database.read_session() as session:
+            count_query = select(Document.cluster_id, func.count(Document.id)).group_by(Document.cluster_id)
+            tag_query = (
+                select(Document.cluster_id, Tag.tag, func.count(Tag.id))
+                .join(Tag, Tag.doc_id == Document.id)
+                .group_by(Document.cluster_id, Tag.tag)
+            )
+            cluster_query = select(Cluster.id)
+            if cluster_ids is not None:
+                count_query = count_query.where(Document.cluster_id.in_(cluster_ids))
+                tag_query = tag_query.where(Document.cluster_id.in_(cluster_ids))
+                cluster_query = cluster_query.where(Cluster.id.in_(cluster_ids))
+            else:
+                count_query = count_query.where(Document.cluster_id.is_not(None))
+                tag_query = tag_query.where(Document.cluster_id.is_not(None))
+            sizes = dict(session.exec(count_query).all())
+            tag_counts: Dict[int, Counter] = {}
+            for cluster_id, tag, count in session.exec(tag_query).all():
+                tag_counts.setdefault(cluster_id, Counter())[tag] = count
+            existing = session.exec(cluster_query).all()
+        if not existing:
+            return 0
+
+        now = datetime.utcnow()
+        with self.database.write_session() as session:
+            session.connection().execute(
+                Cluster.__table__.update()
+                .where(Cluster.__table__.c.id == bindparam("cluster_id"))
+                .values(document_count=bindparam("size"), description=bindparam("text"), updated_at=now),
+                [
+                    {
+                        "cluster_id": cluster_id,
+                        "size": sizes.get(cluster_id, 0),
+                        "text": self._cluster_description(
+                            sizes.get(cluster_id, 0),
+                            [tag for tag, _ in tag_counts.get(cluster_id, Counter()).most_common(top_k)],
+                        ),
+                    }
+                    for cluster_id in existing
+                ],
+            )
+        return len(existing)
 
     def get_cluster_summary(self, cluster_id: int) -> Optional[str]:
         """Generate a summary for a cluster (placeholder for LLM summary)"""
         stmt = select(Document).where(Document.cluster_id == cluster_id).limit(10)
-        docs = self.db.exec(stmt).all()
+        with self.database.read_session() as session:
+            docs = session.exec(stmt).all()
 
         if not docs:
             return None
 
         # Simple summary: most common words
-        all_text = " ".join([doc.raw_text[:200] for doc in docs])
+        all_text = " ".join([doc.preview[:200] for doc in docs])
         words = all_text.lower().split()
         counter = Counter(words)
         common = [word for word, _ in counter.most_common(5)]
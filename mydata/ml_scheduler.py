@@ -0,0 +1,135 @@
+"""Event-driven scheduling of background ML work
+
+Writes append to the change log (change_log.record), which wakes the scheduler
+in this process as soon as the write commits; a slow poll of the log's
+high-water mark catches writes from other processes. Once woken it:
+
+- debounces: waits for ML_DEBOUNCE_SECONDS without new changes (but at most
+  ML_MAX_DELAY_SECONDS), so a burst of ingests becomes one run per task
+- backs off while the API is serving requests, doubling the wait from
+  ML_BUSY_BACKOFF_SECONDS up to ML_BUSY_MAX_DEFER_SECONDS in total
+- runs each task over the changes it subscribes to since its own watermark,
+  and advances that watermark only if the task succeeded (failures retry)
+
+Nothing runs while the log is idle, so the daemon stays asleep overnight.
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+from . import change_log, counters
+from .config import Config
+from .logger import get_logger
+from .models import ChangeLog
+
+logger = get_logger()
+
+
+class MLTask:
+    """A unit of scheduled work: run(changes) over the change kinds it subscribes to"""
+
+    def __init__(
+        self,
+        name: str,
+        kinds: Sequence[str],
+        run: Callable[[List[ChangeLog]], None],
+        run_at_start: bool = False,
+    ):
+        self.name = name
+        self.kinds = tuple(kinds)
+        self.run = run
+        self.run_at_start = run_at_start  # Once on startup even without changes (e.g. initial clustering)
+
+    @property
+    def watermark_name(self) -> str:
+        return counters.WATERMARK_PREFIX + self.name
+
+
+class MLScheduler:
+    """Runs MLTasks when the change log moves (debounced, coalesced, polite to the API)"""
+
+    def __init__(
+        self,
+        database,
+        tasks: List[MLTask],
+        poll_seconds: float,
+        busy: Optional[Callable[[], bool]] = None,
+    ):
+        self.database = database
+        self.tasks = tasks
+        self.poll_seconds = poll_seconds
+        self.busy = busy or (lambda: False)
+
+    def _watermarks(self) -> Dict[str, int]:
+        with self.database.read_session() as session:
+            stats = counters.read_counters(session)
+        return {task.name: counters.get_count(stats, task.watermark_name) for task in self.tasks}
+
+    def pending(self) -> bool:
+        """Has the log moved past any task's watermark?"""
+        with self.database.read_session() as session:
+            latest = change_log.latest_seq(session)
+        return any(latest > mark for mark in self._watermarks().values())
+
+    def _settle(self, running: Callable[[], bool]) -> None:
+        """Debounce a burst of changes, then wait out API load"""
+        first = time.monotonic()
+        while running() and time.monotonic() - first < Config.ML_MAX_DELAY_SECONDS:
+            if not change_log.wait(Config.ML_DEBOUNCE_SECONDS):
+                break  # Quiet for a full debounce period
+
+        delay, deferred = Config.ML_BUSY_BACKOFF_SECONDS, 0.0
+        while running() and self.busy() and deferred < Config.ML_BUSY_MAX_DEFER_SECONDS:
+            time.sleep(delay)
+            deferred += delay
+            delay = min(delay * 2, Config.ML_BUSY_MAX_DEFER_SECONDS - deferred)
+
+    def run_once(self, startup: bool = False) -> Dict[str, int]:
+        """Run every task with new changes (or run_at_start on startup); changes handled per task"""
+        watermarks = self._watermarks()
+        handled: Dict[str, int] = {}
+
+        for task in self.tasks:
+            # Read per task, so later tasks see changes written by earlier ones
+            with self.database.read_session() as session:
+                upto = change_log.latest_seq(session)
+                changes = change_log.read_since(session, watermarks[task.name], upto, task.kinds)
+            if upto <= watermarks[task.name] and not (startup and task.run_at_start):
+                continue
+
+            started = time.monotonic()
+            try:
+                if changes or (startup and task.run_at_start):
+                    task.run(changes)
+            except Exception as e:
+                logger.error(f"[ML] Task '{task.name}' failed ({len(changes)} changes, will retry): {e}")
+                continue
+
+            with self.database.write_session() as session:
+                counters.set_counter(session, task.watermark_name, upto, datetime.utcnow())
+            watermarks[task.name] = upto
+            handled[task.name] = len(changes)
+            if changes:
+                logger.info(f"[ML] {task.name}: {len(changes)} changes in {time.monotonic() - started:.2f}s")
+
+        with self.database.write_session() as session:
+            change_log.prune(session, min(watermarks.values(), default=0))
+        return handled
+
+    def run(self, running: Callable[[], bool]) -> None:
+        """Scheduler loop (daemon thread); returns once running() is False"""
+        startup = True
+        change_log.set_consumer(True)
+        try:
+            while running():
+                try:
+                    if startup or self.pending():
+                        self._settle(running)
+                        if running():
+                            self.run_once(startup=startup)
+                        startup = False
+                except Exception as e:
+                    logger.error(f"[ML] Scheduler error: {e}")
+                change_log.wait(self.poll_seconds)
+        finally:
+            change_log.set_consumer(False)
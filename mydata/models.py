@@ -3,6 +3,7 @@
 from datetime import datetime
 from uuid import UUID, uuid4
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 if TYPE_CHECKING:
@@ -19,7 +20,7 @@ class Document(SQLModel, table=True):
     source_type: str = Field(index=True)  # "file", "email", "paste"
     mime_type: Optional[str] = None
     file_hash: Optional[str] = Field(default=None, index=True)  # SHA-256 for dedup
-    raw_text: str  # Original text (will be encrypted in practice)
+    preview: str = ""  # First few hundred chars for listings; full text lives in DocumentContent
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)  # Index for sorting
     cluster_id: Optional[int] = Field(default=None, index=True)
@@ -35,6 +36,37 @@ class Document(SQLModel, table=True):
     tags: List["Tag"] = Relationship(back_populates="document")
 
 
+class DocumentContent(SQLModel, table=True):
+    """Compressed full text, kept out of the documents row so listings stay small"""
+
+    __tablename__ = "document_content"
+
+    doc_id: UUID = Field(foreign_key="documents.id", primary_key=True)
+    codec: str = "zstd"  # "zstd", "zlib" or "none"
+    data: bytes
+    size_bytes: int = 0  # Uncompressed UTF-8 size
+
+
+class EmailMetadata(SQLModel, table=True):
+    """Structured email headers, one row per email document"""
+
+    __tablename__ = "email_metadata"
+    __table_args__ = (
+        # Keyset pagination for /emails/list: ORDER BY sent_at DESC, doc_id DESC
+        Index("ix_email_metadata_sent_at_doc_id", "sent_at", "doc_id"),
+        Index("ix_email_metadata_sender_email_sent_at", "sender_email", "sent_at"),
+    )
+
+    doc_id: UUID = Field(foreign_key="documents.id", primary_key=True)
+    sender: str = ""  # Display form, e.g. "Jane Doe <jane@example.com>"
+    sender_email: str = ""  # Lower-cased address for exact, indexed matching
+    recipients: str = ""  # Comma-separated lower-cased To + Cc addresses
+    subject: str = ""
+    sent_at: datetime = Field(default_factory=datetime.utcnow)  # Naive UTC
+    message_id: Optional[str] = Field(default=None, index=True)
+    thread_id: Optional[str] = Field(default=None, index=True)
+
+
 class Chunk(SQLModel, table=True):
     """Text chunks for embedding (max 512 tokens each)"""
 
@@ -45,6 +77,7 @@ class Chunk(SQLModel, table=True):
     text: str
     start_offset: int  # Character offset in original document
     end_offset: int
+    chunk_index: Optional[int] = None  # Ordinal within the document (neighbour merging)
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)  # Index for time-based queries
 
     # Relationship
@@ -75,10 +108,47 @@ class Cluster(SQLModel, table=True):
     label: str  # Auto-generated or user-provided
     description: Optional[str] = None  # Optional LLM summary
     document_count: int = 0
+    # Embedding-space geometry from the last full fit, for assigning new documents
+    centroid: Optional[bytes] = None  # float16 unit vector
+    radius: Optional[float] = None  # 90th percentile member cosine distance
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class CorpusStat(SQLModel, table=True):
+    """Materialized counters, maintained in the same transaction as each write"""
+
+    __tablename__ = "corpus_stats"
+
+    name: str = Field(primary_key=True)  # "documents", "chunks", "source:emails", "type:file", ...
+    value: int = 0
+    last_at: Optional[datetime] = None  # Most recent created_at counted (for "last email" etc.)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class TermStat(SQLModel, table=True):
+    """Corpus document frequency per term, for TF-IDF tags (see keywords)"""
+
+    __tablename__ = "term_stats"
+
+    term: str = Field(primary_key=True)  # "" holds the number of documents counted
+    doc_freq: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ChangeLog(SQLModel, table=True):
+    """Append-only log of corpus writes, consumed by the ML scheduler"""
+
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}  # seq never reused after pruning
+
+    seq: int = Field(default=None, primary_key=True)
+    kind: str  # "document_added", "document_deleted", "tags_changed", "cluster_changed"
+    doc_id: Optional[UUID] = None
+    cluster_id: Optional[int] = None  # cluster_changed: the cluster (None = all clusters)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class EmailCredential(SQLModel, table=True):
     """Encrypted email credentials"""
 
@@ -172,6 +242,11 @@ class ChatConversation(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # Rolling summary of turns older than the raw window (conversation_memory)
+    summary: Optional[str] = None
+    summary_through_id: Optional[int] = None  # Last message id folded into the summary
+    summary_tokens: Optional[int] = None
+
     # Relationships
     messages: List["ChatMessage"] = Relationship(back_populates="conversation")
 
@@ -189,6 +264,7 @@ class ChatMessage(SQLModel, table=True):
     # RAG metadata
     sources_used: Optional[str] = None  # JSON array of document IDs used
     retrieved_chunks: Optional[int] = None  # Number of chunks retrieved
+    token_count: Optional[int] = None  # Tokens of content (for history budgeting)
 
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
@@ -196,6 +272,22 @@ class ChatMessage(SQLModel, table=True):
     conversation: ChatConversation = Relationship(back_populates="messages")
 
 
+class LlmAnswerCache(SQLModel, table=True):
+    """Encrypted LLM answers keyed by provider, model, question and context fingerprint"""
+
+    __tablename__ = "llm_answer_cache"
+
+    key: str = Field(primary_key=True)  # sha256 of provider|model|question|context|history
+    provider: str
+    model: str
+    encrypted_answer: bytes  # Fernet-encrypted JSON: {"response", "response_html"}
+    tokens_used: int = 0  # Tokens the original call cost (saved on every hit)
+    latency_ms: int = 0  # Time the original call took
+    hit_count: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_hit_at: Optional[datetime] = None
+
+
 class SavedSearch(SQLModel, table=True):
     """Saved searches/queries with responses"""
 
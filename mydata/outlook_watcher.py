@@ -7,6 +7,9 @@ from pathlib import Path
 from typing import Callable, Dict, Optional
 from datetime import datetime, timedelta
 
+# MAPI property tag for the RFC 822 Message-ID header
+PR_INTERNET_MESSAGE_ID = "http://schemas.microsoft.com/mapi/proptag/0x1035001F"
+
 
 class OutlookWatcher:
     """Watches Outlook inbox using win32com (no IMAP needed!)"""
@@ -216,12 +219,21 @@ class OutlookWatcher:
             # Create unique ID
             email_id = msg.EntryID[:16] if msg.EntryID else str(hash(subject + sender))
 
+            # Internet Message-ID isn't a first-class property on MailItem
+            try:
+                message_id = msg.PropertyAccessor.GetProperty(PR_INTERNET_MESSAGE_ID)
+            except Exception:
+                message_id = ""
+
             return {
                 "id": email_id,
                 "uid": msg.EntryID,
                 "subject": subject,
                 "sender": sender,
                 "date": str(received),
+                "recipients": [getattr(msg, "To", "") or "", getattr(msg, "CC", "") or ""],
+                "message_id": message_id or "",
+                "thread_id": getattr(msg, "ConversationID", "") or None,
                 "body": body,
                 "attachments": [],
                 "full_text": f"From: {sender}\nSubject: {subject}\nDate: {received}\n\n{body}",
@@ -0,0 +1,58 @@
+"""BM25 term weights as sparse vectors for Qdrant
+
+Documents are encoded at ingest with the BM25 term-frequency component
+(saturated by k1, length-normalized by b against SPARSE_AVG_DOC_TOKENS). The
+collection's sparse vector uses Qdrant's IDF modifier, so the corpus-wide IDF
+half of BM25 is applied at query time and never goes stale as documents arrive.
+Query vectors are just the distinct terms with weight 1.
+
+Terms map to sparse indices with a stable 31-bit hash, so no vocabulary has to
+be stored or kept in sync; the tokenization matches keyword_index.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import List, Tuple
+from .config import Config
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# (indices, values) - the shape of qdrant_client.models.SparseVector
+SparseEncoding = Tuple[List[int], List[float]]
+
+
+def tokenize(text: str) -> List[str]:
+    return [term.lower() for term in _TERM.findall(text)]
+
+
+def term_index(term: str) -> int:
+    """Stable across processes (unlike hash())"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "big") & 0x7FFFFFFF
+
+
+def _encode(weights: Counter) -> SparseEncoding:
+    # Distinct terms can collide on an index; their weights add up
+    merged: Counter = Counter()
+    for term, weight in weights.items():
+        merged[term_index(term)] += weight
+    indices = sorted(merged)
+    return indices, [float(merged[i]) for i in indices]
+
+
+def encode_document(text: str) -> SparseEncoding:
+    """BM25 TF weights for a chunk"""
+    terms = tokenize(text)
+    if not terms:
+        return [], []
+    k1, b = Config.SPARSE_BM25_K1, Config.SPARSE_BM25_B
+    length_norm = 1 - b + b * len(terms) / Config.SPARSE_AVG_DOC_TOKENS
+    weights = Counter()
+    for term, tf in Counter(terms).items():
+        weights[term] = tf * (k1 + 1) / (tf + k1 * length_norm)
+    return _encode(weights)
+
+
+def encode_query(text: str) -> SparseEncoding:
+    """Each distinct query term with weight 1 (IDF comes from the collection)"""
+    return _encode(Counter(dict.fromkeys(tokenize(text), 1.0)))
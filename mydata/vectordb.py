@@ -1,11 +1,25 @@
-"""Vector database integration with Qdrant"""
+"""Vector database integration with Qdrant
 
-from typing import Optional, Union, List
+Each point carries a named dense vector (the embedding) and a named sparse
+vector (BM25 term weights from sparse_encoder), so semantic and keyword
+retrieval come from one index with one filter. Collections created before
+sparse vectors existed keep working dense-only until POST
+/admin/rebuild-vectors recreates them.
+"""
+
+from typing import Iterable, Iterator, Optional, Union, List, Tuple
 from uuid import UUID
 from pathlib import Path
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchAny,
+    Modifier, QueryRequest, SparseVector, SparseVectorParams,
+)
 import numpy as np
+from .sparse_encoder import SparseEncoding
+
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "sparse"
 
 
 class VectorDB:
@@ -19,45 +33,72 @@ class VectorDB:
 
         path.mkdir(parents=True, exist_ok=True)
 
+        self.path = path
         self.client = QdrantClient(path=str(path))
         self.collection_name = collection_name
+        self.dimension: Optional[int] = None
+        self.has_sparse = False  # False for legacy single-vector collections
         self._initialized = False
 
+    def _create_collection(self) -> None:
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config={DENSE_VECTOR: VectorParams(size=self.dimension, distance=Distance.COSINE)},
+            # IDF is applied by Qdrant at query time, over the whole collection
+            sparse_vectors_config={SPARSE_VECTOR: SparseVectorParams(modifier=Modifier.IDF)},
+        )
+        self.has_sparse = True
+
     def initialize(self, dimension: int = 4096) -> None:
         """Initialize collection if it doesn't exist"""
         if self._initialized:
             return
 
+        self.dimension = dimension
         collections = self.client.get_collections().collections
         collection_names = [c.name for c in collections]
 
         if self.collection_name not in collection_names:
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=dimension, distance=Distance.COSINE),
-            )
-            print(f"[OK] Created Qdrant collection: {self.collection_name}")
+            self._create_collection()
+            print(f"[OK] Created Qdrant collection: {self.collection_name} (dense + sparse)")
         else:
+            params = self.client.get_collection(self.collection_name).config.params
+            self.has_sparse = (
+                isinstance(params.vectors, dict)
+                and DENSE_VECTOR in params.vectors
+                and SPARSE_VECTOR in (params.sparse_vectors or {})
+            )
             print(f"[OK] Using existing Qdrant collection: {self.collection_name}")
+            if not self.has_sparse:
+                print("[!] Collection has no sparse vectors - POST /admin/rebuild-vectors to enable native hybrid search")
 
         self._initialized = True
 
+    def recreate(self) -> None:
+        """Drop and recreate the collection with dense + sparse vectors (all points are lost)"""
+        self.client.delete_collection(collection_name=self.collection_name)
+        self._create_collection()
+        print(f"[OK] Recreated Qdrant collection: {self.collection_name} (dense + sparse)")
+
+    def _point(self, doc_id, vector, payload: Optional[dict], sparse: Optional[SparseEncoding]) -> PointStruct:
+        if isinstance(vector, np.ndarray):
+            vector = vector.tolist()
+        if self.has_sparse:
+            vectors = {DENSE_VECTOR: vector}
+            if sparse and sparse[0]:
+                vectors[SPARSE_VECTOR] = SparseVector(indices=sparse[0], values=sparse[1])
+            vector = vectors
+        return PointStruct(id=str(doc_id), vector=vector, payload=payload or {})
+
     def upsert(
         self,
         doc_id: Union[str, UUID],
         vector: Union[List[float], np.ndarray],
         payload: Optional[dict] = None,
+        sparse: Optional[SparseEncoding] = None,
     ) -> None:
-        """Insert or update a vector"""
-        if isinstance(vector, np.ndarray):
-            vector = vector.tolist()
-
-        point = PointStruct(
-            id=str(doc_id),
-            vector=vector,
-            payload=payload or {},
-        )
-
+        """Insert or update a vector (sparse is ignored on legacy collections)"""
+        point = self._point(doc_id, vector, payload, sparse)
         self.client.upsert(collection_name=self.collection_name, points=[point])
 
     def upsert_batch(
@@ -65,21 +106,43 @@ class VectorDB:
         doc_ids: List[Union[str, UUID]],
         vectors: Union[List[List[float]], np.ndarray],
         payloads: Optional[List[dict]] = None,
+        sparse: Optional[List[SparseEncoding]] = None,
     ) -> None:
         """Insert or update multiple vectors"""
-        if isinstance(vectors, np.ndarray):
-            vectors = vectors.tolist()
-
         if payloads is None:
             payloads = [{} for _ in doc_ids]
+        if sparse is None:
+            sparse = [None for _ in doc_ids]
 
         points = [
-            PointStruct(id=str(doc_id), vector=vector, payload=payload)
-            for doc_id, vector, payload in zip(doc_ids, vectors, payloads)
+            self._point(doc_id, vector, payload, sparse_vector)
+            for doc_id, vector, payload, sparse_vector in zip(doc_ids, vectors, payloads, sparse)
         ]
 
         self.client.upsert(collection_name=self.collection_name, points=points)
 
+    @staticmethod
+    def _filter(filter_dict: Optional[dict]) -> Optional[Filter]:
+        """{"doc_ids": [...]} -> points of those documents (payloads carry doc_id, not tags)"""
+        if filter_dict and "doc_ids" in filter_dict:
+            return Filter(must=[FieldCondition(key="doc_id", match=MatchAny(any=list(filter_dict["doc_ids"])))])
+        return None
+
+    @staticmethod
+    def _matches_nothing(filter_dict: Optional[dict]) -> bool:
+        return bool(filter_dict) and "doc_ids" in filter_dict and not filter_dict["doc_ids"]
+
+    @staticmethod
+    def _hits(points) -> List[dict]:
+        return [
+            {
+                "id": hit.id,
+                "score": hit.score,
+                "payload": hit.payload,
+            }
+            for hit in points
+        ]
+
     def search(
         self,
         query_vector: Union[List[float], np.ndarray],
@@ -88,34 +151,68 @@ class VectorDB:
         filter_dict: Optional[dict] = None,
     ) -> List[dict]:
         """Search for similar vectors"""
+        if self._matches_nothing(filter_dict):
+            return []
         if isinstance(query_vector, np.ndarray):
             query_vector = query_vector.tolist()
 
-        # Build filter if provided
-        query_filter = None
-        if filter_dict:
-            # Simple tag filter example
-            if "tag" in filter_dict:
-                query_filter = Filter(
-                    must=[FieldCondition(key="tags", match=MatchValue(value=filter_dict["tag"]))]
-                )
-
-        results = self.client.search(
+        response = self.client.query_points(
             collection_name=self.collection_name,
-            query_vector=query_vector,
+            query=query_vector,
+            using=DENSE_VECTOR if self.has_sparse else None,
             limit=limit,
             score_threshold=score_threshold,
-            query_filter=query_filter,
+            query_filter=self._filter(filter_dict),
         )
+        return self._hits(response.points)
 
-        return [
-            {
-                "id": hit.id,
-                "score": hit.score,
-                "payload": hit.payload,
-            }
-            for hit in results
-        ]
+    def sparse_search(
+        self,
+        sparse_query: SparseEncoding,
+        limit: int = 10,
+        filter_dict: Optional[dict] = None,
+    ) -> List[dict]:
+        """BM25 keyword search over the sparse vectors ([] on legacy collections)"""
+        if not self.has_sparse or not sparse_query[0] or self._matches_nothing(filter_dict):
+            return []
+        response = self.client.query_points(
+            collection_name=self.collection_name,
+            query=SparseVector(indices=sparse_query[0], values=sparse_query[1]),
+            using=SPARSE_VECTOR,
+            limit=limit,
+            query_filter=self._filter(filter_dict),
+        )
+        return self._hits(response.points)
+
+    def hybrid_search(
+        self,
+        query_vector: Union[List[float], np.ndarray],
+        sparse_query: SparseEncoding,
+        limit: int = 10,
+        filter_dict: Optional[dict] = None,
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Dense and sparse top-k in one batched call: (vector_hits, keyword_hits).
+
+        Fusion is left to the caller (hybrid_search.fuse) so per-request
+        weights and the fusion method still apply.
+        """
+        if not self.has_sparse or not sparse_query[0] or self._matches_nothing(filter_dict):
+            return self.search(query_vector, limit=limit, filter_dict=filter_dict), []
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.tolist()
+
+        query_filter = self._filter(filter_dict)
+        dense, keyword = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(query=query_vector, using=DENSE_VECTOR, limit=limit,
+                             filter=query_filter, with_payload=True),
+                QueryRequest(query=SparseVector(indices=sparse_query[0], values=sparse_query[1]),
+                             using=SPARSE_VECTOR, limit=limit, filter=query_filter, with_payload=True),
+            ],
+        )
+        return self._hits(dense.points), self._hits(keyword.points)
 
     def get(self, doc_id: Union[str, UUID]) -> Optional[dict]:
         """Get a specific vector by ID"""
@@ -133,6 +230,37 @@ class VectorDB:
             pass
         return None
 
+    def iter_document_vectors(
+        self, document_ids: Iterable[str], batch_size: int = 256
+    ) -> Iterator[Tuple[str, np.ndarray]]:
+        """
+        (document id, dense chunk vector) for every chunk of the given documents.
+
+        Scrolls with a payload filter on doc_id, batch_size documents per filter,
+        and fetches only the dense vector and doc_id - no text.
+        """
+        document_ids = list(document_ids)
+        with_vectors = [DENSE_VECTOR] if self.has_sparse else True
+        for start in range(0, len(document_ids), batch_size):
+            batch = document_ids[start:start + batch_size]
+            scroll_filter = Filter(must=[FieldCondition(key="doc_id", match=MatchAny(any=batch))])
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=1024,
+                    offset=offset,
+                    with_payload=["doc_id"],
+                    with_vectors=with_vectors,
+                )
+                for point in points:
+                    vector = point.vector[DENSE_VECTOR] if isinstance(point.vector, dict) else point.vector
+                    if vector is not None and point.payload:
+                        yield point.payload["doc_id"], np.asarray(vector, dtype=np.float32)
+                if offset is None:
+                    break
+
     def delete(self, doc_id: Union[str, UUID]) -> None:
         """Delete a vector"""
         self.client.delete(collection_name=self.collection_name, points_selector=[str(doc_id)])
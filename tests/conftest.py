@@ -0,0 +1,158 @@
+"""Shared fixtures: a ChatBot over an empty local store, talking to a fake LLM server"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from mydata.chatbot import ChatBot
+from mydata.config import Config
+from mydata.crypto import CryptoManager
+from mydata.database import Database
+from mydata.llm_providers import ProviderRegistry
+from mydata.models import ApiKey
+from mydata.vectordb import VectorDB
+
+API_KEYS = {"anthropic": "sk-ant-test-1", "openai": "sk-openai-test-1"}
+
+
+class FakeEndpoint:
+    """One provider on the fake server: answers "<name> answer", or 500s while failing"""
+
+    def __init__(self, name):
+        self.name = name
+        self.failing = False
+        self.gate = None  # threading.Event the request waits on, to hold calls in the LLM
+        self.requests = []  # (api_key, client port) per request
+
+    @property
+    def calls(self):
+        return len(self.requests)
+
+    @property
+    def api_keys(self):
+        return [key for key, _ in self.requests]
+
+    @property
+    def ports(self):
+        return {port for _, port in self.requests}
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Local HTTP server speaking the Anthropic Messages and OpenAI Chat Completions shapes"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeLLMHandler)
+        self.anthropic = FakeEndpoint("anthropic")
+        self.openai = FakeEndpoint("openai")
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse is visible
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/v1/messages":
+            endpoint = self.server.anthropic
+            api_key = self.headers.get("x-api-key")
+        elif self.path == "/v1/chat/completions":
+            endpoint = self.server.openai
+            api_key = self.headers.get("Authorization", "")[len("Bearer "):]
+        else:
+            return self._reply(404, {"error": {"type": "not_found", "message": self.path}})
+
+        with self.server._lock:
+            endpoint.requests.append((api_key, self.client_address[1]))
+        if endpoint.gate is not None:
+            endpoint.gate.wait(10)
+        if endpoint.failing:
+            return self._reply(500, {"error": {"type": "api_error", "message": f"{endpoint.name} unavailable"}})
+
+        text = f"{endpoint.name} answer"
+        if endpoint is self.server.anthropic:
+            self._reply(200, {
+                "id": "msg_test", "type": "message", "role": "assistant", "model": "test",
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            })
+        else:
+            self._reply(200, {
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "test",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            })
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.threads = []  # Name of the thread each embed ran on
+
+    def embed(self, text):
+        self.threads.append(threading.current_thread().name)
+        return np.ones(4, dtype=np.float32) / 2
+
+
+@pytest.fixture(scope="session")
+def crypto(tmp_path_factory):
+    manager = CryptoManager(tmp_path_factory.mktemp("keys"))
+    manager.setup("test passphrase")
+    manager.unlock("test passphrase")
+    return manager
+
+
+@pytest.fixture
+def llm_server(monkeypatch):
+    server = FakeLLMServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # Read by the SDK clients ProviderRegistry builds
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{server.url}/v1")
+    for name in ("NO_PROXY", "no_proxy"):  # Never route the local server through a proxy
+        monkeypatch.setenv(name, "127.0.0.1")
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 0)
+    yield server
+    for endpoint in (server.anthropic, server.openai):
+        if endpoint.gate is not None:
+            endpoint.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def providers(tmp_path, crypto, llm_server):
+    """Registry with an encrypted key per provider, pointed at the fake server"""
+    database = Database(tmp_path / "mydata.db")
+    with database.write_session() as session:
+        for service, key in API_KEYS.items():
+            session.add(ApiKey(service=service, encrypted_key=crypto.encrypt_str(key)))
+    return ProviderRegistry(database, crypto)
+
+
+@pytest.fixture
+def chatbot(tmp_path, crypto, providers):
+    vectordb = VectorDB(tmp_path / "qdrant")
+    vectordb.initialize(dimension=4)
+    return ChatBot(providers.database, crypto, FakeEmbedder(), vectordb, providers=providers)
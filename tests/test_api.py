@@ -0,0 +1,52 @@
+"""API middleware and executor behaviour (no models; LLM calls go to the fake server)"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from mydata import api
+
+
+def test_streamed_response_counts_until_body_finishes():
+    app = FastAPI()
+    app.add_middleware(api.InFlightCounter)
+    seen = []
+
+    @app.get("/stream")
+    def stream():
+        def body():
+            for chunk in ("a", "b"):
+                seen.append(api.requests_in_flight())
+                yield chunk
+        return StreamingResponse(body())
+
+    with TestClient(app) as client:
+        assert client.get("/stream").text == "ab"
+
+    assert seen == [1, 1]
+    assert api.requests_in_flight() == 0
+
+
+def test_search_is_served_while_chats_wait_on_the_llm(chatbot, llm_server, monkeypatch):
+    for name, value in {"_db": chatbot.database, "_crypto": chatbot.crypto, "_embedder": chatbot.embedder,
+                        "_vectordb": chatbot.vectordb, "_chatbot": chatbot, "_hybrid_searcher": None,
+                        "_pipeline": object()}.items():  # _pipeline set: startup() skips its own init
+        monkeypatch.setattr(api, name, value)
+    gate = llm_server.anthropic.gate = threading.Event()
+
+    with TestClient(api.app) as client, ThreadPoolExecutor(max_workers=6) as pool:
+        chats = [pool.submit(client.post, "/chat", json={"message": f"question {i}"}) for i in range(3)]
+        searches = [pool.submit(client.post, "/search", json={"query": f"query {i}", "mode": "vector"})
+                    for i in range(3)]
+
+        assert [future.result(timeout=10).status_code for future in searches] == [200] * 3
+        assert not any(future.done() for future in chats)  # Still held in the LLM call
+        gate.set()
+        assert [future.result(timeout=10).status_code for future in chats] == [200] * 3
+
+    # Chat retrieval embeds on the embed pool, like /search, never on the llm pool
+    assert len(chatbot.embedder.threads) == 6
+    assert all(name.startswith("mydata-embed") for name in chatbot.embedder.threads)
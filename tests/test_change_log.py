@@ -0,0 +1,74 @@
+"""Change log wake-ups and pruning without a scheduler"""
+
+from uuid import uuid4
+
+from sqlmodel import select
+
+from mydata import change_log, counters
+from mydata.config import Config
+from mydata.database import Database
+from mydata.models import ChangeLog
+
+
+def test_wait_fires_once_the_write_commits(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    change_log.wait(0)  # Drain earlier wake-ups
+
+    with database.write_session() as session:
+        change_log.record(session, change_log.DOCUMENT_ADDED, uuid4())
+        assert not change_log.wait(0)  # Not committed: nothing to read yet
+
+    assert change_log.wait(0)
+    assert not change_log.wait(0)  # Consumed
+
+
+def test_rolled_back_write_does_not_wake(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    change_log.wait(0)
+
+    try:
+        with database.write_session() as session:
+            change_log.record(session, change_log.DOCUMENT_ADDED, uuid4())
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+
+    assert not change_log.wait(0)
+
+
+def test_prunes_on_write_without_a_scheduler(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    monkeypatch.setattr(change_log, "PRUNE_EVERY", 1)
+    monkeypatch.setattr(Config, "CHANGE_LOG_MAX_ROWS", 3)
+
+    for _ in range(10):
+        with database.write_session() as session:
+            change_log.record(session, change_log.DOCUMENT_ADDED, uuid4())
+
+    with database.read_session() as session:
+        seqs = session.exec(select(ChangeLog.seq)).all()
+    assert len(seqs) <= 4 and max(seqs) == 10
+
+    # Rows every stored watermark has passed go too
+    with database.write_session() as session:
+        counters.set_counter(session, counters.WATERMARK_PREFIX + "tags", 10)
+        change_log.record(session, change_log.DOCUMENT_ADDED, uuid4())
+    with database.read_session() as session:
+        assert session.exec(select(ChangeLog.seq)).all() == [11]
+
+
+def test_scheduler_process_leaves_pruning_to_the_scheduler(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    monkeypatch.setattr(change_log, "PRUNE_EVERY", 1)
+    monkeypatch.setattr(Config, "CHANGE_LOG_MAX_ROWS", 1)
+
+    change_log.set_consumer(True)
+    try:
+        for _ in range(3):
+            with database.write_session() as session:
+                change_log.record(session, change_log.DOCUMENT_ADDED, uuid4())
+    finally:
+        change_log.set_consumer(False)
+
+    with database.read_session() as session:
+        assert len(session.exec(select(ChangeLog.seq)).all()) == 3
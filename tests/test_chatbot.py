@@ -0,0 +1,15 @@
+"""Chat turns against the fake LLM server: failover and the answer cache"""
+
+QUESTION = "what is the invoice total"
+
+
+def test_failover_answer_is_served_from_cache(chatbot, llm_server):
+    anthropic, openai = llm_server.anthropic, llm_server.openai
+    anthropic.failing = True
+
+    first = chatbot.chat(QUESTION)
+    second = chatbot.chat(QUESTION)
+
+    assert first["provider"] == "openai" and not first["cached"]
+    assert second["cached"] and second["response"] == "openai answer"
+    assert openai.calls == 1
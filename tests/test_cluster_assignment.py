@@ -0,0 +1,84 @@
+"""Cluster geometry and applying a full fit to the database"""
+
+import numpy as np
+from sqlmodel import select
+
+from mydata import cluster_assignment, cluster_worker, counters, ml_organizer
+from mydata.config import Config
+from mydata.database import Database
+from mydata.ml_organizer import MLOrganizer
+from mydata.models import Cluster, Document
+
+
+def test_cluster_geometry_tiny_label_set():
+    vectors = np.eye(4, dtype=np.float32)
+    members = cluster_assignment.group_members(np.array([0, 0, 1, 1]))
+
+    geometry, mean_distance = cluster_assignment.cluster_geometry(vectors, members)
+
+    assert sorted(geometry) == [0, 1]
+    centroid, radius = geometry[0]
+    np.testing.assert_allclose(centroid, [2 ** -0.5, 2 ** -0.5, 0, 0], atol=1e-6)
+    assert 0 < radius < 1
+    assert mean_distance > 0
+
+
+def test_group_members_skips_noise():
+    members = cluster_assignment.group_members(np.array([2, -1, 0, 2, 0, -1, 5]))
+    assert {label: rows.tolist() for label, rows in members.items()} == {0: [2, 4], 2: [0, 3], 5: [6]}
+
+
+class _SnapshotVectors:
+    """Stands in for DocumentVectors: a fixed snapshot, nothing to refresh"""
+
+    def __init__(self, ids, matrix):
+        self.ids, self.matrix = ids, matrix
+
+    def __len__(self):
+        return len(self.ids)
+
+    def refresh(self, doc_ids):
+        return 0, 0
+
+    def snapshot(self):
+        return list(self.ids), self.matrix
+
+
+def test_perform_clustering_applies_labels(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    docs = [Document(source=f"note:{i}", source_type="paste", preview=text) for i, text in enumerate(
+        ["invoice payment invoice payment", "invoice payment overdue invoice",
+         "roster shift roster weekend", "roster shift weekend shift"])]
+    with database.write_session() as session:
+        for doc in docs:
+            session.add(doc)
+
+    organizer = MLOrganizer(None, database)
+    organizer.doc_vectors = _SnapshotVectors([doc.id.hex for doc in docs], np.eye(4, dtype=np.float32))
+    monkeypatch.setattr(Config, "CLUSTER_WORKER_ENABLED", False)
+    monkeypatch.setattr(cluster_worker, "fit_labels", lambda *args: (np.array([0, 0, 1, -1], dtype=np.int32), True))
+
+    assert organizer._perform_clustering(2, 1, "test") == 2
+
+    with database.read_session() as session:
+        clusters = session.exec(select(Cluster)).all()
+        assignments = dict(session.exec(select(Document.id, Document.cluster_id)).all())
+        stats = counters.read_counters(session)
+
+    assert len(clusters) == 2
+    assert all(cluster.centroid is not None for cluster in clusters)
+    assert assignments[docs[0].id] == assignments[docs[1].id] is not None
+    assert assignments[docs[3].id] is None  # Noise
+    assert counters.get_count(stats, counters.CLUSTERS) == 2
+    assert counters.get_count(stats, counters.CLUSTER_REDUCER_DOCUMENTS) == 4
+
+
+def test_concurrent_fit_reports_busy(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    organizer = MLOrganizer(None, database)
+    monkeypatch.setattr(ml_organizer, "CLUSTERING_AVAILABLE", True)
+
+    with ml_organizer._fit_lock:
+        result = organizer.run_clustering(min_cluster_size=0, force=True)
+
+    assert result["status"] == "busy"
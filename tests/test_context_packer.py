@@ -0,0 +1,81 @@
+"""Token-budgeted context packing (offline: tiktoken is replaced or disabled)"""
+
+import pytest
+
+from mydata import context_packer
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken(monkeypatch):
+    """chars/4 token counts, so budgets below are exact and nothing is downloaded"""
+    monkeypatch.setattr(context_packer, "TIKTOKEN_AVAILABLE", False)
+    context_packer._encoding.cache_clear()
+    yield
+    context_packer._encoding.cache_clear()
+
+
+def _hit(hit_id, text, score, doc_id="doc-a", source="notes.txt"):
+    return {"id": hit_id, "score": score, "payload": {"text": text, "doc_id": doc_id, "source": source}}
+
+
+def test_near_duplicates_are_dropped_keeping_the_best_score():
+    text = "the quarterly invoice for the northern region was paid in full on friday"
+    hits = [_hit("low", text + " afternoon", 0.4, doc_id="doc-b"), _hit("high", text, 0.9)]
+
+    used, _, stats = context_packer.pack_context(hits, token_budget=1000)
+
+    assert [hit["id"] for hit in used] == ["high"]
+    assert stats["duplicates_dropped"] == 1
+
+
+def test_neighbouring_chunks_merge_into_one_passage():
+    hits = [_hit("c1", "first part of the contract", 0.5), _hit("c2", "second part of the contract", 0.8),
+            _hit("c4", "an unrelated appendix table", 0.3)]
+
+    used, context, stats = context_packer.pack_context(hits, 1000, positions={"c1": 1, "c2": 2, "c4": 4})
+
+    assert stats["passages"] == 2
+    assert [hit["id"] for hit in used] == ["c1", "c2", "c4"]  # Merged passage first (best score 0.8)
+    assert "first part of the contract\nsecond part of the contract" in context
+
+
+def test_budget_is_spent_in_score_order():
+    hits = [_hit("big", "x" * 400, 0.9, doc_id="a"), _hit("mid", "y " * 30, 0.6, doc_id="b"),
+            _hit("small", "z " * 10, 0.3, doc_id="c")]
+    header = len("[Document 1] (source: notes.txt, relevance: 0.900)\n") + 1
+
+    # Room for the mid passage and the small one, not for the best-scored big one
+    used, _, stats = context_packer.pack_context(hits, token_budget=(header + 60 + header + 20) // 4 + 2)
+
+    assert [hit["id"] for hit in used] == ["mid", "small"]
+    assert stats["passages_used"] == 2
+    assert stats["tokens"] <= (header + 60 + header + 20) // 4 + 2
+
+
+def test_token_counts_fall_back_to_chars_over_four_without_tiktoken():
+    assert context_packer.count_tokens("a" * 10) == 3
+    assert context_packer.count_tokens("") == 0
+
+
+class _OfflineTiktoken:
+    """tiktoken whose BPE download fails, as on a machine with no network"""
+
+    calls = 0
+
+    def encoding_for_model(self, model):
+        self.calls += 1
+        raise ConnectionError("no network")
+
+    def get_encoding(self, name):
+        self.calls += 1
+        raise ConnectionError("no network")
+
+
+def test_unreachable_bpe_file_falls_back_once(monkeypatch):
+    offline = _OfflineTiktoken()
+    monkeypatch.setattr(context_packer, "TIKTOKEN_AVAILABLE", True)
+    monkeypatch.setattr(context_packer, "tiktoken", offline, raising=False)
+
+    assert context_packer.count_tokens("a" * 10, "gpt-4o") == 3
+    assert context_packer.count_tokens("b" * 10, "gpt-4o") == 3
+    assert offline.calls == 1  # None is cached: no download retry per turn
@@ -0,0 +1,48 @@
+"""Prompt history while the background summary lags behind"""
+
+from mydata import conversation_memory
+from mydata.config import Config
+from mydata.database import Database
+from mydata.models import ChatConversation, ChatMessage
+
+
+def _conversation(database, turns):
+    with database.write_session() as session:
+        conversation = ChatConversation(title="test")
+        session.add(conversation)
+        session.flush()
+        messages = []
+        for i in range(turns):
+            for role in ("user", "assistant"):
+                msg = ChatMessage(conversation_id=conversation.id, role=role, content=f"{role} {i}", token_count=2)
+                session.add(msg)
+                messages.append(msg)
+        session.flush()
+        return conversation.id, [msg.id for msg in messages]
+
+
+def test_unsummarized_turns_outside_the_window_are_replayed(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    monkeypatch.setattr(Config, "CHAT_HISTORY_TURNS", 2)
+    conversation_id, ids = _conversation(database, 5)
+
+    messages, summary = conversation_memory.build_history(database, conversation_id, ids[-1], "assistant 4", "gpt-4o")
+
+    assert summary is None
+    assert [msg["content"] for msg in messages][:2] == ["user 0", "assistant 0"]
+    assert len(messages) == 10
+
+
+def test_summarized_turns_are_not_replayed(tmp_path, monkeypatch):
+    database = Database(tmp_path / "mydata.db")
+    monkeypatch.setattr(Config, "CHAT_HISTORY_TURNS", 2)
+    conversation_id, ids = _conversation(database, 5)
+    with database.write_session() as session:
+        row = session.get(ChatConversation, conversation_id)
+        row.summary, row.summary_through_id, row.summary_tokens = "earlier turns", ids[3], 3
+        session.add(row)
+
+    messages, summary = conversation_memory.build_history(database, conversation_id, ids[-1], "assistant 4", "gpt-4o")
+
+    assert summary == "earlier turns"
+    assert [msg["content"] for msg in messages][0] == "user 2"
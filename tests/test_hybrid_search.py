@@ -0,0 +1,48 @@
+"""Tag-scoped search on a dense + sparse Qdrant collection"""
+
+from uuid import uuid4
+
+import pytest
+
+from mydata import sparse_encoder
+from mydata.database import Database
+from mydata.hybrid_search import HybridSearcher
+from mydata.models import Document, Tag
+from mydata.vectordb import VectorDB
+
+
+@pytest.fixture
+def searcher(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    vectordb = VectorDB(tmp_path / "qdrant")
+    vectordb.initialize(dimension=4)
+
+    texts = {"finance": "quarterly invoice budget report", "health": "doctor appointment budget notes"}
+    with database.write_session() as session:
+        for i, (tag, text) in enumerate(texts.items()):
+            doc = Document(source=f"note:{tag}", source_type="paste", preview=text)
+            session.add(doc)
+            session.add(Tag(doc_id=doc.id, tag=tag))
+            vector = [0.0] * 4
+            vector[i] = 1.0
+            vectordb.upsert(uuid4(), vector, payload={"doc_id": str(doc.id), "source": doc.source},
+                            sparse=sparse_encoder.encode_document(text))
+    return HybridSearcher(database, vectordb)
+
+
+def test_native_collection_has_sparse_vectors(searcher):
+    assert searcher.native
+
+
+def test_tag_scoped_keyword_search(searcher):
+    hits = searcher.keyword_search("budget", limit=10, tag="finance")
+    assert [hit["payload"]["source"] for hit in hits] == ["note:finance"]
+
+
+def test_tag_scoped_hybrid_search(searcher):
+    hits = searcher.search("budget", lambda query: [0.5, 0.5, 0.0, 0.0], limit=10, tag="health")
+    assert {hit["payload"]["source"] for hit in hits} == {"note:health"}
+
+
+def test_unknown_tag_matches_nothing(searcher):
+    assert searcher.search("budget", lambda query: [0.5, 0.5, 0.0, 0.0], limit=10, tag="missing") == []
@@ -0,0 +1,101 @@
+"""Provider clients, failover and circuit breakers, against the fake LLM server"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mydata import api, llm_providers
+from mydata.config import Config
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the breakers"""
+    now = [1000.0]
+    monkeypatch.setattr(llm_providers, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _ask(chatbot, i):
+    return chatbot.chat(f"what is the invoice total {i}")
+
+
+def test_key_is_decrypted_once_and_one_client_serves_every_turn(chatbot, providers, crypto, llm_server, monkeypatch):
+    decrypted = []
+    decrypt_str = crypto.decrypt_str
+    monkeypatch.setattr(crypto, "decrypt_str", lambda data: decrypted.append(data) or decrypt_str(data))
+
+    client = providers.get_client("anthropic")
+    for i in range(3):
+        assert _ask(chatbot, i)["provider"] == "anthropic"
+
+    assert providers.get_client("anthropic") is client
+    assert len(decrypted) == 2  # Anthropic and OpenAI, once each
+    assert llm_server.anthropic.api_keys == ["sk-ant-test-1"] * 3
+    assert len(llm_server.anthropic.ports) == 1  # One pooled connection, kept alive
+
+
+def test_new_api_key_rebuilds_the_client(chatbot, providers, llm_server, monkeypatch):
+    for name, value in {"_db": chatbot.database, "_crypto": chatbot.crypto, "_llm_providers": providers,
+                        "_pipeline": object()}.items():  # _pipeline set: startup() skips its own init
+        monkeypatch.setattr(api, name, value)
+    old_client = providers.get_client("anthropic")
+    breaker = providers.breakers["anthropic"]
+    breaker.record_failure(ConnectionError("bad key"))
+
+    with TestClient(api.app) as client:
+        response = client.post("/api-key", json={"service": "anthropic", "api_key": "sk-ant-test-2"})
+    assert response.status_code == 200
+
+    assert _ask(chatbot, 0)["provider"] == "anthropic"
+    assert providers.get_client("anthropic") is not old_client
+    assert llm_server.anthropic.api_keys == ["sk-ant-test-2"]
+    assert breaker.failures == 0
+
+
+def test_failover_opens_the_circuit_then_half_open_trial_closes_it(chatbot, providers, llm_server, clock, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    anthropic, openai = llm_server.anthropic, llm_server.openai
+    breaker = providers.breakers["anthropic"]
+    anthropic.failing = True
+
+    # Each failure fails over to OpenAI until the threshold opens the circuit
+    for i in range(breaker.failure_threshold):
+        assert _ask(chatbot, i)["provider"] == "openai"
+    assert breaker.state == "open"
+    assert anthropic.calls == breaker.failure_threshold
+
+    # Open: Anthropic is skipped without a call
+    assert _ask(chatbot, "open")["provider"] == "openai"
+    assert anthropic.calls == breaker.failure_threshold
+    assert openai.calls == breaker.failure_threshold + 1
+
+    # After the reset period a single trial call goes through and closes it
+    anthropic.failing = False
+    clock[0] += breaker.reset_seconds
+    assert _ask(chatbot, "trial")["provider"] == "anthropic"
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_failed_half_open_trial_reopens_the_circuit(providers, clock):
+    breaker = providers.breakers["anthropic"]
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError("down"))
+    clock[0] += breaker.reset_seconds
+
+    assert breaker.allow()  # The trial
+    assert not breaker.allow()  # Only one at a time
+    breaker.record_failure(ConnectionError("still down"))
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.snapshot()["retry_in_seconds"] == breaker.reset_seconds
+
+
+def test_no_provider_available_raises(chatbot, llm_server, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    llm_server.anthropic.failing = llm_server.openai.failing = True
+
+    with pytest.raises(RuntimeError, match="LLM API error"):
+        _ask(chatbot, 0)
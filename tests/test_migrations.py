@@ -0,0 +1,43 @@
+"""Schema migrations on databases written by older versions"""
+
+from mydata import chunk_store
+from mydata.database import Database
+from mydata.migrations import add_chunk_index
+from mydata.models import Chunk, Document
+
+
+def test_chunk_index_is_backfilled_from_start_offset_order(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    with database.write_session() as session:
+        first = Document(source="note:1", source_type="paste")
+        second = Document(source="note:2", source_type="paste")
+        session.add_all([first, second])
+        # Written with the old 512-character stride, out of order
+        chunks = {
+            (first.id, offset): Chunk(doc_id=first.id, text=f"a{offset}", start_offset=offset, end_offset=offset + 10)
+            for offset in (1024, 0, 512)
+        }
+        chunks[(second.id, 0)] = Chunk(doc_id=second.id, text="b0", start_offset=0, end_offset=10)
+        session.add_all(chunks.values())
+    ids = {key: str(chunk.id) for key, chunk in chunks.items()}
+
+    # Back to the schema before the column existed, then migrate
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE chunks DROP COLUMN chunk_index")
+    raw = database.engine.raw_connection()
+    try:
+        add_chunk_index(raw.driver_connection)
+        add_chunk_index(raw.driver_connection)
+    finally:
+        raw.close()
+
+    records = chunk_store.load_chunks(database, ids.values())
+    assert {key: records[chunk_id][3] for key, chunk_id in ids.items()} == {
+        (first.id, 0): 0,
+        (first.id, 512): 1,
+        (first.id, 1024): 2,
+        (second.id, 0): 0,
+    }
+
+    hits = chunk_store.hydrate_hits(database, [{"id": ids[(first.id, 512)], "payload": {}}])
+    assert hits[0]["payload"]["chunk_index"] == 1
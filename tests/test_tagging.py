@@ -0,0 +1,40 @@
+"""Auto-tags: TF-IDF keywords plus pattern tags"""
+
+from sqlmodel import select
+
+from mydata.content_store import make_content
+from mydata.database import Database
+from mydata.ml_organizer import MLOrganizer
+from mydata.models import Document, Tag
+
+
+def test_pattern_tag_survives_top_k(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    text = " ".join(["invoice"] * 6 + ["ledger", "quarter", "audit"] * 2 + ["doctor appointment"])
+    with database.write_session() as session:
+        doc = Document(source="note:1", source_type="paste", preview=text)
+        session.add(doc)
+        session.add(make_content(doc.id, text))
+
+    assert MLOrganizer(None, database).tag_documents([doc.id], top_k=3) == 1
+
+    with database.read_session() as session:
+        tags = dict(session.exec(select(Tag.tag, Tag.confidence).where(Tag.doc_id == doc.id)).all())
+    assert len(tags) == 3
+    assert tags["invoice"] == 1.0
+    assert tags["health"] == 0.8
+
+
+def test_ingest_tags_right_away_without_a_scheduler(tmp_path):
+    database = Database(tmp_path / "mydata.db")
+    text = "doctor appointment " + " ".join(["referral"] * 3)
+    with database.write_session() as session:
+        doc = Document(source="note:2", source_type="paste", preview=text)
+        session.add(doc)
+        session.add(make_content(doc.id, text))
+
+    MLOrganizer(None, database).organize_document(doc.id)
+
+    with database.read_session() as session:
+        tags = set(session.exec(select(Tag.tag).where(Tag.doc_id == doc.id)).all())
+    assert {"referral", "health"} <= tags